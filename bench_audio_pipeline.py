@@ -0,0 +1,173 @@
+# bench_audio_pipeline.py
+"""
+Local load test for the audio pipeline. No Discord connection is needed.
+
+Spawns N concurrent streams of a file exactly the way play_audio does, paces them
+like nextcord's AudioPlayer (one 20ms frame per tick), and sends every Opus packet
+over UDP to a fake voice endpoint on localhost. Reports CPU used by the bot process
+and by the ffmpeg children, and how many streams fit on one core, for each encoder mode:
+
+  python       - ffmpeg decodes to PCM, the bot process encodes Opus (AUDIO_ENCODER=python)
+  ffmpeg       - ffmpeg decodes and encodes Opus, the bot process only forwards packets
+  volume       - python, plus the bot's VolumeSource scaling PCM with NumPy, 10 frames at a time
+  transformer  - python, plus nextcord's PCMVolumeTransformer scaling every frame (for comparison;
+                 needs audioop, which Python 3.13 removed)
+  party        - one listening party: a single ffmpeg decodes and encodes, every stream is a
+                 channel in the party reading the same packets in lockstep
+
+Usage:
+  python bench_audio_pipeline.py path/to/chapter.m4b --streams 1,8,32 --seconds 20
+  python bench_audio_pipeline.py path/to/chapter.m4b --modes python,volume,transformer --volume 0.8
+  python bench_audio_pipeline.py path/to/chapter.m4b --modes ffmpeg,party --streams 1,8,32,128
+"""
+import argparse
+import os
+import resource
+import socket
+import sys
+import threading
+import time
+
+import nextcord as discord
+from nextcord import opus
+
+from cogs.listening_party import PartyStream
+from cogs.volume import VolumeSource
+
+FRAME_SECONDS = opus.Encoder.FRAME_LENGTH / 1000
+
+class FakeVoiceEndpoint:
+    """A UDP socket on localhost that counts the packets and bytes it receives."""
+    def __init__(self):
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.bind(('127.0.0.1', 0))
+        self.sock.settimeout(0.5)
+        self.address = self.sock.getsockname()
+        self.packets = 0
+        self.bytes = 0
+        self._running = True
+        self._thread = threading.Thread(target=self._receive, daemon=True)
+        self._thread.start()
+
+    def _receive(self):
+        while self._running:
+            try:
+                data = self.sock.recv(4096)
+            except socket.timeout:
+                continue
+            except OSError:
+                break
+            self.packets += 1
+            self.bytes += len(data)
+
+    def close(self):
+        self._running = False
+        self._thread.join()
+        self.sock.close()
+
+class FakeStream(threading.Thread):
+    """Mimics nextcord's AudioPlayer loop: read a frame, encode if needed, send, sleep to the next tick."""
+    def __init__(self, file_path: str, mode: str, endpoint, seconds: float, bitrate: int, volume: float, party: PartyStream = None):
+        super().__init__(daemon=True)
+        self.mode = mode
+        self.endpoint = endpoint
+        self.seconds = seconds
+        if party:
+            self.source = party.member()
+            self.encoder = None
+        elif mode == 'ffmpeg':
+            self.source = discord.FFmpegOpusAudio(file_path, bitrate=bitrate, options="-vn")
+            self.encoder = None
+        else:
+            self.source = discord.FFmpegPCMAudio(file_path, options="-vn")
+            if mode == 'volume':
+                self.source = VolumeSource(self.source, volume)
+            elif mode == 'transformer':
+                self.source = discord.PCMVolumeTransformer(self.source, volume)
+            self.encoder = opus.Encoder()
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.frames = 0
+        self.late_frames = 0
+
+    def run(self):
+        start = time.perf_counter()
+        deadline = start + self.seconds
+        while time.perf_counter() < deadline:
+            data = self.source.read()
+            if not data:
+                break
+            if self.encoder:
+                data = self.encoder.encode(data, self.encoder.SAMPLES_PER_FRAME)
+            self.sock.sendto(data, self.endpoint.address)
+            self.frames += 1
+            next_tick = start + self.frames * FRAME_SECONDS
+            delay = next_tick - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            elif delay < -FRAME_SECONDS:
+                self.late_frames += 1
+        self.source.cleanup()
+        self.sock.close()
+
+def run_round(file_path: str, mode: str, streams: int, seconds: float, bitrate: int, volume: float = 1.0) -> dict:
+    endpoint = FakeVoiceEndpoint()
+    self_before = resource.getrusage(resource.RUSAGE_SELF)
+    children_before = resource.getrusage(resource.RUSAGE_CHILDREN)
+    wall_start = time.perf_counter()
+
+    party = PartyStream(discord.FFmpegOpusAudio(file_path, bitrate=bitrate, options="-vn")) if mode == 'party' else None
+    workers = [FakeStream(file_path, mode, endpoint, seconds, bitrate, volume, party) for _ in range(streams)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+    wall = time.perf_counter() - wall_start
+    time.sleep(0.2)  # let the receiver drain
+    endpoint.close()
+    self_after = resource.getrusage(resource.RUSAGE_SELF)
+    children_after = resource.getrusage(resource.RUSAGE_CHILDREN)
+
+    bot_cpu = (self_after.ru_utime + self_after.ru_stime) - (self_before.ru_utime + self_before.ru_stime)
+    ffmpeg_cpu = (children_after.ru_utime + children_after.ru_stime) - (children_before.ru_utime + children_before.ru_stime)
+    bot_core_per_stream = bot_cpu / wall / streams
+    total_core_per_stream = (bot_cpu + ffmpeg_cpu) / wall / streams
+    return {
+        'mode': mode,
+        'streams': streams,
+        'wall': wall,
+        'bot_cpu_pct_per_stream': 100 * bot_core_per_stream,
+        'ffmpeg_cpu_pct_per_stream': 100 * ffmpeg_cpu / wall / streams,
+        # The bot process is single-threaded under the GIL, so its share is the scaling limit
+        'streams_per_bot_core': 1 / bot_core_per_stream if bot_core_per_stream else float('inf'),
+        'streams_per_core': 1 / total_core_per_stream if total_core_per_stream else float('inf'),
+        'frames': sum(w.frames for w in workers),
+        'late_frames': sum(w.late_frames for w in workers),
+        'packets_received': endpoint.packets,
+        'kbps_per_stream': endpoint.bytes * 8 / 1000 / wall / streams,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure CPU per audio stream with fake voice endpoints.")
+    parser.add_argument('file', help="Audio file to stream (e.g. a chapter .m4b)")
+    parser.add_argument('--streams', default="1,8,32", help="Comma-separated concurrent stream counts")
+    parser.add_argument('--seconds', type=float, default=20, help="Seconds to stream per round")
+    parser.add_argument('--modes', default="python,ffmpeg", help="Modes to compare: python, ffmpeg, volume, transformer, party")
+    parser.add_argument('--bitrate', type=int, default=64, help="Opus bitrate in kbps for ffmpeg mode")
+    parser.add_argument('--volume', type=float, default=0.8, help="Volume for the volume and transformer modes")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.file):
+        print(f"File not found: {args.file}")
+        sys.exit(1)
+
+    print(f"Cores available: {os.cpu_count()}")
+    print(f"{'mode':<12}{'streams':>8}{'bot %/stream':>14}{'ffmpeg %/stream':>17}{'streams/bot core':>18}{'streams/core':>14}{'late':>7}{'kbps':>8}")
+    for mode in args.modes.split(','):
+        for streams in (int(n) for n in args.streams.split(',')):
+            r = run_round(args.file, mode, streams, args.seconds, args.bitrate, args.volume)
+            print(f"{r['mode']:<12}{r['streams']:>8}{r['bot_cpu_pct_per_stream']:>14.2f}{r['ffmpeg_cpu_pct_per_stream']:>17.2f}"
+                  f"{r['streams_per_bot_core']:>18.1f}{r['streams_per_core']:>14.1f}{r['late_frames']:>7}{r['kbps_per_stream']:>8.1f}")
+
+if __name__ == "__main__":
+    main()
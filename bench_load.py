@@ -0,0 +1,612 @@
+# bench_load.py
+"""
+Offline load test for the bot. No Discord connection is needed.
+
+Fake Interaction, Guild, VoiceChannel and VoiceClient stand-ins drive the real PlayerCog
+commands and AudiobookPlayerView callbacks for N simulated guilds at once:
+
+  /audiobook -> pick a book (or series + book) -> pick a chapter -> pick a voice channel
+  -> scrub, pause/resume, next chapter -> quit
+
+Discord API calls are simulated with a configurable latency. Audio is real: every stream runs
+the ffmpeg child play_audio creates, and a fake voice client reads and encodes it at the 20ms
+frame rate nextcord's AudioPlayer uses, sending the packets to a local UDP endpoint.
+
+Reported per run: ack and completion latency per handler, CPU per stream (bot process and
+ffmpeg children), ffprobe calls and memory. Save a run with --json and compare later runs
+against it with --baseline to catch regressions (exit code 1 when something got worse).
+
+Usage:
+  python bench_load.py --library audiobooks --guilds 20 --play-seconds 15
+  python bench_load.py --guilds 20 --json baseline.json
+  python bench_load.py --guilds 20 --baseline baseline.json --tolerance 0.25
+"""
+import argparse
+import asyncio
+import collections
+import importlib
+import itertools
+import json
+import logging
+import os
+import random
+import resource
+import socket
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+
+import nextcord as discord
+from nextcord import opus
+
+import config
+from bench_audio_pipeline import FakeVoiceEndpoint, FRAME_SECONDS
+
+OWNER_ID = 1
+_ids = itertools.count(10 ** 17)
+
+# --- Fake Discord ---
+
+class FakeDiscordAPI:
+    """Counts simulated REST calls and sleeps for a jittered round-trip on each."""
+    def __init__(self, latency: float, seed: int):
+        self.latency = latency
+        self.rng = random.Random(seed)
+        self.calls = collections.Counter()
+
+    async def call(self, route: str):
+        self.calls[route] += 1
+        if self.latency > 0:
+            await asyncio.sleep(self.latency * (0.5 + self.rng.random()))
+
+class FakeUser:
+    def __init__(self, user_id: int, name: str):
+        self.id = user_id
+        self.name = name
+
+    def __str__(self):
+        return self.name
+
+    def __eq__(self, other):
+        return getattr(other, 'id', None) == self.id
+
+    def __hash__(self):
+        return hash(self.id)
+
+class FakePermissions:
+    connect = True
+    speak = True
+
+class FakeMessage:
+    def __init__(self, api: FakeDiscordAPI, content=None, view=None):
+        self.api = api
+        self.id = next(_ids)
+        self.created_at = datetime.now(timezone.utc)
+        self.content = content
+        self.view = view
+        self.edits = 0
+
+    async def edit(self, **kwargs):
+        await self.api.call('message.edit')
+        self.content = kwargs.get('content', self.content)
+        self.view = kwargs.get('view', self.view)
+        self.edits += 1
+        return self
+
+    async def delete(self):
+        await self.api.call('message.delete')
+
+class FakeTextChannel:
+    def __init__(self, api: FakeDiscordAPI, guild):
+        self.api = api
+        self.id = next(_ids)
+        self.name = "general"
+        self.guild = guild
+
+    async def send(self, content=None, **kwargs):
+        await self.api.call('channel.send')
+        return FakeMessage(self.api, content, kwargs.get('view'))
+
+class FakeVoiceChannel:
+    def __init__(self, harness, guild, name: str):
+        self.harness = harness
+        self.id = next(_ids)
+        self.name = name
+        self.guild = guild
+
+    def permissions_for(self, member):
+        return FakePermissions()
+
+    async def connect(self, timeout: float = 60.0, reconnect: bool = True):
+        await asyncio.sleep(self.harness.voice_connect_latency)
+        client = FakeVoiceClient(self.harness, self)
+        self.harness.bot.voice_clients.append(client)
+        return client
+
+class FakeGuild:
+    def __init__(self, harness, index: int):
+        self.id = next(_ids)
+        self.name = f"Load Test Guild {index}"
+        self.me = harness.bot.user
+        self.text_channel = FakeTextChannel(harness.api, self)
+        self.voice_channels = [FakeVoiceChannel(harness, self, f"Voice {n}") for n in range(2)]
+        for channel in self.voice_channels:
+            harness.bot.channels[channel.id] = channel
+
+class FakeAudioPlayer(threading.Thread):
+    """Mimics nextcord's AudioPlayer: read a frame, encode it unless it is Opus already, send, sleep to the next tick."""
+    def __init__(self, source, endpoint, after=None):
+        super().__init__(daemon=True, name="fake-audio-player")
+        self.source = source
+        self.endpoint = endpoint
+        self.after = after
+        self.encoder = None if source.is_opus() else opus.Encoder()
+        self.frames = 0
+        self._end = threading.Event()
+        self._resumed = threading.Event()
+        self._resumed.set()
+
+    def run(self):
+        error = None
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        try:
+            start = time.perf_counter()
+            ticks = 0
+            while not self._end.is_set():
+                if not self._resumed.is_set():
+                    self._resumed.wait()
+                    start = time.perf_counter()
+                    ticks = 0
+                    continue
+                data = self.source.read()
+                if not data:
+                    break
+                if self.encoder:
+                    data = self.encoder.encode(data, self.encoder.SAMPLES_PER_FRAME)
+                sock.sendto(data, self.endpoint.address)
+                self.frames += 1
+                ticks += 1
+                delay = start + ticks * FRAME_SECONDS - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+        except Exception as e:
+            error = e
+        finally:
+            sock.close()
+            self.source.cleanup()
+            if self.after:
+                self.after(error)
+
+    def stop(self):
+        self._end.set()
+        self._resumed.set()
+
+    def pause(self):
+        self._resumed.clear()
+
+    def resume(self):
+        self._resumed.set()
+
+    def is_playing(self) -> bool:
+        return self.is_alive() and self._resumed.is_set() and not self._end.is_set()
+
+    def is_paused(self) -> bool:
+        return self.is_alive() and not self._resumed.is_set() and not self._end.is_set()
+
+class FakeVoiceClient:
+    def __init__(self, harness, channel: FakeVoiceChannel):
+        self.harness = harness
+        self.channel = channel
+        self.guild = channel.guild
+        self._connected = True
+        self._player = None
+
+    def is_connected(self) -> bool:
+        return self._connected
+
+    def is_playing(self) -> bool:
+        return self._player is not None and self._player.is_playing()
+
+    def is_paused(self) -> bool:
+        return self._player is not None and self._player.is_paused()
+
+    def play(self, source, *, after=None):
+        if self.is_playing():
+            raise discord.ClientException("Already playing audio.")
+        self._player = FakeAudioPlayer(source, self.harness.endpoint, after)
+        self.harness.players.append(self._player)
+        self._player.start()
+
+    def pause(self):
+        if self._player:
+            self._player.pause()
+
+    def resume(self):
+        if self._player:
+            self._player.resume()
+
+    def stop(self):
+        if self._player:
+            self._player.stop()
+            self._player = None
+
+    async def move_to(self, channel):
+        await asyncio.sleep(self.harness.voice_connect_latency)
+        self.channel = channel
+
+    async def disconnect(self, *, force: bool = False):
+        self.stop()
+        self._connected = False
+        if self in self.harness.bot.voice_clients:
+            self.harness.bot.voice_clients.remove(self)
+
+class FakeBot:
+    def __init__(self, api: FakeDiscordAPI):
+        self.api = api
+        self.loop = asyncio.get_running_loop()
+        self.user = FakeUser(0, "AudioBot")
+        self.voice_clients = []
+        self.channels = {}
+        self.cogs = {}
+
+    def get_cog(self, name: str):
+        return self.cogs.get(name)
+
+    def get_channel(self, channel_id: int):
+        return self.channels.get(channel_id)
+
+    def get_guild(self, guild_id: int):
+        return None
+
+    async def change_presence(self, activity=None, status=None):
+        await self.api.call('gateway.presence')
+
+    async def is_owner(self, user) -> bool:
+        return user.id == OWNER_ID
+
+class FakeInteractionResponse:
+    def __init__(self, interaction):
+        self._parent = interaction
+        self._done = False
+
+    def is_done(self) -> bool:
+        return self._done
+
+    async def _respond(self, route: str):
+        if self._done:
+            raise discord.InteractionResponded(self._parent)
+        await self._parent.api.call(route)
+        self._done = True
+
+    async def send_message(self, content=None, **kwargs):
+        await self._respond('interaction.send_message')
+        self._parent._original = FakeMessage(self._parent.api, content, kwargs.get('view'))
+        self._parent.record_view(kwargs.get('view'))
+
+    async def edit_message(self, **kwargs):
+        await self._respond('interaction.edit_message')
+        await self._parent._apply_edit(kwargs)
+
+    async def defer(self, **kwargs):
+        await self._respond('interaction.defer')
+
+class FakeFollowup:
+    def __init__(self, interaction):
+        self._parent = interaction
+
+    async def send(self, content=None, **kwargs):
+        await self._parent.api.call('followup.send')
+        self._parent.record_view(kwargs.get('view'))
+        message = FakeMessage(self._parent.api, content, kwargs.get('view'))
+        if self._parent._original is None:
+            # The first followup after a deferred command becomes the original response
+            self._parent._original = message
+        return message
+
+class FakeInteraction:
+    def __init__(self, harness, guild: FakeGuild, user: FakeUser, interaction_type, message: FakeMessage = None, data: dict = None):
+        self.api = harness.api
+        self.id = next(_ids)
+        self.created_at = datetime.now(timezone.utc)
+        self.type = interaction_type
+        self.data = data or {}
+        self.guild = guild
+        self.guild_id = guild.id
+        self.user = user
+        self.channel = guild.text_channel
+        self.client = harness.bot
+        self.message = message
+        self.response = FakeInteractionResponse(self)
+        self.followup = FakeFollowup(self)
+        self._original = message  # Components respond on the message they are attached to
+        self.last_view = None
+
+    def record_view(self, view):
+        if view is not None:
+            self.last_view = view
+
+    async def _apply_edit(self, kwargs):
+        if self._original is None:
+            self._original = FakeMessage(self.api)
+        self._original.content = kwargs.get('content', self._original.content)
+        self._original.view = kwargs.get('view', self._original.view)
+        self.record_view(kwargs.get('view'))
+
+    async def original_message(self):
+        await self.api.call('interaction.original_message')
+        if self._original is None:
+            raise discord.NotFound(_FakeResponse(404), "Unknown Message")
+        return self._original
+
+    async def edit_original_message(self, **kwargs):
+        await self.api.call('interaction.edit_original_message')
+        await self._apply_edit(kwargs)
+        return self._original
+
+class _FakeResponse:
+    """Just enough of an aiohttp response for nextcord's HTTPException constructor."""
+    def __init__(self, status: int):
+        self.status = status
+        self.reason = "Fake"
+
+# --- Harness ---
+
+class Harness:
+    def __init__(self, args):
+        self.args = args
+        self.api = FakeDiscordAPI(args.api_latency, args.seed)
+        self.voice_connect_latency = args.voice_connect_latency
+        self.bot = FakeBot(self.api)
+        self.endpoint = FakeVoiceEndpoint()
+        self.players = []
+        self.completion = collections.defaultdict(list)  # key: handler, value: seconds until the callback returned
+        self.errors = collections.Counter()
+        self.player_cog = modules['player_cog']
+        self.cog = self.player_cog.PlayerCog(self.bot)
+        self.bot.cogs['PlayerCog'] = self.cog
+
+    async def slash(self, guild, user, name: str, **options):
+        command = getattr(self.cog, name)
+        interaction = FakeInteraction(self, guild, user, discord.InteractionType.application_command, data={'name': name})
+        start = time.perf_counter()
+        await command.callback(self.cog, interaction, **options)
+        self.completion[f"/{name}"].append(time.perf_counter() - start)
+        return interaction
+
+    async def component(self, guild, user, view, item, message, values=None):
+        interaction = FakeInteraction(self, guild, user, discord.InteractionType.component, message=message, data={'custom_id': item.custom_id})
+        if values is not None:
+            item.refresh_state({'values': values})
+        start = time.perf_counter()
+        # The same order nextcord's View dispatch uses
+        if await view.interaction_check(interaction):
+            await item.callback(interaction)
+        self.completion[type(item).__name__].append(time.perf_counter() - start)
+        return interaction
+
+    @staticmethod
+    def find(view, cls, **attrs):
+        for item in view.children:
+            if isinstance(item, cls) and not item.disabled and all(getattr(item, k, None) == v for k, v in attrs.items()):
+                return item
+        return None
+
+    async def run_guild(self, index: int):
+        await asyncio.sleep(index * self.args.stagger)
+        pc = self.player_cog
+        guild = FakeGuild(self, index)
+        user = FakeUser(OWNER_ID + 1 + index, f"listener{index}")
+        pause = self.args.play_seconds / 4
+
+        interaction = await self.slash(guild, user, 'audiobook')
+        view = interaction.last_view
+        if view is None:
+            raise RuntimeError("/audiobook did not send a view (is the library empty?)")
+        panel = interaction._original
+
+        select = self.find(view, pc.ItemSelect)
+        option = select.options[index % len(select.options)]
+        await self.component(guild, user, view, select, panel, values=[option.value])
+
+        if view.selection_state == 'series_books':
+            select = self.find(view, pc.SeriesBookSelect)
+            await self.component(guild, user, view, select, panel, values=[select.options[0].value])
+
+        select = self.find(view, pc.ChapterSelect)
+        if select is None:
+            raise RuntimeError(f"No chapters found for {view.selected_book_path}")
+        await self.component(guild, user, view, select, panel, values=[select.options[0].value])
+
+        select = self.find(view, pc.ChannelSelect)
+        if select:
+            await self.component(guild, user, view, select, panel, values=[select.options[0].value])
+        if not view.is_playing:
+            raise RuntimeError("Playback did not start")
+
+        await asyncio.sleep(pause)
+        await self.component(guild, user, view, self.find(view, pc.ScrubButton, delta=30), panel)
+        await asyncio.sleep(pause)
+        await self.component(guild, user, view, self.find(view, pc.PauseButton), panel)
+        await asyncio.sleep(0.5)
+        await self.component(guild, user, view, self.find(view, pc.PauseButton), panel)
+        await asyncio.sleep(pause)
+        next_button = self.find(view, pc.TrackButton, direction=1)
+        if next_button:
+            await self.component(guild, user, view, next_button, panel)
+        await asyncio.sleep(pause)
+        await self.component(guild, user, view, self.find(view, pc.QuitButton), panel)
+
+    async def run(self) -> dict:
+        ffprobe_calls = ffprobe_total()
+        self_before = resource.getrusage(resource.RUSAGE_SELF)
+        children_before = resource.getrusage(resource.RUSAGE_CHILDREN)
+        rss_before = current_rss_mb()
+        wall_start = time.perf_counter()
+
+        results = await asyncio.gather(*(self.run_guild(i) for i in range(self.args.guilds)), return_exceptions=True)
+        for result in results:
+            if isinstance(result, Exception):
+                self.errors[f"{type(result).__name__}: {result}"] += 1
+
+        for client in list(self.bot.voice_clients):
+            await client.disconnect(force=True)
+        loop = asyncio.get_running_loop()
+        for player in self.players:
+            await loop.run_in_executor(None, player.join, 5)
+
+        wall = time.perf_counter() - wall_start
+        rss_after = current_rss_mb()
+        self_after = resource.getrusage(resource.RUSAGE_SELF)
+        children_after = resource.getrusage(resource.RUSAGE_CHILDREN)
+        self.endpoint.close()
+
+        bot_cpu = (self_after.ru_utime + self_after.ru_stime) - (self_before.ru_utime + self_before.ru_stime)
+        ffmpeg_cpu = (children_after.ru_utime + children_after.ru_stime) - (children_before.ru_utime + children_before.ru_stime)
+        stream_seconds = sum(p.frames for p in self.players) * FRAME_SECONDS
+        return self.summarize(wall, bot_cpu, ffmpeg_cpu, stream_seconds, ffprobe_total() - ffprobe_calls, rss_before, rss_after)
+
+    def summarize(self, wall, bot_cpu, ffmpeg_cpu, stream_seconds, ffprobe_calls, rss_before, rss_after) -> dict:
+        handlers = {}
+        for row in modules['ack_tracker'].report():
+            done = sorted(self.completion.get(row['handler'], [])) or [0.0]
+            handlers[row['handler']] = {
+                'calls': row['calls'],
+                'ack_p50': row['p50'],
+                'ack_p95': row['p95'],
+                'ack_max': row['max'],
+                'done_p50': done[int((len(done) - 1) * 0.5)],
+                'done_p95': done[int((len(done) - 1) * 0.95)],
+                'missed': row['missed'],
+                'auto_deferred': row['auto_deferred'],
+            }
+        return {
+            'guilds': self.args.guilds,
+            'wall_seconds': wall,
+            'streams': len(self.players),
+            'stream_seconds': stream_seconds,
+            'bot_cpu_pct_per_stream': 100 * bot_cpu / stream_seconds if stream_seconds else 0.0,
+            'ffmpeg_cpu_pct_per_stream': 100 * ffmpeg_cpu / stream_seconds if stream_seconds else 0.0,
+            'ffprobe_calls': ffprobe_calls,
+            'api_calls': dict(self.api.calls),
+            'rss_mb_before': rss_before,
+            'rss_mb_after': rss_after,
+            'peak_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+            'errors': dict(self.errors),
+            'handlers': handlers,
+        }
+
+def ffprobe_total() -> float:
+    return sum(modules['metrics'].FFPROBE_CALLS.values.values())
+
+def current_rss_mb():
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024)
+    except (OSError, ValueError):
+        return None
+
+# --- Reporting ---
+
+def print_report(r: dict):
+    print(f"\n{r['guilds']} guilds, {r['streams']} streams, {r['stream_seconds']:.0f} stream-seconds in {r['wall_seconds']:.1f}s")
+    print(f"{'handler':<22}{'calls':>6}{'ack p50':>9}{'ack p95':>9}{'done p50':>10}{'done p95':>10}{'missed':>8}{'deferred':>10}")
+    for name, h in sorted(r['handlers'].items()):
+        print(f"{name[:21]:<22}{h['calls']:>6}{h['ack_p50'] * 1000:>7.0f}ms{h['ack_p95'] * 1000:>7.0f}ms"
+              f"{h['done_p50'] * 1000:>8.0f}ms{h['done_p95'] * 1000:>8.0f}ms{h['missed']:>8}{h['auto_deferred']:>10}")
+    print(f"\nCPU per stream: bot {r['bot_cpu_pct_per_stream']:.2f}% + ffmpeg {r['ffmpeg_cpu_pct_per_stream']:.2f}% of a core")
+    print(f"ffprobe calls: {r['ffprobe_calls']:.0f} · Discord API calls: {sum(r['api_calls'].values())}")
+    rss_before = f"{r['rss_mb_before']:.1f}" if r['rss_mb_before'] is not None else "n/a"
+    rss_after = f"{r['rss_mb_after']:.1f}" if r['rss_mb_after'] is not None else "n/a"
+    print(f"Memory: RSS {rss_before} -> {rss_after} MB, peak {r['peak_rss_mb']:.1f} MB")
+    for error, count in r['errors'].items():
+        print(f"ERROR x{count}: {error}")
+
+def compare(current: dict, baseline: dict, tolerance: float) -> list:
+    """Returns a line for every figure that got worse than the baseline by more than the tolerance."""
+    regressions = []
+
+    def check(label, now, before, floor):
+        # floor ignores noise on tiny values (e.g. 3ms -> 5ms)
+        if before is None or now is None:
+            return
+        if now > before * (1 + tolerance) and now - before > floor:
+            regressions.append(f"{label}: {before:.4g} -> {now:.4g}")
+
+    check("bot CPU %/stream", current['bot_cpu_pct_per_stream'], baseline.get('bot_cpu_pct_per_stream'), 0.5)
+    check("ffmpeg CPU %/stream", current['ffmpeg_cpu_pct_per_stream'], baseline.get('ffmpeg_cpu_pct_per_stream'), 0.5)
+    check("ffprobe calls", current['ffprobe_calls'], baseline.get('ffprobe_calls'), 2)
+    check("peak RSS MB", current['peak_rss_mb'], baseline.get('peak_rss_mb'), 10)
+    for name, h in current['handlers'].items():
+        before = baseline.get('handlers', {}).get(name)
+        if not before:
+            continue
+        check(f"{name} ack p95", h['ack_p95'], before.get('ack_p95'), 0.05)
+        check(f"{name} done p95", h['done_p95'], before.get('done_p95'), 0.1)
+        check(f"{name} missed", h['missed'], before.get('missed'), 0)
+    return regressions
+
+modules = {}
+
+def load_bot_modules(args):
+    # config values are read at import time, so apply the overrides before the cogs load
+    config.AUDIOBOOK_PATH = args.library
+    config.CATALOG_SNAPSHOT_PATH = ""  # Measure a cold catalog, and never overwrite the bot's snapshot
+    config.RESUME_JOURNAL_PATH = ""  # Fake users must not end up in the bot's resume journal
+    config.SYNOPSIS_INDEX_PATH = ""
+    config.AUDIO_ENCODER = args.encoder
+    if args.max_streams is not None:
+        config.MAX_CONCURRENT_STREAMS = args.max_streams
+    for name in ('metrics', 'ack_tracker', 'player_cog'):
+        modules[name] = importlib.import_module(f"cogs.{name}")
+    return modules
+
+async def run(args) -> dict:
+    harness = Harness(args)
+    return await harness.run()
+
+def main():
+    parser = argparse.ArgumentParser(description="Drive the bot's commands and views for N fake guilds without Discord.")
+    parser.add_argument('--library', default=config.AUDIOBOOK_PATH, help="Audiobook library to play from")
+    parser.add_argument('--guilds', type=int, default=10, help="Simulated guilds running the scenario concurrently")
+    parser.add_argument('--stagger', type=float, default=0.2, help="Seconds between guild starts")
+    parser.add_argument('--play-seconds', type=float, default=12, help="Roughly how long each guild listens")
+    parser.add_argument('--api-latency', type=float, default=0.08, help="Mean simulated Discord API round-trip in seconds")
+    parser.add_argument('--voice-connect-latency', type=float, default=0.3)
+    parser.add_argument('--encoder', choices=('python', 'ffmpeg'), default=config.AUDIO_ENCODER)
+    parser.add_argument('--max-streams', type=int, default=None, help="Override MAX_CONCURRENT_STREAMS")
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--json', help="Write the results to this file")
+    parser.add_argument('--baseline', help="Compare against results saved with --json")
+    parser.add_argument('--tolerance', type=float, default=0.25, help="Allowed relative regression against the baseline")
+    parser.add_argument('--log-level', default="WARNING")
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.library):
+        print(f"Library not found: {args.library}")
+        return 1
+
+    logging.basicConfig(level=args.log_level, format='%(asctime)s - %(levelname)-8s - %(name)s - %(message)s')
+    load_bot_modules(args)
+    result = asyncio.run(run(args))
+    print_report(result)
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(result, f, indent=2)
+        print(f"\nSaved results to {args.json}")
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare(result, baseline, args.tolerance)
+        if regressions:
+            print(f"\nRegressions against {args.baseline} (tolerance {args.tolerance:.0%}):")
+            for line in regressions:
+                print(f"  {line}")
+            return 1
+        print(f"\nNo regressions against {args.baseline}.")
+    return 1 if result['errors'] else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
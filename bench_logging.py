@@ -0,0 +1,102 @@
+# bench_logging.py
+"""
+Measures event loop latency while the bot-style log traffic is being written.
+
+Three modes are compared:
+  off    - logging disabled
+  sync   - the old setup: RotatingFileHandler writing on the event loop thread
+  queue  - logging_setup.setup_logging: QueueHandler + QueueListener thread
+
+A ticker task sleeps for a fixed interval and records how late it wakes up (loop lag)
+while a producer task logs a burst of records every few milliseconds.
+
+Usage:
+  python bench_logging.py --seconds 10 --burst 50
+"""
+import argparse
+import asyncio
+import logging
+import logging.handlers
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+import logging_setup
+
+TICK = 0.005
+
+async def measure(seconds: float, burst: int, logger: logging.Logger) -> dict:
+    lags = []
+    records = 0
+    stop_at = time.perf_counter() + seconds
+
+    async def ticker():
+        while time.perf_counter() < stop_at:
+            expected = time.perf_counter() + TICK
+            await asyncio.sleep(TICK)
+            lags.append(max(0.0, time.perf_counter() - expected))
+
+    async def producer():
+        nonlocal records
+        payload = {'guild': 123456789012345678, 'channel': 'General', 'clients': [('Guild', 'General')] * 5}
+        while time.perf_counter() < stop_at:
+            for i in range(burst):
+                logger.info("Play audio request - Guild: %s (%s), state: %s", 'Test Guild', i, payload)
+                logger.debug("Removed expired message from tracking %d", i)
+            records += burst * 2
+            await asyncio.sleep(TICK)
+
+    await asyncio.gather(ticker(), producer())
+    lags.sort()
+    return {
+        'records_per_sec': records / seconds,
+        'p50_ms': 1000 * lags[len(lags) // 2],
+        'p99_ms': 1000 * lags[int(len(lags) * 0.99)],
+        'max_ms': 1000 * lags[-1],
+        'mean_ms': 1000 * statistics.fmean(lags),
+    }
+
+def configure(mode: str, log_file: str):
+    root = logging.getLogger()
+    logging_setup.stop_logging()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+        handler.close()
+    logging.disable(logging.NOTSET)
+
+    if mode == 'off':
+        logging.disable(logging.CRITICAL)
+    elif mode == 'sync':
+        root.setLevel(logging.DEBUG)
+        handler = logging.handlers.RotatingFileHandler(log_file, encoding='utf-8', maxBytes=5 * 1024 * 1024, backupCount=5)
+        handler.setFormatter(logging.Formatter(logging_setup.LOG_FORMAT))
+        root.addHandler(handler)
+    else:
+        logging_setup.setup_logging(log_file=log_file)
+        # Benchmark only the file path; the console would dominate the numbers
+        for handler in logging_setup._listener.handlers:
+            if isinstance(handler, logging.StreamHandler) and not isinstance(handler, logging.FileHandler):
+                handler.setLevel(logging.CRITICAL + 1)
+
+def main():
+    parser = argparse.ArgumentParser(description="Event loop lag with logging on and off.")
+    parser.add_argument('--seconds', type=float, default=10, help="Seconds per mode")
+    parser.add_argument('--burst', type=int, default=50, help="Records logged per 5ms tick")
+    parser.add_argument('--modes', default="off,sync,queue")
+    args = parser.parse_args()
+
+    logger = logging.getLogger('cogs.playback_handler')
+    with tempfile.TemporaryDirectory() as tmp:
+        print(f"{'mode':<8}{'records/s':>12}{'p50 lag ms':>12}{'p99 lag ms':>12}{'max lag ms':>12}")
+        for mode in args.modes.split(','):
+            configure(mode, os.path.join(tmp, f"bench_{mode}.log"))
+            result = asyncio.run(measure(args.seconds, args.burst, logger))
+            print(f"{mode:<8}{result['records_per_sec']:>12.0f}{result['p50_ms']:>12.2f}{result['p99_ms']:>12.2f}{result['max_ms']:>12.2f}")
+        logging_setup.stop_logging()
+        for handler in list(logging.getLogger().handlers):
+            handler.close()
+
+if __name__ == "__main__":
+    sys.exit(main())
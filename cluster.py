@@ -0,0 +1,240 @@
+# cluster.py
+"""
+Runs the bot as a cluster of worker processes, each owning a contiguous range of shards.
+
+The coordinator (this process):
+  - builds the shared SQLite library index once, so workers never scan AUDIOBOOK_PATH themselves
+  - starts one worker per shard range and restarts workers that exit or stop sending heartbeats
+  - aggregates worker health (guilds, latency, sessions, streams) into the log and cluster_health.json
+  - rebuilds the library index in the background every INDEX_REFRESH_INTERVAL seconds
+  - measures the loudness and silences of new or modified chapter files after each index build
+
+To spread a bot over several machines, run one coordinator per machine with a different --shards range
+and the same --total-shards.
+
+Usage:
+  python cluster.py --workers 4
+  python cluster.py --workers 2 --shards 0-15 --total-shards 32
+  python cluster.py --index-only
+"""
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import queue
+import threading
+import time
+import urllib.request
+
+from config import BOT_TOKEN, AUDIOBOOK_PATH, HEARTBEAT_INTERVAL, HEARTBEAT_TIMEOUT, INDEX_REFRESH_INTERVAL, LOUDNESS_NORMALIZATION, SILENCE_ANALYSIS
+from logging_setup import setup_logging
+
+log = logging.getLogger(__name__)
+
+DEFAULT_INDEX_PATH = "library_index.db"
+HEALTH_FILE = "cluster_health.json"
+
+def fetch_recommended_shards(token: str) -> int:
+    """Asks Discord how many shards the bot should run."""
+    request = urllib.request.Request(
+        "https://discord.com/api/v10/gateway/bot",
+        headers={"Authorization": f"Bot {token}", "User-Agent": "AudiobookBot cluster"}
+    )
+    with urllib.request.urlopen(request, timeout=10) as response:
+        return int(json.load(response)['shards'])
+
+def parse_shard_range(text: str) -> list:
+    first, _, last = text.partition('-')
+    return list(range(int(first), int(last or first) + 1))
+
+def split_shards(shard_ids: list, workers: int) -> list:
+    """Splits shard ids into contiguous, near-equal chunks."""
+    workers = max(1, min(workers, len(shard_ids)))
+    size, extra = divmod(len(shard_ids), workers)
+    chunks, start = [], 0
+    for i in range(workers):
+        end = start + size + (1 if i < extra else 0)
+        chunks.append(shard_ids[start:end])
+        start = end
+    return chunks
+
+class Coordinator:
+    def __init__(self, shard_ranges: list, shard_count: int, index_path: str):
+        self.ctx = multiprocessing.get_context('spawn')
+        self.status_queue = self.ctx.Queue()
+        self.shard_count = shard_count
+        self.index_path = index_path
+        self.workers = {
+            cluster_id: {'shard_ids': shard_ids, 'process': None, 'started': 0, 'restarts': 0, 'restart_at': 0, 'health': None}
+            for cluster_id, shard_ids in enumerate(shard_ranges)
+        }
+        self._index_thread = None
+
+    def build_index(self, analyze: bool = True):
+        from cogs import library_index
+        try:
+            library_index.build_index(AUDIOBOOK_PATH, self.index_path)
+        except Exception:
+            log.exception("Failed to build library index.")
+            return
+        if analyze and LOUDNESS_NORMALIZATION:
+            try:
+                library_index.analyze_loudness(self.index_path)
+            except Exception:
+                log.exception("Loudness analysis failed.")
+        if analyze and SILENCE_ANALYSIS:
+            from cogs import silence_map
+            try:
+                silence_map.analyze_silences(self.index_path)
+            except Exception:
+                log.exception("Silence analysis failed.")
+
+    def _refresh_index_in_background(self):
+        if self._index_thread and self._index_thread.is_alive():
+            return
+        self._index_thread = threading.Thread(target=self.build_index, name="index-refresh", daemon=True)
+        self._index_thread.start()
+
+    def start_worker(self, cluster_id: int):
+        from main import run_worker
+        worker = self.workers[cluster_id]
+        process = self.ctx.Process(
+            target=run_worker,
+            args=(cluster_id, worker['shard_ids'], self.shard_count, self.status_queue),
+            name=f"cluster-{cluster_id}",
+            daemon=False
+        )
+        process.start()
+        worker.update(process=process, started=time.time(), health=None)
+        log.info("Started worker %s (pid %s) for shards %s-%s.", cluster_id, process.pid, worker['shard_ids'][0], worker['shard_ids'][-1])
+
+    def drain_status(self):
+        while True:
+            try:
+                health = self.status_queue.get_nowait()
+            except queue.Empty:
+                return
+            worker = self.workers.get(health.get('cluster_id'))
+            if worker and worker['process'] and health.get('pid') == worker['process'].pid:
+                worker['health'] = health
+
+    def check_workers(self):
+        now = time.time()
+        for cluster_id, worker in self.workers.items():
+            process = worker['process']
+            if process is None:
+                if now >= worker['restart_at']:
+                    self.start_worker(cluster_id)
+                continue
+
+            last_seen = worker['health']['time'] if worker['health'] else worker['started']
+            if process.is_alive() and now - last_seen > HEARTBEAT_TIMEOUT:
+                log.error("Worker %s (pid %s) sent no heartbeat for %.0fs. Restarting it.", cluster_id, process.pid, now - last_seen)
+                process.terminate()
+                process.join(10)
+                if process.is_alive():
+                    process.kill()
+                    process.join()
+
+            if not process.is_alive():
+                worker['restarts'] += 1
+                backoff = min(60, 2 ** min(worker['restarts'], 6))
+                log.error("Worker %s exited with code %s. Restarting in %ss (restart #%s).", cluster_id, process.exitcode, backoff, worker['restarts'])
+                worker.update(process=None, restart_at=now + backoff, health=None)
+
+    def aggregate(self) -> dict:
+        healths = [w['health'] for w in self.workers.values() if w['health']]
+        latencies = [h['latency'] for h in healths if h.get('latency') is not None]
+        totals = {
+            'time': time.time(),
+            'workers': len(self.workers),
+            'workers_alive': sum(1 for w in self.workers.values() if w['process'] and w['process'].is_alive()),
+            'workers_ready': sum(1 for h in healths if h.get('ready')),
+            'restarts': sum(w['restarts'] for w in self.workers.values()),
+            'shard_count': self.shard_count,
+            'avg_latency': sum(latencies) / len(latencies) if latencies else None,
+        }
+        for key in ('guilds', 'sessions', 'playing', 'paused', 'voice_clients', 'ffmpeg_processes', 'queued_streams'):
+            totals[key] = sum(h.get(key, 0) for h in healths)
+        totals['per_worker'] = {
+            cluster_id: {'shard_ids': [w['shard_ids'][0], w['shard_ids'][-1]], 'restarts': w['restarts'], 'health': w['health']}
+            for cluster_id, w in self.workers.items()
+        }
+        return totals
+
+    def run(self):
+        self.build_index(analyze=False)
+        for cluster_id in self.workers:
+            self.start_worker(cluster_id)
+        # The first analysis pass over a large library takes a while; workers play without gains or skips until it's done
+        self._refresh_index_in_background()
+
+        next_report = time.time() + HEARTBEAT_INTERVAL
+        next_index_refresh = time.time() + INDEX_REFRESH_INTERVAL
+        try:
+            while True:
+                time.sleep(1)
+                self.drain_status()
+                self.check_workers()
+
+                now = time.time()
+                if now >= next_report:
+                    next_report = now + HEARTBEAT_INTERVAL
+                    totals = self.aggregate()
+                    log.info(
+                        "Cluster health: %s/%s workers ready, %s guilds, %s sessions, %s streams, %s restarts",
+                        totals['workers_ready'], totals['workers'], totals['guilds'],
+                        totals['sessions'], totals['ffmpeg_processes'], totals['restarts']
+                    )
+                    try:
+                        with open(HEALTH_FILE, 'w', encoding='utf-8') as f:
+                            json.dump(totals, f, indent=2)
+                    except OSError as e:
+                        log.warning("Could not write %s: %s", HEALTH_FILE, e)
+                if now >= next_index_refresh:
+                    next_index_refresh = now + INDEX_REFRESH_INTERVAL
+                    self._refresh_index_in_background()
+        except KeyboardInterrupt:
+            log.info("Shutting down cluster...")
+        finally:
+            for worker in self.workers.values():
+                if worker['process'] and worker['process'].is_alive():
+                    worker['process'].terminate()
+            for worker in self.workers.values():
+                if worker['process']:
+                    worker['process'].join(15)
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the audiobook bot as a multi-process cluster.")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help="Worker processes on this machine")
+    parser.add_argument('--total-shards', type=int, help="Total shards across all machines (default: Discord's recommendation)")
+    parser.add_argument('--shards', help="Shard id range run by this machine, e.g. 0-15 (default: all shards)")
+    parser.add_argument('--index', default=os.getenv("LIBRARY_INDEX_PATH") or DEFAULT_INDEX_PATH, help="Path of the shared library index")
+    parser.add_argument('--index-only', action='store_true', help="Build the library index and exit")
+    args = parser.parse_args()
+
+    setup_logging(log_file="bot_activity.coordinator.log")
+    # Workers are spawned fresh and read config from the environment
+    os.environ['LIBRARY_INDEX_PATH'] = os.path.abspath(args.index)
+
+    if args.index_only:
+        Coordinator([], 0, args.index).build_index()
+        return
+
+    if not BOT_TOKEN:
+        log.critical("!!! BOT_TOKEN NOT FOUND !!! Check your .env and config.py file.")
+        return
+
+    shard_count = args.total_shards or fetch_recommended_shards(BOT_TOKEN)
+    shard_ids = parse_shard_range(args.shards) if args.shards else list(range(shard_count))
+    if not shard_ids or shard_ids[-1] >= shard_count:
+        log.critical("Shard range %s does not fit in %s total shards.", args.shards, shard_count)
+        return
+
+    shard_ranges = split_shards(shard_ids, args.workers)
+    log.info("Starting cluster: %s workers for shards %s-%s of %s.", len(shard_ranges), shard_ids[0], shard_ids[-1], shard_count)
+    Coordinator(shard_ranges, shard_count, args.index).run()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+# cogs/ack_tracker.py
+import nextcord as discord
+import asyncio
+import collections
+import functools
+import logging
+import time
+
+from config import ACK_BUDGET
+from . import metrics
+from . import loop_monitor
+
+log = logging.getLogger(__name__)
+
+ACK_AUTO_DEFERRED = metrics.Counter(
+    'audiobot_interaction_auto_deferred_total', 'Interactions deferred automatically to meet the ack deadline.', labelnames=('handler', 'reason')
+)
+
+class HandlerStats:
+    def __init__(self):
+        self.predicted_work = 0.0  # EWMA of seconds spent before the handler responds
+        self.latencies = collections.deque(maxlen=500)
+        self.calls = 0
+        self.missed = 0
+        self.auto_deferred = 0
+
+    def record_work(self, seconds: float, alpha: float = 0.3):
+        if self.calls == 0:
+            self.predicted_work = seconds
+        else:
+            self.predicted_work = alpha * seconds + (1 - alpha) * self.predicted_work
+
+    def percentiles(self) -> dict:
+        if not self.latencies:
+            return {'p50': 0.0, 'p95': 0.0, 'p99': 0.0, 'max': 0.0}
+        ordered = sorted(self.latencies)
+        last = len(ordered) - 1
+        return {'p50': ordered[int(last * 0.5)], 'p95': ordered[int(last * 0.95)], 'p99': ordered[int(last * 0.99)], 'max': ordered[-1]}
+
+stats = collections.defaultdict(HandlerStats)  # key: handler name
+
+# Per-interaction bookkeeping, keyed by interaction id
+_pending = {}  # value: {'handler', 'start', 'acked_at', 'acking', 'ephemeral', 'auto_deferred'}
+
+def _interaction_age(interaction) -> float:
+    return max(0.0, time.time() - interaction.created_at.timestamp())
+
+def _mark_acked(interaction):
+    state = _pending.get(interaction.id)
+    if state is None or state['acked_at'] is not None:
+        return
+    state['acked_at'] = time.perf_counter()
+    latency = _interaction_age(interaction)
+    handler_stats = stats[state['handler']]
+    handler_stats.latencies.append(latency)
+    metrics.INTERACTION_ACK_SECONDS.observe(latency, handler=state['handler'])
+    if latency > metrics.ACK_DEADLINE:
+        handler_stats.missed += 1
+        metrics.INTERACTION_ACK_MISSED.inc(handler=state['handler'])
+        log.warning("'%s' acknowledged after %.2fs, past Discord's %.0fs deadline.", state['handler'], latency, metrics.ACK_DEADLINE)
+
+async def _auto_defer(interaction, reason: str):
+    state = _pending.get(interaction.id)
+    if state is None or state['acking'] or interaction.response.is_done():
+        return
+    state['acking'] = True
+    try:
+        if interaction.type == discord.InteractionType.application_command:
+            await interaction.response.defer(ephemeral=state['ephemeral'])
+        else:
+            # Components get a deferred update, so the handler can still edit the original message
+            await interaction.response.defer()
+        _mark_acked(interaction)
+        state['auto_deferred'] = True
+        stats[state['handler']].auto_deferred += 1
+        ACK_AUTO_DEFERRED.inc(handler=state['handler'], reason=reason)
+        log.info("Auto-deferred '%s' (%s).", state['handler'], reason)
+    except discord.HTTPException as e:
+        log.warning("Auto-defer of '%s' failed: %s", state['handler'], e)
+    finally:
+        state['acking'] = False
+
+async def _deferral_guard(interaction, budget: float):
+    # Only helps while the handler is awaiting; synchronous blocking is covered by the prediction
+    await asyncio.sleep(max(0.0, budget - _interaction_age(interaction)))
+    await _auto_defer(interaction, "budget exceeded")
+
+def tracked(handler: str, ephemeral: bool = True):
+    """
+    Wraps a component callback or slash command so that:
+      - time-to-ack is recorded per handler (percentiles, metrics, missed deadlines)
+      - the interaction is deferred up front when this handler usually takes longer than ACK_BUDGET
+      - it is deferred anyway if the handler is still working when the budget runs out
+    Handlers must respond through the helpers below, which adapt once an interaction was deferred.
+    ephemeral is used when auto-deferring a slash command.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(self, interaction, *args, **kwargs):
+            loop_monitor.annotate(interaction, handler)
+            handler_stats = stats[handler]
+            _pending[interaction.id] = {'handler': handler, 'start': time.perf_counter(), 'acked_at': None, 'acking': False, 'ephemeral': ephemeral, 'auto_deferred': False}
+            guard = None
+            try:
+                if handler_stats.predicted_work > ACK_BUDGET:
+                    await _auto_defer(interaction, f"predicted {handler_stats.predicted_work:.1f}s")
+                else:
+                    guard = asyncio.create_task(_deferral_guard(interaction, ACK_BUDGET))
+                return await func(self, interaction, *args, **kwargs)
+            finally:
+                if guard:
+                    guard.cancel()
+                state = _pending.pop(interaction.id, None)
+                if state:
+                    # Work before the first response; if we deferred for it, the whole run counts
+                    end = state['acked_at'] if state['acked_at'] and not state['auto_deferred'] else time.perf_counter()
+                    handler_stats.record_work(end - state['start'])
+                    handler_stats.calls += 1
+                    if state['acked_at'] is None and not interaction.response.is_done():
+                        handler_stats.missed += 1
+                        metrics.INTERACTION_ACK_MISSED.inc(handler=handler)
+                        log.warning("'%s' finished without acknowledging the interaction.", handler)
+        return wrapper
+    return decorator
+
+# --- Response Helpers ---
+
+async def _respond(interaction, first_response, fallback):
+    """Uses the initial response if it is still available, otherwise the post-ack equivalent."""
+    state = _pending.get(interaction.id)
+    # Wait for an in-flight auto-defer so we don't race it for the initial response
+    while state and state['acking']:
+        await asyncio.sleep(0.01)
+    if interaction.response.is_done():
+        return await fallback()
+    if state:
+        state['acking'] = True
+    try:
+        result = await first_response()
+    finally:
+        if state:
+            state['acking'] = False
+    _mark_acked(interaction)
+    return result
+
+async def edit_message(interaction, **kwargs):
+    """interaction.response.edit_message, or edit_original_message after a deferral."""
+    return await _respond(
+        interaction,
+        lambda: interaction.response.edit_message(**kwargs),
+        lambda: interaction.edit_original_message(**kwargs)
+    )
+
+async def send_message(interaction, content=None, **kwargs):
+    """interaction.response.send_message, or a followup after a deferral."""
+    return await _respond(
+        interaction,
+        lambda: interaction.response.send_message(content, **kwargs),
+        lambda: interaction.followup.send(content, **kwargs)
+    )
+
+async def defer(interaction, **kwargs):
+    """interaction.response.defer, or nothing if the interaction was already acknowledged."""
+    async def already_acked():
+        return None
+    return await _respond(interaction, lambda: interaction.response.defer(**kwargs), already_acked)
+
+def report() -> list:
+    """Per-handler ack latency percentiles, missed deadlines and auto-deferrals."""
+    rows = []
+    for handler, handler_stats in sorted(stats.items()):
+        rows.append({
+            'handler': handler,
+            'calls': handler_stats.calls,
+            'predicted_work': handler_stats.predicted_work,
+            'missed': handler_stats.missed,
+            'auto_deferred': handler_stats.auto_deferred,
+            **handler_stats.percentiles(),
+        })
+    return rows
@@ -2,13 +2,19 @@
 import os
 import subprocess
 import json
+import re
 import logging
+import time
+import xml.etree.ElementTree as ET
 from mutagen.mp4 import MP4
+from . import metrics
 
 log = logging.getLogger(__name__)
 
-def _run_ffprobe(file_path: str) -> dict:
+def _run_ffprobe(file_path: str, show_chapters: bool = False) -> dict:
     """Runs ffprobe on a file and returns the JSON output."""
+    start = time.perf_counter()
+    result_label = 'ok'
     try:
         if os.name == 'nt' and not file_path.startswith('\\\\?\\'):
             file_path = '\\\\?\\' + os.path.abspath(file_path)
@@ -19,6 +25,7 @@ def _run_ffprobe(file_path: str) -> dict:
             '-print_format', 'json',
             '-show_format',
             '-show_streams',
+            *(['-show_chapters'] if show_chapters else []),
             file_path
         ]
         result = subprocess.run(
@@ -31,17 +38,24 @@ def _run_ffprobe(file_path: str) -> dict:
         )
         return json.loads(result.stdout)
     except FileNotFoundError:
+        result_label = 'not_found'
         log.critical("!!! ffprobe not found! Make sure FFmpeg is installed and in your system's PATH. !!!")
         return {}
     except subprocess.TimeoutExpired:
-        log.error(f"ffprobe timed out for file {file_path}")
+        result_label = 'timeout'
+        log.error("ffprobe timed out for file %s", file_path)
         return {}
     except subprocess.CalledProcessError as e:
-        log.error(f"ffprobe failed for file {file_path}: {e.stderr}")
+        result_label = 'error'
+        log.error("ffprobe failed for file %s: %s", file_path, e.stderr)
         return {}
     except json.JSONDecodeError:
-        log.error(f"Failed to decode JSON from ffprobe for file {file_path}")
+        result_label = 'bad_json'
+        log.error("Failed to decode JSON from ffprobe for file %s", file_path)
         return {}
+    finally:
+        metrics.FFPROBE_CALLS.inc(result=result_label)
+        metrics.FFPROBE_SECONDS.observe(time.perf_counter() - start)
 
 def get_book_title_from_data(data, file_path):
     tags = data.get('format', {}).get('tags', {})
@@ -57,10 +71,117 @@ def get_track_number_from_data(data, file_path):
         try:
             return int(track_str.split('/')[0])
         except (ValueError, IndexError):
-            log.warning(f"Could not parse track number '{track_str}' for {file_path}.")
+            log.warning("Could not parse track number '%s' for %s.", track_str, file_path)
             return 0
     return 0
 
+def get_duration_from_data(data, file_path):
+    duration_str = data.get('format', {}).get('duration', '0')
+    try:
+        return float(duration_str)
+    except (ValueError, TypeError):
+        log.warning("Could not parse duration for %s", file_path)
+        return 0.0
+
+def get_synopsis_from_data(data):
+    tags = data.get('format', {}).get('tags', {})
+    synopsis = tags.get('synopsis', tags.get('description', tags.get('comment')))
+    return synopsis.replace('\\n', '\n') if synopsis else None
+
+def get_chapter_metadata(file_path: str) -> dict:
+    """Reads title, track number, duration and synopsis of a chapter file with a single ffprobe call."""
+    data = _run_ffprobe(file_path)
+    return {
+        'title': get_book_title_from_data(data, file_path),
+        'track': get_track_number_from_data(data, file_path),
+        'duration': get_duration_from_data(data, file_path),
+        'synopsis': get_synopsis_from_data(data),
+    }
+
+def _parse_timestamp(value: str) -> float:
+    """Parses "HH:MM:SS.mmm" (or plain seconds) into seconds."""
+    seconds = 0.0
+    for part in value.strip().split(':'):
+        seconds = seconds * 60 + float(part)
+    return seconds
+
+def get_audible_chapter_starts(file_path: str) -> list:
+    """Returns [(title, start seconds)] from the '----:com.audible:chapters' XML, or [] if the file has none."""
+    try:
+        audio = MP4(file_path)
+        raw = (audio.tags or {}).get("----:com.audible:chapters")
+        if not raw:
+            return []
+        root = ET.fromstring(bytes(raw[0]).decode('utf-8'))
+    except Exception as e:
+        log.warning("Could not read Audible chapter XML from %s: %s", file_path, e)
+        return []
+    namespace = root.tag.split('}')[0] + '}' if '}' in root.tag else ''
+    starts = []
+    for point in root.iter(f'{namespace}ChapterPoint'):
+        title = point.findtext(f'{namespace}Title')
+        start = point.findtext(f'{namespace}StartTime')
+        try:
+            starts.append((title or f"Chapter {len(starts) + 1}", _parse_timestamp(start)))
+        except (AttributeError, ValueError):
+            log.warning("Skipping Audible chapter with unreadable start time %r in %s", start, file_path)
+    return sorted(starts, key=lambda item: item[1])
+
+def get_embedded_chapters(file_path: str) -> list:
+    """
+    Reads the chapter table of a single-file book as [{'title', 'start', 'duration'}].
+    ffprobe's -show_chapters covers Nero chapter atoms and QuickTime chapter tracks; the Audible
+    chapter XML is the fallback. Returns [] if the file has fewer than two chapters.
+    """
+    data = _run_ffprobe(file_path, show_chapters=True)
+    chapters = []
+    for index, chapter in enumerate(data.get('chapters', [])):
+        try:
+            start = float(chapter.get('start_time', 0))
+            end = float(chapter.get('end_time', start))
+        except (ValueError, TypeError):
+            continue
+        title = chapter.get('tags', {}).get('title') or f"Chapter {index + 1}"
+        chapters.append({'title': title, 'start': start, 'duration': max(0.0, end - start)})
+
+    if len(chapters) < 2:
+        starts = get_audible_chapter_starts(file_path)
+        total = get_duration_from_data(data, file_path)
+        ends = [start for _, start in starts[1:]] + [total]
+        chapters = [
+            {'title': title, 'start': start, 'duration': max(0.0, end - start)}
+            for (title, start), end in zip(starts, ends)
+        ]
+    return chapters if len(chapters) >= 2 else []
+
+_EBUR128_SUMMARY = re.compile(r'Integrated loudness:\s*I:\s*(-?[\d.]+|-inf)\s*LUFS.*?True peak:\s*Peak:\s*(-?[\d.]+|-inf)\s*dBFS', re.DOTALL)
+
+def measure_loudness(file_path: str, timeout: float = 3600) -> dict:
+    """
+    Measures EBU R128 integrated loudness (LUFS) and true peak (dBTP) by decoding the whole file
+    through ffmpeg's ebur128 filter. Slow (a full decode), so it's meant for offline analysis.
+    Returns {'integrated', 'true_peak'} or None if ffmpeg failed or the file is silent.
+    """
+    start = time.perf_counter()
+    command = ['ffmpeg', '-hide_banner', '-nostats', '-i', file_path, '-vn', '-af', 'ebur128=peak=true:framelog=verbose', '-f', 'null', '-']
+    try:
+        result = subprocess.run(command, capture_output=True, text=True, encoding='utf-8', errors='replace', timeout=timeout)
+    except FileNotFoundError:
+        log.critical("!!! ffmpeg not found! Make sure FFmpeg is installed and in your system's PATH. !!!")
+        return None
+    except subprocess.TimeoutExpired:
+        log.error("Loudness analysis timed out for file %s", file_path)
+        return None
+    finally:
+        metrics.LOUDNESS_ANALYSIS_SECONDS.observe(time.perf_counter() - start)
+    # framelog=verbose keeps the per-frame lines out of stderr; only the summary is printed
+    summary = result.stderr.rpartition('Summary:')[2]
+    match = _EBUR128_SUMMARY.search(summary)
+    if result.returncode != 0 or not match or '-inf' in match.groups():
+        log.warning("Could not measure loudness of %s (ffmpeg exit code %s).", file_path, result.returncode)
+        return None
+    return {'integrated': float(match.group(1)), 'true_peak': float(match.group(2))}
+
 def get_book_title(file_path: str) -> str:
     """Gets the title from a media file's metadata using ffprobe."""
     data = _run_ffprobe(file_path)
@@ -73,34 +194,34 @@ def get_book_title(file_path: str) -> str:
 
 def get_synopsis(book_path: str) -> str:
     """Gets the synopsis from the first chapter file of a book using ffprobe."""
-    log.debug(f"Attempting to get synopsis for book path: {book_path}")
+    log.debug("Attempting to get synopsis for book path: %s", book_path)
     try:
         chapter_files = sorted([f for f in os.listdir(book_path) if f.endswith('.m4b')])
         if not chapter_files:
-            log.warning(f"No .m4b files found in {book_path} to get synopsis from.")
+            log.warning("No .m4b files found in %s to get synopsis from.", book_path)
             return "No chapter files found to read synopsis from."
 
         first_chapter_file = chapter_files[0]
         full_path = os.path.join(book_path, first_chapter_file)
-        log.debug(f"Selected file for synopsis lookup: {full_path}")
+        log.debug("Selected file for synopsis lookup: %s", full_path)
 
         data = _run_ffprobe(full_path)
         if not data:
-            log.error(f"ffprobe returned no data for synopsis file: {full_path}")
+            log.error("ffprobe returned no data for synopsis file: %s", full_path)
             return "Could not read metadata from chapter file."
 
         tags = data.get('format', {}).get('tags', {})
         synopsis = tags.get('synopsis', tags.get('description', tags.get('comment')))
       
         if synopsis:
-            log.info(f"Successfully found synopsis for {book_path}.")
+            log.info("Successfully found synopsis for %s.", book_path)
             return synopsis.replace('\\n', '\n')
         else:
-            log.warning(f"No synopsis, description, or comment tag found for {full_path}.")
+            log.warning("No synopsis, description, or comment tag found for %s.", full_path)
             return "No synopsis available in the file's metadata."
 
     except Exception as e:
-        log.error(f"An unexpected error occurred while getting synopsis for {book_path}: {e}", exc_info=True)
+        log.error("An unexpected error occurred while getting synopsis for %s: %s", book_path, e, exc_info=True)
         return "An error occurred while trying to retrieve the synopsis."
 
 def extract_cover_image(file_path, output_path=None):
@@ -121,7 +242,7 @@ def extract_cover_image(file_path, output_path=None):
         else:
             return None
     except Exception as e:
-        log.error(f"Failed to extract cover image from {file_path}: {e}")
+        log.error("Failed to extract cover image from %s: %s", file_path, e)
         return None
 
 def get_track_number(file_path: str) -> int:
@@ -134,7 +255,7 @@ def get_track_number(file_path: str) -> int:
         try:
             return int(track_str.split('/')[0])
         except (ValueError, IndexError):
-            log.warning(f"Could not parse track number '{track_str}' for {file_path}.")
+            log.warning("Could not parse track number '%s' for %s.", track_str, file_path)
             return 0
     return 0
 
@@ -152,6 +273,7 @@ def get_books_and_series(audiobook_path: str) -> list:
     if not os.path.exists(audiobook_path):
         return items
 
+    start = time.perf_counter()
     for author_name in os.listdir(audiobook_path):
         author_path = os.path.join(audiobook_path, author_name)
         if not os.path.isdir(author_path):
@@ -194,7 +316,8 @@ def get_books_and_series(audiobook_path: str) -> list:
                     })
 
     items.sort(key=lambda x: x['title'])
-    log.info(f"Found {len(items)} items (books and series).")
+    metrics.LIBRARY_SCAN_SECONDS.observe(time.perf_counter() - start)
+    log.info("Found %s items (books and series).", len(items))
     return items
 
 def get_duration(file_path: str) -> float:
@@ -204,7 +327,7 @@ def get_duration(file_path: str) -> float:
     try:
         return float(duration_str)
     except (ValueError, TypeError):
-        log.warning(f"Could not parse duration for {file_path}")
+        log.warning("Could not parse duration for %s", file_path)
         return 0.0
 
 def format_time(seconds: float) -> str:
@@ -236,12 +359,12 @@ def get_previous_chapter(chapters: list, current_index: int) -> dict:
         return chapters[current_index - 1]
     return None
 
-def format_presence_text(chapter_path: str, book_path: str, elapsed_seconds: float = None, is_paused: bool = False) -> str:
+def format_presence_text(chapter_path: str, book_path: str, elapsed_seconds: float = None, is_paused: bool = False, chapter_title: str = None) -> str:
     """
     Formats text for Discord presence/status display.
     Returns a concise string suitable for bot status.
     """
-    chapter_title = get_book_title(chapter_path)
+    chapter_title = chapter_title or get_book_title(chapter_path)
     book_title = os.path.basename(book_path)
     
     # Truncate long titles to fit Discord's presence limits (128 chars max)
@@ -0,0 +1,512 @@
+# cogs/catalog.py
+import asyncio
+import logging
+import mmap
+import os
+import sqlite3
+import struct
+import threading
+import time
+
+from config import AUDIOBOOK_PATH, CATALOG_SNAPSHOT_PATH, CATALOG_RECONCILE_INTERVAL
+from . import audio_utils
+from . import library_index
+from . import metrics
+from .timeline import BookTimeline
+
+log = logging.getLogger(__name__)
+
+CATALOG_RECONCILE_SECONDS = metrics.Histogram(
+    'audiobot_catalog_reconcile_seconds', 'Time to reconcile the catalog snapshot with the disk.', buckets=(0.1, 0.5, 1, 5, 15, 60, 300, 1800)
+)
+
+# --- Snapshot Format ---
+# All integers little-endian. Strings are a u32 byte length followed by UTF-8.
+#   header:   magic, version, then the offsets of the four sections below
+#   dirs:     u32 count, then (path, i64 mtime_ns) for every library directory
+#   items:    u32 count, then (u8 type, title, path, author, u32 book count, (title, path) per book)
+#   books:    u32 count, then (path, i64 mtime_ns, u64 offset, u32 length, u32 chapter count)
+#   chapters: the chapter records of every book back to back, (filename, title, i32 track, f64 duration,
+#             f64 start); start is -1 for a whole chapter file and the offset into the file for a chapter
+#             of a single-file book
+# Only the header, dirs, items and book table are read at startup. A book's chapter records are
+# decoded from the memory map the first time that book is opened.
+
+MAGIC = b'ABCATLG\x00'
+VERSION = 2
+_HEADER = struct.Struct('<8sIQQQQ')
+_U8 = struct.Struct('<B')
+_U32 = struct.Struct('<I')
+_I32 = struct.Struct('<i')
+_I64 = struct.Struct('<q')
+_U64 = struct.Struct('<Q')
+_F64 = struct.Struct('<d')
+_ITEM_TYPES = ('book', 'series')
+
+def _pack_str(buf: bytearray, value: str):
+    data = (value or '').encode('utf-8')
+    buf += _U32.pack(len(data))
+    buf += data
+
+def _encode_chapters(chapters: list) -> bytes:
+    buf = bytearray()
+    for chapter in chapters:
+        _pack_str(buf, chapter['filename'])
+        _pack_str(buf, chapter['title'])
+        buf += _I32.pack(int(chapter['track']))
+        buf += _F64.pack(float(chapter['duration'] or 0.0))
+        start = chapter.get('start')
+        buf += _F64.pack(float(start) if start is not None else -1.0)
+    return bytes(buf)
+
+def _decode_chapters(data, offset: int, count: int) -> list:
+    reader = _Reader(data, offset)
+    chapters = []
+    for _ in range(count):
+        chapter = {'filename': reader.str(), 'title': reader.str(), 'track': reader.i32(), 'duration': reader.f64()}
+        start = reader.f64()
+        if start >= 0:
+            chapter['start'] = start
+        chapters.append(chapter)
+    return chapters
+
+class _Reader:
+    def __init__(self, data, offset: int = 0):
+        self.data = data
+        self.pos = offset
+
+    def _unpack(self, fmt: struct.Struct):
+        value = fmt.unpack_from(self.data, self.pos)[0]
+        self.pos += fmt.size
+        return value
+
+    def u8(self):
+        return self._unpack(_U8)
+
+    def u32(self):
+        return self._unpack(_U32)
+
+    def i32(self):
+        return self._unpack(_I32)
+
+    def i64(self):
+        return self._unpack(_I64)
+
+    def u64(self):
+        return self._unpack(_U64)
+
+    def f64(self):
+        return self._unpack(_F64)
+
+    def str(self) -> str:
+        length = self.u32()
+        value = bytes(self.data[self.pos:self.pos + length]).decode('utf-8')
+        self.pos += length
+        return value
+
+def _mtime_ns(path: str):
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+def _book_paths(items: list) -> list:
+    paths = []
+    for item in items:
+        if item['type'] == 'book':
+            paths.append(item['path'])
+        else:
+            paths.extend(book['path'] for book in item['books'])
+    return paths
+
+def _library_dirs(audiobook_path: str, items: list) -> list:
+    """Every directory whose mtime tells us something changed: the root, authors, series and books."""
+    dirs = {audiobook_path}
+    for item in items:
+        dirs.add(os.path.dirname(item['path']))
+        dirs.add(item['path'])
+        if item['type'] == 'series':
+            dirs.update(book['path'] for book in item['books'])
+    return sorted(dirs)
+
+class Catalog:
+    """
+    The library (items, series, books and chapters) kept in a memory-mapped binary snapshot,
+    so /audiobook can be served right after startup without scanning AUDIOBOOK_PATH.
+
+    Chapter lists are validated lazily: when a book is opened, its directory's mtime is compared
+    with the snapshot and the book is re-read only if it changed. A background task reconciles
+    the whole snapshot with the disk and rewrites it.
+
+    With a library index (cluster mode) the index is the source instead: the coordinator keeps it
+    in line with the disk, and books are versioned by their indexed chapter files, so a worker
+    never stats or scans AUDIOBOOK_PATH itself.
+    """
+    def __init__(self, audiobook_path: str = AUDIOBOOK_PATH, snapshot_path: str = CATALOG_SNAPSHOT_PATH):
+        self.audiobook_path = audiobook_path
+        self.snapshot_path = snapshot_path
+        self.items = None
+        self._dir_mtimes = {}  # key: directory path, value: mtime_ns when the snapshot was taken
+        self._book_index = {}  # key: book path, value: (mtime_ns, offset, length, chapter count) into the map
+        self._loaded = {}  # key: book path, value: (mtime_ns, chapters) decoded or freshly read
+        self._timelines = {}  # key: book path, value: (mtime_ns, BookTimeline)
+        self._book_versions = {}  # key: book path, value: version from the library index (used instead of the mtime)
+        self._index_built_at = None  # built_at of the index the catalog last reconciled with
+        self._mm = None
+        self._file = None
+        self._dirty = False
+        self._lock = threading.Lock()
+        self._reconcile_lock = threading.Lock()
+        self._task = None
+        self._listeners = []  # Called with the changed book paths, or None after a reload/reconcile
+
+    # --- Snapshot I/O ---
+
+    def load(self) -> bool:
+        """Maps the snapshot and reads its item list. Returns False if there is no usable snapshot."""
+        if not self.snapshot_path or not os.path.exists(self.snapshot_path):
+            return False
+        start = time.perf_counter()
+        f = mm = None
+        try:
+            f = open(self.snapshot_path, 'rb')
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            dir_mtimes, items, book_index = self._parse(mm)
+        except (OSError, ValueError, IndexError, struct.error, UnicodeDecodeError) as e:
+            # ValueError also covers mapping an empty file
+            log.warning("Ignoring unreadable catalog snapshot %s: %s", self.snapshot_path, e)
+            if mm is not None:
+                mm.close()
+            if f is not None:
+                f.close()
+            return False
+
+        book_versions = {}
+        if library_index.index_available():
+            try:
+                book_versions = library_index.book_versions()
+            except sqlite3.Error as e:
+                log.warning("Could not read book versions from the library index: %s", e)
+
+        with self._lock:
+            self._close_map()
+            self._file, self._mm = f, mm
+            self._dir_mtimes, self.items, self._book_index = dir_mtimes, items, book_index
+            self._book_versions = book_versions
+            self._loaded = {}
+            self._dirty = False
+        log.info("Loaded catalog snapshot with %s items and %s books in %.0fms.",
+                 len(items), len(book_index), (time.perf_counter() - start) * 1000)
+        return True
+
+    @staticmethod
+    def _parse(mm):
+        magic, version, dirs_offset, items_offset, books_offset, _ = _HEADER.unpack_from(mm, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"unsupported snapshot format {magic!r} v{version}")
+
+        reader = _Reader(mm, dirs_offset)
+        dir_mtimes = {}
+        for _ in range(reader.u32()):
+            path = reader.str()
+            dir_mtimes[path] = reader.i64()
+
+        reader.pos = items_offset
+        items = []
+        for _ in range(reader.u32()):
+            item = {'type': _ITEM_TYPES[reader.u8()], 'title': reader.str(), 'path': reader.str(), 'author': reader.str()}
+            books = [{'title': reader.str(), 'path': reader.str()} for _ in range(reader.u32())]
+            if item['type'] == 'series':
+                item['books'] = books
+            items.append(item)
+
+        reader.pos = books_offset
+        book_index = {}
+        for _ in range(reader.u32()):
+            path = reader.str()
+            book_index[path] = (reader.i64(), reader.u64(), reader.u32(), reader.u32())
+        return dir_mtimes, items, book_index
+
+    def _write(self, items: list, dir_mtimes: dict, books: dict):
+        """
+        Writes a new snapshot next to the old one and swaps it in.
+        books maps book path -> (mtime_ns, chapters list) or (mtime_ns, raw bytes, chapter count).
+        """
+        body = bytearray()
+        dirs_offset = _HEADER.size
+        body += _U32.pack(len(dir_mtimes))
+        for path, mtime in sorted(dir_mtimes.items()):
+            _pack_str(body, path)
+            body += _I64.pack(mtime)
+
+        items_offset = _HEADER.size + len(body)
+        body += _U32.pack(len(items))
+        for item in items:
+            body += _U8.pack(_ITEM_TYPES.index(item['type']))
+            _pack_str(body, item['title'])
+            _pack_str(body, item['path'])
+            _pack_str(body, item['author'])
+            series_books = item.get('books', []) if item['type'] == 'series' else []
+            body += _U32.pack(len(series_books))
+            for book in series_books:
+                _pack_str(body, book['title'])
+                _pack_str(body, book['path'])
+
+        blobs = []
+        for path, entry in books.items():
+            if len(entry) == 3:
+                mtime, raw, count = entry
+            else:
+                mtime, chapters = entry
+                raw, count = _encode_chapters(chapters), len(chapters)
+            blobs.append((path, mtime if mtime is not None else -1, raw, count))
+
+        # The book table has fixed-size fields, so its size (and the chapter region's start) is known up front
+        books_offset = _HEADER.size + len(body)
+        entry_size = _I64.size + _U64.size + 2 * _U32.size
+        chapters_offset = books_offset + _U32.size + sum(_U32.size + len(path.encode('utf-8')) + entry_size for path, _, _, _ in blobs)
+
+        table = bytearray(_U32.pack(len(blobs)))
+        offset = chapters_offset
+        for path, mtime, raw, count in blobs:
+            _pack_str(table, path)
+            table += _I64.pack(mtime) + _U64.pack(offset) + _U32.pack(len(raw)) + _U32.pack(count)
+            offset += len(raw)
+
+        tmp_path = f"{self.snapshot_path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(_HEADER.pack(MAGIC, VERSION, dirs_offset, items_offset, books_offset, chapters_offset))
+            f.write(body)
+            f.write(table)
+            for _, _, raw, _ in blobs:
+                f.write(raw)
+        return tmp_path
+
+    def _close_map(self):
+        if self._mm is not None:
+            self._mm.close()
+            self._file.close()
+            self._mm = self._file = None
+
+    # --- Lookups ---
+
+    def get_items(self) -> list:
+        """Returns the library in the same shape as audio_utils.get_books_and_series."""
+        items = self.items
+        metrics.observe_cache('catalog', items is not None)
+        if items is not None:
+            return items
+        # No snapshot yet: read it the slow way once; the reconciler will persist it
+        items = library_index.get_items(self.audiobook_path)
+        with self._lock:
+            if self.items is None:
+                self.items = items
+                self._dirty = True
+        return items
+
+    def _version(self, book_path: str):
+        """What a book's cached chapters are validated against: its library index version, else its folder's mtime."""
+        version = self._book_versions.get(book_path)
+        return version if version is not None else _mtime_ns(book_path)
+
+    def get_chapters(self, book_path: str) -> list:
+        """Returns chapter dicts (filename, title, track, duration, plus start for single-file books) for a book, sorted by track."""
+        mtime = self._version(book_path)
+        with self._lock:
+            cached = self._loaded.get(book_path)
+            if cached and cached[0] == mtime:
+                metrics.observe_cache('catalog', True)
+                return list(cached[1])
+            entry = self._book_index.get(book_path)
+            if entry and entry[0] == mtime and self._mm is not None:
+                chapters = _decode_chapters(self._mm, entry[1], entry[3])
+                self._loaded[book_path] = (mtime, chapters)
+                metrics.observe_cache('catalog', True)
+                return list(chapters)
+
+        metrics.observe_cache('catalog', False)
+        chapters = library_index.get_chapters(book_path)
+        with self._lock:
+            self._loaded[book_path] = (mtime, chapters)
+            self._dirty = True
+        self._notify({book_path})
+        return list(chapters)
+
+    def get_timeline(self, book_path: str) -> BookTimeline:
+        """Cumulative chapter offsets of a book, built once per version of the book."""
+        chapters = self.get_chapters(book_path)
+        with self._lock:
+            mtime = self._loaded.get(book_path, (None,))[0]
+            cached = self._timelines.get(book_path)
+            if cached and mtime is not None and cached[0] == mtime and len(cached[1]) == len(chapters):
+                return cached[1]
+        timeline = BookTimeline(chapters)
+        with self._lock:
+            self._timelines[book_path] = (mtime, timeline)
+        return timeline
+
+    def iter_books(self, book_paths=None):
+        """Yields (book_path, mtime_ns, chapters) for every book (or just book_paths) the catalog knows the chapters of."""
+        with self._lock:
+            loaded = dict(self._loaded)
+            index = dict(self._book_index) if self._mm is not None else {}
+        if book_paths is not None:
+            loaded = {path: entry for path, entry in loaded.items() if path in book_paths}
+            index = {path: entry for path, entry in index.items() if path in book_paths}
+        for book_path, (mtime, chapters) in loaded.items():
+            yield book_path, mtime, chapters
+        for book_path, entry in index.items():
+            if book_path in loaded:
+                continue
+            with self._lock:
+                if self._mm is None or self._book_index.get(book_path) != entry:
+                    continue  # Swapped out by a reconcile meanwhile
+                chapters = _decode_chapters(self._mm, entry[1], entry[3])
+            yield book_path, entry[0], chapters
+
+    def add_listener(self, callback):
+        """Registers callback(changed_book_paths) to run whenever the catalog changes (possibly from a worker thread)."""
+        self._listeners.append(callback)
+
+    def _notify(self, book_paths=None):
+        for callback in self._listeners:
+            try:
+                callback(book_paths)
+            except Exception:
+                log.exception("Catalog listener failed.")
+
+    # --- Reconciliation ---
+
+    def reconcile(self) -> dict:
+        """
+        Brings the catalog in line with the disk (blocking; run it in an executor).
+        Directories are compared by mtime, so an unchanged library costs one stat per directory.
+        Books are only re-read if their directory changed, and the snapshot is rewritten only if
+        something differs. With a library index, the index is followed instead of the disk.
+        """
+        with self._reconcile_lock:
+            start = time.perf_counter()
+            with self._lock:
+                old_items = self.items
+                old_dirs = dict(self._dir_mtimes)
+                old_index = dict(self._book_index)
+                loaded = dict(self._loaded)
+                dirty = self._dirty
+
+            if library_index.index_available():
+                try:
+                    return self._reconcile_with_index(start, old_items, old_dirs, old_index, loaded, dirty)
+                except sqlite3.Error as e:
+                    log.error("Failed to reconcile the catalog with the library index, checking the disk instead: %s", e)
+
+            changed = [path for path, mtime in old_dirs.items() if _mtime_ns(path) != mtime]
+            if old_items is not None and old_dirs and not changed:
+                items = old_items
+            else:
+                items = audio_utils.get_books_and_series(self.audiobook_path)
+            dir_mtimes = {path: mtime for path in _library_dirs(self.audiobook_path, items) if (mtime := _mtime_ns(path)) is not None}
+            return self._apply_reconcile(start, items, old_items, dir_mtimes, dir_mtimes, old_dirs, old_index, loaded, dirty, len(changed))
+
+    def _reconcile_with_index(self, start, old_items, old_dirs, old_index, loaded, dirty) -> dict:
+        """
+        Reconciles with the library index instead of the disk. Nothing to do until the coordinator
+        rebuilds the index; then only books whose indexed chapter files changed are re-read.
+        """
+        built_at = library_index.index_built_at()
+        if old_items is not None and built_at is not None and built_at == self._index_built_at and not dirty:
+            stats = {'items': len(old_items), 'books': len(old_index) or len(loaded), 'reread': 0, 'changed_dirs': 0, 'written': False,
+                     'seconds': time.perf_counter() - start}
+            CATALOG_RECONCILE_SECONDS.observe(stats['seconds'])
+            log.debug("Catalog is up to date with the library index: %s", stats)
+            return stats
+        items = library_index.get_items(self.audiobook_path)
+        if items == old_items:
+            items = old_items
+        versions = library_index.book_versions()
+        with self._lock:
+            self._book_versions = versions
+        self._index_built_at = built_at
+        return self._apply_reconcile(start, items, old_items, {}, versions, old_dirs, old_index, loaded, dirty, 0)
+
+    def _apply_reconcile(self, start, items, old_items, dir_mtimes, versions, old_dirs, old_index, loaded, dirty, changed_dirs) -> dict:
+        """
+        Gathers every book's chapters (reused when its version is unchanged, re-read otherwise) and
+        rewrites the snapshot if anything differs. versions maps book path -> folder mtime or index version.
+        """
+        books = {}
+        reread = 0
+        with self._lock:
+            for book_path in _book_paths(items):
+                mtime = versions.get(book_path)
+                cached = loaded.get(book_path)
+                entry = old_index.get(book_path)
+                if cached and cached[0] == mtime:
+                    books[book_path] = cached
+                elif entry and entry[0] == mtime and self._mm is not None:
+                    # Unchanged: copy the encoded records straight from the old map
+                    _, offset, length, count = entry
+                    books[book_path] = (mtime, bytes(self._mm[offset:offset + length]), count)
+        for book_path in _book_paths(items):
+            if book_path not in books:
+                books[book_path] = (versions.get(book_path), library_index.get_chapters(book_path))
+                reread += 1
+
+        unchanged = items is old_items and not reread and set(books) == set(old_index) and dir_mtimes == old_dirs
+        stats = {'items': len(items), 'books': len(books), 'reread': reread, 'changed_dirs': changed_dirs, 'written': False}
+        if unchanged and not dirty:
+            stats['seconds'] = time.perf_counter() - start
+            CATALOG_RECONCILE_SECONDS.observe(stats['seconds'])
+            log.debug("Catalog is up to date: %s", stats)
+            return stats
+
+        if self.snapshot_path:
+            try:
+                tmp_path = self._write(items, dir_mtimes, books)
+                with self._lock:
+                    # Close our map first; Windows can't replace a file that is mapped
+                    self._close_map()
+                    os.replace(tmp_path, self.snapshot_path)
+                stats['written'] = self.load()
+            except OSError as e:
+                log.error("Failed to write catalog snapshot %s: %s", self.snapshot_path, e)
+        if not stats['written']:
+            # Keep serving from memory
+            with self._lock:
+                self.items = items
+                self._dir_mtimes = dir_mtimes
+                self._loaded = {
+                    path: entry if len(entry) == 2 else (entry[0], _decode_chapters(entry[1], 0, entry[2]))
+                    for path, entry in books.items()
+                }
+                self._book_index = {}
+
+        stats['seconds'] = time.perf_counter() - start
+        CATALOG_RECONCILE_SECONDS.observe(stats['seconds'])
+        log.info("Catalog reconciled: %s", stats)
+        self._notify()
+        return stats
+
+    def start(self, loop=None):
+        """Reconciles now and then every CATALOG_RECONCILE_INTERVAL seconds in the background."""
+        if self._task and not self._task.done():
+            return
+        loop = loop or asyncio.get_running_loop()
+        self._task = loop.create_task(self._run())
+
+    def stop(self):
+        if self._task:
+            self._task.cancel()
+            self._task = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            try:
+                await loop.run_in_executor(None, self.reconcile)
+            except Exception:
+                log.exception("Catalog reconciliation failed.")
+            if CATALOG_RECONCILE_INTERVAL <= 0:
+                return
+            await asyncio.sleep(CATALOG_RECONCILE_INTERVAL)
+
+catalog = Catalog()
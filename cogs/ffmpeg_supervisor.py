@@ -0,0 +1,201 @@
+# cogs/ffmpeg_supervisor.py
+import asyncio
+import collections
+import logging
+import os
+import time
+
+from config import MAX_CONCURRENT_STREAMS, STREAM_QUEUE_TIMEOUT
+from .position_source import unwrap
+
+log = logging.getLogger(__name__)
+
+# Optional: psutil gives portable CPU/RSS numbers; without it we read /proc on Linux
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+_CLOCK_TICKS = os.sysconf('SC_CLK_TCK') if hasattr(os, 'sysconf') else 100
+_PAGE_SIZE = os.sysconf('SC_PAGE_SIZE') if hasattr(os, 'sysconf') else 4096
+
+class FFmpegSupervisor:
+    """
+    Tracks every ffmpeg child spawned by play_audio and limits how many can run at once.
+
+    Each guild holds at most one stream slot. When all MAX_CONCURRENT_STREAMS slots are
+    taken, new plays wait in a FIFO queue for up to STREAM_QUEUE_TIMEOUT seconds before
+    being rejected. A slot belongs to the reservation acquire() returned and then to the
+    source registered with it, so a stream that already ended cannot free its successor's slot.
+    """
+    def __init__(self, max_streams: int, queue_timeout: float):
+        self.max_streams = max_streams
+        self.queue_timeout = queue_timeout
+        self.slots = {}  # key: guild.id, value: {'reservation': object, 'source': FFmpegPCMAudio or None, 'started': float}
+        self.waiters = collections.deque()  # (guild.id, Future) in arrival order
+        self.rejected = 0
+        self._cpu_samples = {}  # key: pid, value: (cpu_seconds, wall_time)
+        self._loop = None
+
+    def has_capacity(self) -> bool:
+        return self.max_streams <= 0 or len(self.slots) < self.max_streams
+
+    def queue_length(self) -> int:
+        return len(self.waiters)
+
+    def _reserve(self, guild_id: int):
+        reservation = object()
+        self.slots[guild_id] = {'reservation': reservation, 'source': None, 'started': time.time()}
+        return reservation
+
+    async def acquire(self, guild_id: int, on_queued=None):
+        """
+        Reserves a stream slot for a guild and returns the reservation to pass to register() and
+        release(), or None if no slot freed up in time. A guild that already streams takes its
+        slot over for the new stream. on_queued is awaited once if the request has to wait, so
+        the caller can tell the user.
+        """
+        self._loop = asyncio.get_running_loop()
+        if guild_id in self.slots or (self.has_capacity() and not self.waiters):
+            return self._reserve(guild_id)
+
+        if self.queue_timeout <= 0:
+            self.rejected += 1
+            log.warning("Stream limit reached (%s); rejecting play for guild %s.", self.max_streams, guild_id)
+            return None
+
+        future = self._loop.create_future()
+        self.waiters.append((guild_id, future))
+        log.info("Stream limit reached (%s); guild %s queued at position %s.", self.max_streams, guild_id, len(self.waiters))
+        if on_queued:
+            try:
+                await on_queued(len(self.waiters))
+            except Exception as e:
+                log.warning("Failed to notify queued guild %s: %s", guild_id, e)
+        try:
+            return await asyncio.wait_for(asyncio.shield(future), timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            if future.done() and not future.cancelled():
+                # Slot was handed over just as we timed out; keep it
+                return future.result()
+            future.cancel()
+            self._drop_waiter(future)
+            self.rejected += 1
+            log.warning("Guild %s gave up waiting for a stream slot after %ss.", guild_id, self.queue_timeout)
+            return None
+
+    def register(self, guild_id: int, source, reservation) -> bool:
+        """
+        Attaches the spawned ffmpeg source to the slot of its reservation. Returns False if the
+        reservation no longer holds the slot (a newer play took it over, or the session was reaped).
+        """
+        slot = self.slots.get(guild_id)
+        if slot is None or slot['reservation'] is not reservation:
+            log.info("Stream slot of guild %s was taken over or released before its ffmpeg started.", guild_id)
+            return False
+        slot['source'] = source
+        slot['started'] = time.time()
+        log.debug("Registered ffmpeg pid %s for guild %s (%s/%s streams).", _pid(source), guild_id, len(self.slots), self.max_streams or '∞')
+        return True
+
+    def release(self, guild_id: int, owner=None):
+        """
+        Frees the guild's slot. Safe to call from the voice player thread.
+        If owner (a source or a reservation) is given, the slot is only freed while it still
+        belongs to it, so a finished stream cannot release the slot of the stream that replaced it.
+        """
+        if self._loop and self._loop.is_running():
+            try:
+                if asyncio.get_running_loop() is self._loop:
+                    self._release(guild_id, owner)
+                    return
+            except RuntimeError:
+                pass
+            self._loop.call_soon_threadsafe(self._release, guild_id, owner)
+        else:
+            self._release(guild_id, owner)
+
+    def _release(self, guild_id: int, owner=None):
+        slot = self.slots.get(guild_id)
+        if slot is None or (owner is not None and owner is not slot['source'] and owner is not slot['reservation']):
+            return
+        del self.slots[guild_id]
+        self._cpu_samples.pop(_pid(slot['source']), None)
+        self._wake_waiters()
+
+    def _wake_waiters(self):
+        while self.waiters and self.has_capacity():
+            guild_id, future = self.waiters.popleft()
+            if future.done():
+                continue
+            future.set_result(self._reserve(guild_id))
+            log.info("Stream slot handed to queued guild %s.", guild_id)
+
+    def _drop_waiter(self, future):
+        self.waiters = collections.deque(w for w in self.waiters if w[1] is not future)
+
+    def live_processes(self) -> list:
+        """Returns (guild_id, source) pairs whose ffmpeg process is still running."""
+        return [
+            (guild_id, slot['source']) for guild_id, slot in self.slots.items()
+            if _is_alive(slot['source'])
+        ]
+
+    def process_stats(self) -> list:
+        """Returns per-process stats: guild, pid, CPU percent since last sample, RSS and uptime."""
+        now = time.time()
+        stats = []
+        for guild_id, slot in list(self.slots.items()):
+            source = slot['source']
+            pid = _pid(source)
+            entry = {
+                'guild_id': guild_id,
+                'pid': pid,
+                'alive': _is_alive(source),
+                'uptime': now - slot['started'],
+                'cpu_percent': None,
+                'rss_bytes': None,
+            }
+            if pid and entry['alive']:
+                cpu_seconds, rss_bytes = _read_process_usage(pid)
+                if cpu_seconds is not None:
+                    previous = self._cpu_samples.get(pid)
+                    if previous:
+                        wall = now - previous[1]
+                        if wall > 0:
+                            entry['cpu_percent'] = 100.0 * (cpu_seconds - previous[0]) / wall
+                    elif entry['uptime'] > 0:
+                        entry['cpu_percent'] = 100.0 * cpu_seconds / entry['uptime']
+                    self._cpu_samples[pid] = (cpu_seconds, now)
+                entry['rss_bytes'] = rss_bytes
+            stats.append(entry)
+        return stats
+
+def _pid(source):
+    process = getattr(unwrap(source), '_process', None)
+    return process.pid if process is not None else None
+
+def _is_alive(source) -> bool:
+    process = getattr(unwrap(source), '_process', None)
+    return process is not None and process.poll() is None
+
+def _read_process_usage(pid: int):
+    """Returns (cpu_seconds, rss_bytes) for a process, or (None, None) if unavailable."""
+    if psutil:
+        try:
+            process = psutil.Process(pid)
+            times = process.cpu_times()
+            return times.user + times.system, process.memory_info().rss
+        except (psutil.NoSuchProcess, psutil.AccessDenied):
+            return None, None
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            # The command name may contain spaces, so split after the closing parenthesis
+            fields = f.read().rsplit(')', 1)[1].split()
+        cpu_seconds = (int(fields[11]) + int(fields[12])) / _CLOCK_TICKS
+        rss_bytes = int(fields[21]) * _PAGE_SIZE
+        return cpu_seconds, rss_bytes
+    except (OSError, IndexError, ValueError):
+        return None, None
+
+supervisor = FFmpegSupervisor(MAX_CONCURRENT_STREAMS, STREAM_QUEUE_TIMEOUT)
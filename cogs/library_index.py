@@ -0,0 +1,398 @@
+# cogs/library_index.py
+import hashlib
+import os
+import sqlite3
+import logging
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from config import LIBRARY_INDEX_PATH, INDEX_PROBE_WORKERS, LOUDNESS_NORMALIZATION, LOUDNESS_TARGET, LOUDNESS_TOLERANCE, LOUDNESS_WORKERS
+from . import audio_utils
+from . import metrics
+
+log = logging.getLogger(__name__)
+
+_chapter_tables = {}  # key: single-file book path, value: ((mtime_ns, size), embedded chapter table)
+_chapter_tables_lock = threading.Lock()
+_reader_conn = None
+_reader_lock = threading.Lock()
+
+# Never boost a file so far that its true peak would go above this (dBTP)
+LOUDNESS_MAX_TRUE_PEAK = -1.0
+ANALYSIS_COMMIT_EVERY = 20  # analysed files per transaction, so an interrupted pass keeps its progress
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS items (
+    path TEXT PRIMARY KEY,
+    type TEXT NOT NULL,
+    title TEXT NOT NULL,
+    author TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS series_books (
+    path TEXT PRIMARY KEY,
+    series_path TEXT NOT NULL,
+    title TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS chapters (
+    path TEXT PRIMARY KEY,
+    book_path TEXT NOT NULL,
+    filename TEXT NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    title TEXT NOT NULL,
+    track INTEGER NOT NULL,
+    duration REAL NOT NULL,
+    synopsis TEXT
+);
+CREATE INDEX IF NOT EXISTS chapters_by_book ON chapters (book_path);
+CREATE TABLE IF NOT EXISTS loudness (
+    path TEXT PRIMARY KEY,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    integrated REAL,
+    true_peak REAL
+);
+CREATE TABLE IF NOT EXISTS silences (
+    path TEXT PRIMARY KEY,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    intervals BLOB
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+def connect(db_path: str = None) -> sqlite3.Connection:
+    """Opens the index database. WAL mode lets bot workers read while the coordinator rebuilds."""
+    conn = sqlite3.connect(db_path or LIBRARY_INDEX_PATH, timeout=30)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.executescript(SCHEMA)
+    return conn
+
+def _reader() -> sqlite3.Connection:
+    """
+    The process's shared read-only connection, for lookups at playback time: no pragma or schema
+    script per query. Callers hold _reader_lock (the connection is used from executor threads).
+    """
+    global _reader_conn
+    if _reader_conn is None:
+        _reader_conn = sqlite3.connect(f"file:{LIBRARY_INDEX_PATH}?mode=ro", uri=True, timeout=30, check_same_thread=False)
+        _reader_conn.row_factory = sqlite3.Row
+    return _reader_conn
+
+def index_available() -> bool:
+    return bool(LIBRARY_INDEX_PATH) and os.path.exists(LIBRARY_INDEX_PATH)
+
+def index_built_at():
+    """When the index was last built (a string from the coordinator), or None. One indexed lookup."""
+    with _reader_lock:
+        row = _reader().execute("SELECT value FROM meta WHERE key = 'built_at'").fetchone()
+    return row['value'] if row else None
+
+def book_versions() -> dict:
+    """
+    book path -> a 64-bit version of its chapter files as of the last index build, which changes
+    when a chapter file is added, removed or modified. Read from the index alone, so it tells bot
+    workers which books changed without touching AUDIOBOOK_PATH.
+    """
+    digests = {}
+    with _reader_lock:
+        rows = _reader().execute("SELECT book_path, filename, mtime_ns, size FROM chapters ORDER BY book_path, filename").fetchall()
+    for book_path, filename, mtime_ns, size in rows:
+        digest = digests.get(book_path)
+        if digest is None:
+            digest = digests[book_path] = hashlib.blake2b(digest_size=8)
+        digest.update(f"{filename}:{mtime_ns}:{size}\0".encode('utf-8'))
+    return {book_path: int.from_bytes(digest.digest(), 'little', signed=True) for book_path, digest in digests.items()}
+
+def _list_chapter_files(book_path: str) -> list:
+    try:
+        return [f for f in os.listdir(book_path) if f.endswith('.m4b')]
+    except OSError as e:
+        log.warning("Could not list chapter files in %s: %s", book_path, e)
+        return []
+
+def build_index(audiobook_path: str, db_path: str = None) -> dict:
+    """
+    Scans the library and writes items, series books and chapter metadata to the index.
+    Chapter files whose mtime and size are unchanged keep their stored metadata, so only
+    new or modified files are probed. Returns counts for logging.
+    """
+    start = time.perf_counter()
+    items = audio_utils.get_books_and_series(audiobook_path)
+
+    book_paths = []
+    for item in items:
+        if item['type'] == 'book':
+            book_paths.append(item['path'])
+        else:
+            book_paths.extend(book['path'] for book in item['books'])
+
+    conn = connect(db_path)
+    try:
+        known = {
+            row['path']: (row['mtime_ns'], row['size'])
+            for row in conn.execute("SELECT path, mtime_ns, size FROM chapters")
+        }
+
+        seen = set()
+        to_probe = []
+        for book_path in book_paths:
+            for filename in _list_chapter_files(book_path):
+                full_path = os.path.join(book_path, filename)
+                try:
+                    st = os.stat(full_path)
+                except OSError:
+                    continue
+                seen.add(full_path)
+                if known.get(full_path) != (st.st_mtime_ns, st.st_size):
+                    to_probe.append((full_path, book_path, filename, st.st_mtime_ns, st.st_size))
+
+        def probe(entry):
+            full_path, book_path, filename, mtime_ns, size = entry
+            meta = audio_utils.get_chapter_metadata(full_path)
+            return (full_path, book_path, filename, mtime_ns, size,
+                    meta['title'], meta['track'], meta['duration'], meta['synopsis'])
+
+        # ffprobe runs out of process, so threads are enough to keep several probes in flight
+        with ThreadPoolExecutor(max_workers=INDEX_PROBE_WORKERS) as pool:
+            probed = list(pool.map(probe, to_probe))
+
+        removed = [path for path in known if path not in seen]
+        with conn:
+            conn.execute("DELETE FROM items")
+            conn.execute("DELETE FROM series_books")
+            conn.executemany(
+                "INSERT INTO items (path, type, title, author) VALUES (?, ?, ?, ?)",
+                [(item['path'], item['type'], item['title'], item['author']) for item in items]
+            )
+            conn.executemany(
+                "INSERT OR REPLACE INTO series_books (path, series_path, title) VALUES (?, ?, ?)",
+                [(book['path'], item['path'], book['title']) for item in items if item['type'] == 'series' for book in item['books']]
+            )
+            conn.executemany(
+                "INSERT OR REPLACE INTO chapters (path, book_path, filename, mtime_ns, size, title, track, duration, synopsis) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                probed
+            )
+            conn.executemany("DELETE FROM chapters WHERE path = ?", [(path,) for path in removed])
+            conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('built_at', ?)", (str(time.time()),))
+    finally:
+        conn.close()
+
+    stats = {
+        'items': len(items),
+        'books': len(book_paths),
+        'chapters': len(seen),
+        'probed': len(probed),
+        'removed': len(removed),
+        'seconds': time.perf_counter() - start,
+    }
+    log.info("Library index built: %s", stats)
+    return stats
+
+def loudness_gain(integrated: float, true_peak: float) -> float:
+    """
+    The static gain (dB) that brings a file to LOUDNESS_TARGET. A boost is limited so the true peak
+    stays at or below LOUDNESS_MAX_TRUE_PEAK. 0 when the file is already within LOUDNESS_TOLERANCE.
+    """
+    gain = LOUDNESS_TARGET - integrated
+    if gain > 0 and true_peak is not None:
+        # The ceiling only limits boosts; a file without headroom is left as is, not turned down
+        gain = min(gain, max(0.0, LOUDNESS_MAX_TRUE_PEAK - true_peak))
+    return 0.0 if abs(gain) < LOUDNESS_TOLERANCE else round(gain, 2)
+
+def analyze_changed_files(table: str, columns: tuple, measure, db_path: str = None, workers: int = LOUDNESS_WORKERS) -> dict:
+    """
+    Runs measure(path) for every indexed chapter file that has no row in table yet or was modified
+    since (mtime or size changed), several files in parallel, and stores the tuple it returns in
+    columns. Rows of files that left the index are dropped. Blocking, and usually a full decode per
+    file, so it runs offline: from cluster.py after the index is built, never from a bot worker.
+    """
+    start = time.perf_counter()
+    conn = connect(db_path)
+    try:
+        to_measure = conn.execute(
+            f"SELECT c.path, c.mtime_ns, c.size FROM chapters c LEFT JOIN {table} a ON a.path = c.path "
+            "WHERE a.path IS NULL OR a.mtime_ns != c.mtime_ns OR a.size != c.size"
+        ).fetchall()
+        with conn:
+            conn.execute(f"DELETE FROM {table} WHERE path NOT IN (SELECT path FROM chapters)")
+
+        insert = f"INSERT OR REPLACE INTO {table} (path, mtime_ns, size, {', '.join(columns)}) VALUES (?, ?, ?{', ?' * len(columns)})"
+        measured = failed = 0
+        batch = []
+        def flush():
+            with conn:
+                conn.executemany(insert, batch)
+            batch.clear()
+
+        # ffmpeg decodes out of process, so threads are enough to keep every worker core busy
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+            futures = {pool.submit(measure, row['path']): row for row in to_measure}
+            for future in as_completed(futures):
+                row = futures[future]
+                try:
+                    result = future.result()
+                except Exception:
+                    log.exception("Analysing %s for %s failed.", row['path'], table)
+                    result = None
+                if result is None:
+                    # Stored anyway (all NULL) so a broken file isn't decoded again until it changes
+                    failed += 1
+                    result = (None,) * len(columns)
+                else:
+                    measured += 1
+                batch.append((row['path'], row['mtime_ns'], row['size'], *result))
+                if len(batch) >= ANALYSIS_COMMIT_EVERY:
+                    flush()
+        if batch:
+            flush()
+    finally:
+        conn.close()
+
+    stats = {'measured': measured, 'failed': failed, 'seconds': time.perf_counter() - start}
+    if to_measure:
+        log.info("%s analysis finished: %s", table.capitalize(), stats)
+    return stats
+
+def load_analysis(table: str, columns: tuple, file_path: str):
+    """
+    The stored analysis row of a chapter file, or None if there is no index, the file hasn't been
+    analysed, its analysis failed or the file changed since (blocking; run it in an executor).
+    """
+    if not index_available():
+        return None
+    try:
+        st = os.stat(file_path)
+        with _reader_lock:
+            row = _reader().execute(f"SELECT mtime_ns, size, {', '.join(columns)} FROM {table} WHERE path = ?", (file_path,)).fetchone()
+    except (OSError, sqlite3.Error) as e:
+        log.warning("Could not look up the %s of %s: %s", table, file_path, e)
+        return None
+    metrics.observe_cache(table, row is not None)
+    if row is None or row[columns[0]] is None or (row['mtime_ns'], row['size']) != (st.st_mtime_ns, st.st_size):
+        return None
+    return row
+
+def analyze_loudness(db_path: str = None, workers: int = LOUDNESS_WORKERS) -> dict:
+    """Measures the EBU R128 loudness of new or modified chapter files (see analyze_changed_files)."""
+    def measure(path):
+        result = audio_utils.measure_loudness(path)
+        return (result['integrated'], result['true_peak']) if result else None
+    return analyze_changed_files('loudness', ('integrated', 'true_peak'), measure, db_path, workers)
+
+def get_gain(file_path: str) -> float:
+    """
+    The stored normalization gain (dB) for a chapter file, or 0.0 if normalization is off, the file
+    hasn't been analysed yet or changed since its analysis.
+    """
+    if not LOUDNESS_NORMALIZATION:
+        return 0.0
+    row = load_analysis('loudness', ('integrated', 'true_peak'), file_path)
+    return loudness_gain(row['integrated'], row['true_peak']) if row else 0.0
+
+def load_items(db_path: str = None) -> list:
+    """Returns the library in the same shape as audio_utils.get_books_and_series."""
+    conn = connect(db_path)
+    try:
+        series_books = {}
+        for row in conn.execute("SELECT path, series_path, title FROM series_books"):
+            series_books.setdefault(row['series_path'], []).append({'title': row['title'], 'path': row['path']})
+
+        items = []
+        for row in conn.execute("SELECT path, type, title, author FROM items ORDER BY title"):
+            item = {'type': row['type'], 'title': row['title'], 'path': row['path'], 'author': row['author']}
+            if row['type'] == 'series':
+                item['books'] = series_books.get(row['path'], [])
+            items.append(item)
+        return items
+    finally:
+        conn.close()
+
+def load_chapters(book_path: str, db_path: str = None) -> list:
+    """Returns the indexed chapters of a book sorted by track, or an empty list if it isn't indexed."""
+    conn = connect(db_path)
+    try:
+        rows = conn.execute(
+            "SELECT filename, title, track, duration FROM chapters WHERE book_path = ? ORDER BY track",
+            (book_path,)
+        ).fetchall()
+        return [dict(row) for row in rows]
+    finally:
+        conn.close()
+
+def get_chapter_table(file_path: str) -> list:
+    """The embedded chapter table of a single-file book, probed once per version of the file."""
+    try:
+        st = os.stat(file_path)
+    except OSError:
+        return []
+    signature = (st.st_mtime_ns, st.st_size)
+    with _chapter_tables_lock:
+        cached = _chapter_tables.get(file_path)
+    if cached and cached[0] == signature:
+        return cached[1]
+    table = audio_utils.get_embedded_chapters(file_path)
+    with _chapter_tables_lock:
+        _chapter_tables[file_path] = (signature, table)
+    return table
+
+def _virtual_chapters(book_path: str, filename: str) -> list:
+    """
+    Chapters of a book stored as one .m4b with embedded chapters: each chapter is a range of the
+    same file ('start' and 'duration' in seconds), played by seeking. [] if the file has no chapters.
+    """
+    table = get_chapter_table(os.path.join(book_path, filename))
+    return [
+        {'filename': filename, 'title': chapter['title'], 'track': index + 1, 'duration': chapter['duration'], 'start': chapter['start']}
+        for index, chapter in enumerate(table)
+    ]
+
+def get_items(audiobook_path: str) -> list:
+    """Reads the library from the shared index when one is configured, otherwise scans the disk."""
+    if index_available():
+        try:
+            items = load_items()
+            metrics.observe_cache('library_index', bool(items))
+            if items:
+                return items
+        except sqlite3.Error as e:
+            log.error("Failed to read library index, falling back to a disk scan: %s", e)
+    return audio_utils.get_books_and_series(audiobook_path)
+
+def get_chapters(book_path: str) -> list:
+    """Returns chapter dicts (filename, title, track, duration, plus start for single-file books) for a book, sorted by track."""
+    if index_available():
+        try:
+            chapters = load_chapters(book_path)
+            metrics.observe_cache('library_index', bool(chapters))
+            if len(chapters) == 1:
+                return _virtual_chapters(book_path, chapters[0]['filename']) or chapters
+            if chapters:
+                return chapters
+        except sqlite3.Error as e:
+            log.error("Failed to read chapters from library index for %s: %s", book_path, e)
+
+    chapter_files = _list_chapter_files(book_path)
+    if len(chapter_files) == 1:
+        # Possibly an unsplit book; its chapter table makes probing the file's own tags unnecessary
+        virtual = _virtual_chapters(book_path, chapter_files[0])
+        if virtual:
+            return virtual
+
+    chapter_data = []
+    for filename in chapter_files:
+        meta = audio_utils.get_chapter_metadata(os.path.join(book_path, filename))
+        chapter_data.append({
+            'filename': filename,
+            'title': meta['title'],
+            'track': meta['track'],
+            'duration': meta['duration']
+        })
+    chapter_data.sort(key=lambda item: item['track'])
+    return chapter_data
@@ -0,0 +1,202 @@
+# cogs/listening_party.py
+import collections
+import logging
+import secrets
+import threading
+
+import nextcord as discord
+
+log = logging.getLogger(__name__)
+
+# Packets kept for members that read a little later than the first one; a member further behind
+# than this (e.g. after a network stall) skips ahead to stay in lockstep with the rest
+LOCKSTEP_FRAMES = 25  # 0.5 s
+CODE_ALPHABET = "ABCDEFGHJKLMNPQRSTUVWXYZ23456789"
+CODE_LENGTH = 5
+
+class PartyStream:
+    """
+    One ffmpeg decode + Opus encode shared by every voice client of a party.
+
+    Each voice client plays its own PartyMemberSource. Whichever member asks for frame n first
+    pulls it from ffmpeg; the others get the same packet from a short buffer. So there is one
+    ffmpeg process and one read per frame however many channels listen, and the bot never
+    encodes anything. The ffmpeg process is cleaned up when the last member lets go.
+    """
+    def __init__(self, source: discord.AudioSource):
+        self.source = source
+        self._buffer = collections.deque()
+        self._base = 0  # frame number of _buffer[0]
+        self._members = 0
+        self._ended = False
+        self._closed = False
+        self._lock = threading.Lock()
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
+
+    @property
+    def head(self) -> int:
+        """Frame number of the next packet to come from ffmpeg."""
+        return self._base + len(self._buffer)
+
+    def member(self) -> 'PartyMemberSource':
+        with self._lock:
+            self._members += 1
+            return PartyMemberSource(self, self.head)
+
+    def packet(self, member: 'PartyMemberSource') -> bytes:
+        with self._lock:
+            index = max(member.index, self._base)
+            while index >= self.head:
+                if self._ended:
+                    return b''
+                data = self.source.read()
+                if not data:
+                    self._ended = True
+                    return b''
+                self._buffer.append(data)
+                if len(self._buffer) > LOCKSTEP_FRAMES:
+                    self._buffer.popleft()
+                    self._base += 1
+            member.index = index + 1
+            return self._buffer[index - self._base]
+
+    def detach(self):
+        with self._lock:
+            self._members -= 1
+            if self._members > 0 or self._closed:
+                return
+            self._closed = True
+        self.source.cleanup()
+
+class PartyMemberSource(discord.AudioSource):
+    """A voice client's view of a PartyStream; reads already-encoded Opus packets."""
+    def __init__(self, stream: PartyStream, index: int):
+        self.stream = stream
+        self.index = index
+        self._detached = False
+
+    def read(self) -> bytes:
+        return self.stream.packet(self)
+
+    def is_opus(self) -> bool:
+        return True
+
+    def cleanup(self):
+        if not self._detached:
+            self._detached = True
+            self.stream.detach()
+
+class Party:
+    def __init__(self, code: str, host_guild_id: int):
+        self.code = code
+        self.host_guild_id = host_guild_id
+        self.members = {}  # key: guild id of a listening channel, value: its voice client
+        self.stream = None
+        self.paused = False
+
+    def _live_members(self):
+        for guild_id, voice_client in list(self.members.items()):
+            if voice_client.is_connected():
+                yield voice_client
+            else:
+                log.info("Dropping disconnected member guild %s from party %s.", guild_id, self.code)
+                self.members.pop(guild_id, None)
+
+    def broadcast(self, source: discord.AudioSource) -> PartyMemberSource:
+        """
+        Makes source the party's stream: every member channel switches to it in lockstep.
+        Returns the member source the host's voice client should play.
+        """
+        self.stream = PartyStream(source)
+        host_source = self.stream.member()
+        for voice_client in self._live_members():
+            if voice_client.is_playing() or voice_client.is_paused():
+                voice_client.stop()
+            self._play(voice_client)
+        return host_source
+
+    def _play(self, voice_client):
+        def after(error):
+            if error:
+                log.error("Party %s member player error: %s", self.code, error)
+        voice_client.play(self.stream.member(), after=after)
+        if self.paused:
+            voice_client.pause()
+
+    def add(self, voice_client):
+        self.members[voice_client.guild.id] = voice_client
+        if self.stream and not self.stream.closed:
+            self._play(voice_client)
+
+    def set_paused(self, paused: bool):
+        self.paused = paused
+        for voice_client in self._live_members():
+            if paused and voice_client.is_playing():
+                voice_client.pause()
+            elif not paused and voice_client.is_paused():
+                voice_client.resume()
+
+class PartyManager:
+    """Listening parties of this bot process, by code and by the guilds taking part."""
+    def __init__(self):
+        self.parties = {}  # key: code, value: Party
+        self._by_guild = {}  # key: guild id (host or member), value: Party
+
+    def create(self, host_guild_id: int) -> Party:
+        existing = self._by_guild.get(host_guild_id)
+        if existing and existing.host_guild_id == host_guild_id:
+            return existing
+        code = ''.join(secrets.choice(CODE_ALPHABET) for _ in range(CODE_LENGTH))
+        while code in self.parties:
+            code = ''.join(secrets.choice(CODE_ALPHABET) for _ in range(CODE_LENGTH))
+        party = Party(code, host_guild_id)
+        self.parties[code] = party
+        self._by_guild[host_guild_id] = party
+        log.info("Listening party %s started by guild %s.", code, host_guild_id)
+        return party
+
+    def get(self, code: str):
+        return self.parties.get(code.strip().upper())
+
+    def party_of(self, guild_id: int):
+        return self._by_guild.get(guild_id)
+
+    def hosted_by(self, guild_id: int):
+        party = self._by_guild.get(guild_id)
+        return party if party and party.host_guild_id == guild_id else None
+
+    def join(self, party: Party, voice_client):
+        party.add(voice_client)
+        self._by_guild[voice_client.guild.id] = party
+        log.info("Guild %s joined listening party %s (%s member channels).", voice_client.guild.id, party.code, len(party.members))
+
+    def set_paused(self, guild_id: int, paused: bool):
+        party = self.hosted_by(guild_id)
+        if party:
+            party.set_paused(paused)
+
+    async def release_guild(self, guild_id: int):
+        """Called when a guild stops listening: a host ends its party (members disconnect), a member just leaves."""
+        party = self._by_guild.pop(guild_id, None)
+        if party is None:
+            return
+        if party.host_guild_id != guild_id:
+            party.members.pop(guild_id, None)
+            log.info("Guild %s left listening party %s.", guild_id, party.code)
+            return
+        self.parties.pop(party.code, None)
+        for member_guild_id, voice_client in list(party.members.items()):
+            self._by_guild.pop(member_guild_id, None)
+            try:
+                if voice_client.is_playing() or voice_client.is_paused():
+                    voice_client.stop()
+                await voice_client.disconnect(force=True)
+            except Exception as e:
+                log.warning("Failed to disconnect party member in guild %s: %s", member_guild_id, e)
+        party.members.clear()
+        log.info("Listening party %s ended.", party.code)
+
+party_manager = PartyManager()
@@ -0,0 +1,136 @@
+# cogs/loop_monitor.py
+import asyncio
+import collections
+import logging
+import sys
+import threading
+import time
+import traceback
+import weakref
+
+from config import LOOP_MONITOR_INTERVAL, LOOP_LAG_THRESHOLD
+from . import metrics
+
+log = logging.getLogger(__name__)
+
+LOOP_LAG_SECONDS = metrics.Histogram(
+    'audiobot_loop_lag_seconds', 'Event loop scheduling delay.', buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5)
+)
+LOOP_LAG_QUANTILES = metrics.Gauge('audiobot_loop_lag_quantile_seconds', 'Recent event loop lag percentiles.', labelnames=('quantile',))
+LOOP_STALLS = metrics.Counter('audiobot_loop_stalls_total', 'Times the event loop was blocked longer than LOOP_LAG_THRESHOLD.')
+
+# Which guild/interaction each task is working for, so a stall can be attributed to it
+_task_context = weakref.WeakKeyDictionary()
+
+def annotate(interaction, handler: str = None):
+    """Tags the current task with the interaction it is handling."""
+    try:
+        task = asyncio.current_task()
+    except RuntimeError:
+        return
+    if task is None:
+        return
+    guild = interaction.guild
+    _task_context[task] = (
+        f"handler={handler or type(interaction).__name__} "
+        f"guild={guild.name if guild else None} ({guild.id if guild else None}) "
+        f"user={interaction.user} interaction={interaction.id}"
+    )
+
+class LoopMonitor:
+    """
+    Measures how late the event loop runs a callback that should fire every LOOP_MONITOR_INTERVAL.
+
+    A watchdog thread checks that the loop keeps ticking. When it has been stuck for longer than
+    LOOP_LAG_THRESHOLD, the watchdog captures the loop thread's stack (i.e. the blocking call) and
+    logs it along with the guild/interaction of the task that was running.
+    """
+    def __init__(self, interval: float = LOOP_MONITOR_INTERVAL, threshold: float = LOOP_LAG_THRESHOLD, window: int = 2400):
+        self.interval = interval
+        self.threshold = threshold
+        self.lags = collections.deque(maxlen=window)  # About 10 minutes at the default interval
+        self.max_lag = 0.0
+        self.stalls = 0
+        self._loop = None
+        self._loop_thread_id = None
+        self._last_tick = time.monotonic()
+        self._stall_reported = False
+        self._task = None
+        self._watchdog = None
+        self._stopped = threading.Event()
+
+    def start(self, loop=None):
+        if self._task and not self._task.done():
+            return
+        self._loop = loop or asyncio.get_running_loop()
+        self._loop_thread_id = threading.get_ident()
+        self._last_tick = time.monotonic()
+        self._stopped.clear()
+        self._task = self._loop.create_task(self._run())
+        self._watchdog = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+        self._watchdog.start()
+        log.info("Event loop monitor started (interval %ss, stall threshold %ss).", self.interval, self.threshold)
+
+    def stop(self):
+        self._stopped.set()
+        if self._task:
+            self._task.cancel()
+            self._task = None
+
+    async def _run(self):
+        next_report = time.monotonic() + 60
+        while True:
+            expected = time.monotonic() + self.interval
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            lag = max(0.0, now - expected)
+            self._last_tick = now
+            self._stall_reported = False
+            self.lags.append(lag)
+            self.max_lag = max(self.max_lag, lag)
+            LOOP_LAG_SECONDS.observe(lag)
+            if lag > self.threshold:
+                log.warning("Event loop lagged %.0fms (threshold %.0fms).", lag * 1000, self.threshold * 1000)
+            if now >= next_report:
+                next_report = now + 60
+                p = self.percentiles()
+                for quantile, value in p.items():
+                    LOOP_LAG_QUANTILES.set(value, quantile=quantile)
+                log.debug("Loop lag p50=%.1fms p95=%.1fms p99=%.1fms max=%.1fms",
+                          p['0.5'] * 1000, p['0.95'] * 1000, p['0.99'] * 1000, p['1.0'] * 1000)
+
+    def percentiles(self) -> dict:
+        """Returns p50/p95/p99/max lag in seconds over the recent window."""
+        if not self.lags:
+            return {'0.5': 0.0, '0.95': 0.0, '0.99': 0.0, '1.0': 0.0}
+        ordered = sorted(self.lags)
+        last = len(ordered) - 1
+        return {
+            '0.5': ordered[int(last * 0.5)],
+            '0.95': ordered[int(last * 0.95)],
+            '0.99': ordered[int(last * 0.99)],
+            '1.0': ordered[-1],
+        }
+
+    def _watch(self):
+        check_every = max(0.05, self.threshold / 4)
+        while not self._stopped.wait(check_every):
+            blocked_for = time.monotonic() - self._last_tick - self.interval
+            if blocked_for > self.threshold and not self._stall_reported:
+                self._stall_reported = True
+                self.stalls += 1
+                LOOP_STALLS.inc()
+                self._report_stall(blocked_for)
+
+    def _report_stall(self, blocked_for: float):
+        frame = sys._current_frames().get(self._loop_thread_id)
+        stack = ''.join(traceback.format_stack(frame)) if frame else '<loop thread not found>'
+        context = None
+        # _current_tasks is only read here, from the watchdog thread, while the loop is blocked
+        task = asyncio.tasks._current_tasks.get(self._loop)
+        if task is not None:
+            context = _task_context.get(task) or f"task={task.get_name()} coro={task.get_coro()!r}"
+        log.warning("Event loop blocked for %.0fms (%s). Blocking call stack:\n%s",
+                    blocked_for * 1000, context or 'no task running', stack)
+
+monitor = LoopMonitor()
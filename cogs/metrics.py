@@ -0,0 +1,220 @@
+# cogs/metrics.py
+import asyncio
+import bisect
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+log = logging.getLogger(__name__)
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+ACK_DEADLINE = 3.0  # Discord invalidates an interaction that isn't acknowledged within 3 seconds
+
+# --- Metric Types ---
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+class _Metric:
+    type_name = 'untyped'
+
+    def __init__(self, name: str, help_text: str, labelnames=()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()  # Observed from the voice player threads too
+        REGISTRY.append(self)
+
+    def _key(self, labels: dict) -> tuple:
+        return tuple(str(labels.get(name, '')) for name in self.labelnames)
+
+    def _format_labels(self, key: tuple, extra: dict = None) -> str:
+        pairs = list(zip(self.labelnames, key)) + list((extra or {}).items())
+        if not pairs:
+            return ''
+        return '{' + ','.join(f'{k}="{_escape(v)}"' for k, v in pairs) + '}'
+
+    def render(self) -> list:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.type_name}"]
+
+class Counter(_Metric):
+    type_name = 'counter'
+
+    def __init__(self, name, help_text, labelnames=()):
+        super().__init__(name, help_text, labelnames)
+        self.values = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def get(self, **labels) -> float:
+        with self._lock:
+            return self.values.get(self._key(labels), 0)
+
+    def render(self):
+        lines = super().render()
+        with self._lock:
+            values = sorted(self.values.items())
+        for key, value in values:
+            lines.append(f"{self.name}{self._format_labels(key)} {value}")
+        return lines
+
+class Gauge(_Metric):
+    type_name = 'gauge'
+
+    def __init__(self, name, help_text, labelnames=(), callback=None):
+        super().__init__(name, help_text, labelnames)
+        self.values = {}
+        self.callback = callback  # Optional: called at scrape time, returns a number
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self.values[self._key(labels)] = value
+
+    def render(self):
+        lines = super().render()
+        if self.callback:
+            try:
+                self.set(self.callback())
+            except Exception as e:
+                log.debug("Gauge callback for %s failed: %s", self.name, e)
+        with self._lock:
+            values = sorted(self.values.items())
+        for key, value in values:
+            lines.append(f"{self.name}{self._format_labels(key)} {value}")
+        return lines
+
+class Histogram(_Metric):
+    type_name = 'histogram'
+
+    def __init__(self, name, help_text, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self.series = {}  # key: label values, value: [bucket counts..., sum, count]
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self.series.get(key)
+            if series is None:
+                series = self.series[key] = [0] * (len(self.buckets) + 2)
+            if index < len(self.buckets):
+                series[index] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def render(self):
+        lines = super().render()
+        with self._lock:
+            # Copies, so observations from other threads can't change a series while it is written out
+            snapshot = sorted((key, list(series)) for key, series in self.series.items())
+        for key, series in snapshot:
+            cumulative = 0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{self._format_labels(key, {'le': bound})} {cumulative}")
+            lines.append(f"{self.name}_bucket{self._format_labels(key, {'le': '+Inf'})} {series[-1]}")
+            lines.append(f"{self.name}_sum{self._format_labels(key)} {series[-2]}")
+            lines.append(f"{self.name}_count{self._format_labels(key)} {series[-1]}")
+        return lines
+
+REGISTRY = []
+
+def render() -> str:
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+# --- Bot Metrics ---
+
+INTERACTION_ACK_SECONDS = Histogram(
+    'audiobot_interaction_ack_seconds', 'Time from interaction creation to acknowledgement.',
+    labelnames=('handler',), buckets=(0.1, 0.25, 0.5, 1.0, 1.5, 2.0, 2.5, 3.0, 5.0)
+)
+INTERACTION_ACK_MISSED = Counter(
+    'audiobot_interaction_ack_missed_total', 'Interactions not acknowledged within the 3 second deadline.', labelnames=('handler',)
+)
+FFPROBE_CALLS = Counter('audiobot_ffprobe_calls_total', 'ffprobe invocations by result.', labelnames=('result',))
+FFPROBE_SECONDS = Histogram('audiobot_ffprobe_seconds', 'Duration of ffprobe invocations.')
+LIBRARY_SCAN_SECONDS = Histogram(
+    'audiobot_library_scan_seconds', 'Duration of full library directory scans.', buckets=(0.01, 0.05, 0.1, 0.5, 1, 5, 10, 30, 60, 300)
+)
+LOUDNESS_ANALYSIS_SECONDS = Histogram(
+    'audiobot_loudness_analysis_seconds', 'Duration of offline EBU R128 loudness measurements per file.', buckets=(1, 5, 10, 30, 60, 120, 300, 600, 1800)
+)
+MESSAGE_EDIT_SECONDS = Histogram('audiobot_message_edit_seconds', 'Latency of Discord message edits.', labelnames=('source',))
+MESSAGE_EDIT_ERRORS = Counter('audiobot_message_edit_errors_total', 'Failed message edits by HTTP status.', labelnames=('status',))
+RATE_LIMITS = Counter('audiobot_rate_limited_total', 'HTTP 429 responses received from Discord.')
+VOICE_CONNECT_SECONDS = Histogram(
+    'audiobot_voice_connect_seconds', 'Time to connect to a voice channel.', buckets=(0.25, 0.5, 1, 2, 3, 5, 10, 20)
+)
+CACHE_HITS = Counter('audiobot_cache_hits_total', 'Lookups served from a cache.', labelnames=('cache',))
+CACHE_MISSES = Counter('audiobot_cache_misses_total', 'Lookups that missed a cache.', labelnames=('cache',))
+ACTIVE_SESSIONS = Gauge('audiobot_active_sessions', 'Player sessions in PlayerCog.active_views.')
+FFMPEG_PROCESSES = Gauge('audiobot_ffmpeg_processes', 'Running ffmpeg children.')
+QUEUED_STREAMS = Gauge('audiobot_queued_streams', 'Plays waiting for a free stream slot.')
+
+def observe_cache(cache: str, hit: bool):
+    (CACHE_HITS if hit else CACHE_MISSES).inc(cache=cache)
+
+class _RateLimitCounter(logging.Handler):
+    """Counts the 429 warnings nextcord's HTTP client logs before it retries."""
+    def emit(self, record):
+        if 'rate limit' in record.getMessage().lower():
+            RATE_LIMITS.inc()
+
+def install_rate_limit_counter():
+    handler = _RateLimitCounter(level=logging.WARNING)
+    for name in ('nextcord.http', 'nextcord.webhook.async_'):
+        logging.getLogger(name).addHandler(handler)
+
+# --- HTTP Endpoint ---
+
+_server = None
+
+async def _handle_request(reader, writer):
+    try:
+        request_line = await asyncio.wait_for(reader.readline(), timeout=5)
+        # Drain the headers; we only care about the path
+        while (await asyncio.wait_for(reader.readline(), timeout=5)) not in (b'\r\n', b'\n', b''):
+            pass
+        parts = request_line.decode('latin-1').split()
+        if len(parts) >= 2 and parts[0] == 'GET' and parts[1].split('?')[0] == '/metrics':
+            body = render().encode('utf-8')
+            status = '200 OK'
+            content_type = 'text/plain; version=0.0.4; charset=utf-8'
+        else:
+            body = b'Not Found\n'
+            status = '404 Not Found'
+            content_type = 'text/plain'
+        writer.write(
+            f"HTTP/1.1 {status}\r\nContent-Type: {content_type}\r\nContent-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode('latin-1')
+            + body
+        )
+        await writer.drain()
+    except (asyncio.TimeoutError, ConnectionError):
+        pass
+    finally:
+        writer.close()
+
+async def start_server(host: str, port: int):
+    """Starts the /metrics endpoint once. Does nothing if it is already running."""
+    global _server
+    if _server is not None:
+        return
+    _server = await asyncio.start_server(_handle_request, host, port)
+    install_rate_limit_counter()
+    log.info("Metrics endpoint listening on http://%s:%s/metrics", host, port)
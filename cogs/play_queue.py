@@ -0,0 +1,169 @@
+# cogs/play_queue.py
+import asyncio
+import collections
+import logging
+import os
+import threading
+import time
+
+from config import QUEUE_WARM_MB
+from . import audio_utils
+from . import metrics
+from .catalog import catalog
+
+log = logging.getLogger(__name__)
+
+QueueItem = collections.namedtuple('QueueItem', 'book_path chapter_filename title')  # chapter_filename None = first chapter
+
+MAX_QUEUE_ITEMS = 100
+RESOLVED_CACHE_SIZE = 16  # books whose chapters and cover are kept ready
+TAIL_WARM_BYTES = 1024 * 1024  # the moov atom of an .m4b is sometimes at the end, and ffmpeg reads it first
+
+LOOKAHEAD_SECONDS = metrics.Histogram(
+    'audiobot_lookahead_seconds', 'Time to resolve and warm the next item to play.', buckets=(0.001, 0.01, 0.05, 0.1, 0.5, 1, 5, 10)
+)
+
+def warm_file(file_path: str, nbytes: int = QUEUE_WARM_MB * 1024 * 1024):
+    """
+    Pulls the start (and the last MB) of a file into the OS page cache, so the ffmpeg that opens it
+    next doesn't wait on the disk or network share. Uses posix_fadvise where available, reads otherwise.
+    """
+    try:
+        with open(file_path, 'rb') as f:
+            size = os.fstat(f.fileno()).st_size
+            ranges = [(0, min(nbytes, size)), (max(0, size - TAIL_WARM_BYTES), min(TAIL_WARM_BYTES, size))]
+            if hasattr(os, 'posix_fadvise'):
+                for offset, length in ranges:
+                    os.posix_fadvise(f.fileno(), offset, length, os.POSIX_FADV_WILLNEED)
+                return
+            for offset, length in ranges:
+                f.seek(offset)
+                while length > 0:
+                    chunk = f.read(min(length, 1024 * 1024))
+                    if not chunk:
+                        break
+                    length -= len(chunk)
+    except OSError as e:
+        log.warning("Could not warm %s: %s", file_path, e)
+
+class PlayQueue:
+    """
+    Per-guild queues of books (or a book from a given chapter) to play after the current one,
+    plus a look-ahead worker.
+
+    Whenever a chapter starts, the worker works out what plays after it (the next chapter, or the
+    head of the queue at the end of a book) and, off the event loop, resolves a queued book's
+    chapters, total duration and cover and warms the page cache for the next file. Moving into the
+    next book then costs what moving to the next chapter does.
+    """
+    def __init__(self):
+        self._queues = {}  # key: guild id, value: deque of QueueItem
+        self._resolved = collections.OrderedDict()  # key: book path, value: {'chapters', 'duration', 'cover'}
+        self._resolved_lock = threading.Lock()
+        self._jobs = None
+        self._pending = set()
+        self._task = None
+
+    # --- Queue ---
+
+    def add(self, guild_id: int, items: list) -> int:
+        """Appends items; returns how many fit under MAX_QUEUE_ITEMS."""
+        queue = self._queues.setdefault(guild_id, collections.deque())
+        items = items[:max(0, MAX_QUEUE_ITEMS - len(queue))]
+        queue.extend(items)
+        return len(items)
+
+    def items(self, guild_id: int) -> list:
+        return list(self._queues.get(guild_id, ()))
+
+    def pop_next(self, guild_id: int):
+        queue = self._queues.get(guild_id)
+        if not queue:
+            return None
+        item = queue.popleft()
+        if not queue:
+            del self._queues[guild_id]
+        return item
+
+    def clear(self, guild_id: int) -> int:
+        return len(self._queues.pop(guild_id, ()))
+
+    # --- Look-ahead ---
+
+    def resolved(self, book_path: str):
+        """Chapters, duration and cover of a book the worker already resolved, or None."""
+        with self._resolved_lock:
+            entry = self._resolved.get(book_path)
+        metrics.observe_cache('lookahead', entry is not None)
+        return entry
+
+    def resolve(self, book_path: str) -> dict:
+        """Reads a book's chapters, total duration and cover (blocking) and keeps them for the switch."""
+        chapters = catalog.get_chapters(book_path)
+        cover = None
+        if chapters:
+            cover = audio_utils.extract_cover_image(os.path.join(book_path, chapters[0]['filename']))
+        entry = {'chapters': chapters, 'duration': catalog.get_timeline(book_path).total, 'cover': cover}
+        with self._resolved_lock:
+            self._resolved[book_path] = entry
+            self._resolved.move_to_end(book_path)
+            while len(self._resolved) > RESOLVED_CACHE_SIZE:
+                self._resolved.popitem(last=False)
+        return entry
+
+    def _prepare(self, current_file: str, next_chapter_file: str, queued: QueueItem):
+        start = time.perf_counter()
+        if next_chapter_file is None and queued is not None:
+            entry = self.resolve(queued.book_path)
+            chapters = entry['chapters']
+            index = next((i for i, chapter in enumerate(chapters) if chapter['filename'] == queued.chapter_filename), 0)
+            if chapters:
+                next_chapter_file = os.path.join(queued.book_path, chapters[index]['filename'])
+        if next_chapter_file and next_chapter_file != current_file:
+            warm_file(next_chapter_file)
+        LOOKAHEAD_SECONDS.observe(time.perf_counter() - start)
+
+    def schedule(self, guild_id: int, view):
+        """Queues look-ahead work for whatever plays after the view's current chapter."""
+        if self._jobs is None or not view.selected_book_path:
+            return
+        next_index = view.current_chapter_index + 1
+        next_chapter_file = None
+        if next_index < len(view.all_chapters):
+            next_chapter_file = os.path.join(view.selected_book_path, view.all_chapters[next_index]['filename'])
+        queue = self._queues.get(guild_id)
+        queued = queue[0] if queue and next_chapter_file is None else None
+        if next_chapter_file is None and queued is None:
+            return
+        key = (guild_id, next_chapter_file, queued)
+        if key in self._pending:
+            return
+        self._pending.add(key)
+        self._jobs.put_nowait((key, view.selected_chapter_path, next_chapter_file, queued))
+
+    def start(self, loop=None):
+        if self._task and not self._task.done():
+            return
+        loop = loop or asyncio.get_running_loop()
+        self._jobs = asyncio.Queue()
+        self._task = loop.create_task(self._run())
+
+    def stop(self):
+        if self._task:
+            self._task.cancel()
+            self._task = None
+        self._jobs = None
+        self._pending.clear()
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            key, current_file, next_chapter_file, queued = await self._jobs.get()
+            try:
+                await loop.run_in_executor(None, self._prepare, current_file, next_chapter_file, queued)
+            except Exception:
+                log.exception("Look-ahead for %s failed.", queued.book_path if queued else next_chapter_file)
+            finally:
+                self._pending.discard(key)
+
+play_queue = PlayQueue()
@@ -1,24 +1,157 @@
 # cogs/playback_handler.py
 import nextcord as discord
 import asyncio
+import io
 import logging
 import os
 import time
 from . import audio_utils
+from . import library_index
+from . import silence_map
+from .ffmpeg_supervisor import supervisor
+from .catalog import catalog
+from .resume_store import resume_store
+from .position_source import PositionTrackingSource, report_drift
+from .volume import VolumeSource, find_volume_source
+from .listening_party import party_manager
+from .play_queue import play_queue
+from . import metrics
+from config import AUDIO_ENCODER, OPUS_BITRATE
 from datetime import datetime, timezone, timedelta
 
 log = logging.getLogger(__name__)
 
-async def play_audio(interaction: discord.Interaction, view, seek_time=0, is_scrub=False, is_auto_advance=False):
+def create_audio_source(audio_path: str, seek_time: float = 0, start: float = None, duration: float = None, gain_db: float = 0.0, skips: list = None, volume: float = 1.0, speed: float = 1.0, encode_opus: bool = False):
+    """
+    Spawns the ffmpeg child for a stream.
+    With AUDIO_ENCODER = "ffmpeg", ffmpeg also does the Opus encoding, so the bot process
+    only forwards ready-made packets and each stream's encode runs on its own core.
+    Otherwise ffmpeg outputs PCM and the voice client encodes it in the bot process.
+
+    Seeks go before the input so ffmpeg jumps straight to the position instead of decoding
+    everything up to it. start/duration play a range of the file (a chapter of a single-file book).
+    gain_db is the precomputed loudness normalization gain: a plain volume filter, no live analysis.
+    skips are precomputed silent ranges (seconds from the seek point) dropped with an aselect filter.
+    volume is the listener's volume: scaled in bulk by a VolumeSource for PCM, so it can change
+    mid-stream, or baked into the filter graph when ffmpeg encodes Opus.
+    speed adds an atempo filter (pitch preserved); seek_time stays in chapter time.
+    encode_opus makes ffmpeg encode regardless of AUDIO_ENCODER (a listening party shares the packets).
+    """
+    encode_opus = encode_opus or AUDIO_ENCODER == "ffmpeg"
+    before_options = None
+    ffmpeg_options = "-vn"
+    if start is not None:
+        # -t on the input side, so it still ends the chapter when skips shorten the output
+        before_options = f"-ss {start + seek_time:.3f} -t {max(0.0, duration - seek_time):.3f}"
+    elif seek_time > 0:
+        before_options = f"-ss {seek_time:.3f}"
+    filters = []
+    if gain_db:
+        filters.append(f"volume={gain_db:.2f}dB")
+    if skips:
+        filters.append(silence_map.skip_filter(skips))
+    if speed != 1.0:
+        filters.append(f"atempo={speed:g}")
+    if encode_opus and volume != 1.0:
+        filters.append(f"volume={volume:.2f}")
+    if filters:
+        ffmpeg_options += f' -af "{",".join(filters)}"'
+    if encode_opus:
+        source = discord.FFmpegOpusAudio(audio_path, bitrate=OPUS_BITRATE, before_options=before_options, options=ffmpeg_options)
+    else:
+        source = VolumeSource(discord.FFmpegPCMAudio(audio_path, before_options=before_options, options=ffmpeg_options), volume)
+    return PositionTrackingSource(source, offset=seek_time, skips=skips, speed=speed)
+
+def current_chapter(view):
+    """The chapter dict the view is playing, or None if no chapter is selected."""
+    if 0 <= view.current_chapter_index < len(view.all_chapters):
+        return view.all_chapters[view.current_chapter_index]
+    return None
+
+def chapter_title(view) -> str:
+    """Title of the playing chapter from the chapter list, so status updates don't re-probe the file."""
+    chapter = current_chapter(view)
+    if chapter:
+        return chapter['title']
+    return audio_utils.get_book_title(view.selected_chapter_path)
+
+def wall_clock_elapsed(view) -> float:
+    """Estimate of the position from when playback started, accounting for a pause in progress and the speed."""
+    if view.is_paused:
+        return view.current_seek + (view.pause_start_time - view.play_start_time) * view.speed
+    return view.current_seek + (time.time() - view.play_start_time) * view.speed
+
+def elapsed_time(view) -> float:
+    """Seconds into the current chapter: the frames the voice client actually played, when known."""
+    source = getattr(view, 'audio_source', None)
+    if isinstance(source, PositionTrackingSource):
+        return source.position
+    return wall_clock_elapsed(view)
+
+def save_position(view, elapsed: float = None):
+    """Remembers where the view's listener is in the book (see resume_store; cheap, no I/O here)."""
+    chapter = current_chapter(view)
+    if chapter is None or not view.selected_book_path:
+        return
+    if elapsed is None:
+        elapsed = elapsed_time(view)
+    resume_store.record(view.author.id, view.selected_book_path, view.current_chapter_index, chapter['filename'], elapsed)
+
+def set_volume(view, volume: float) -> bool:
+    """
+    Sets the view's volume for this and later streams. Returns True if the playing stream picked it
+    up in place, False if it has to be restarted for the change to be heard (Opus from ffmpeg).
+    """
+    view.volume = volume
+    source = find_volume_source(getattr(view, 'audio_source', None))
+    if source is None:
+        return False
+    source.volume = volume
+    return True
+
+def book_progress(view, elapsed: float) -> str:
+    """Whole-book position for the status line, e.g. " · book 05:32:10 / 12:00:00"; empty for one-chapter books."""
+    chapter = current_chapter(view)
+    if chapter is None or len(view.all_chapters) < 2:
+        return ""
+    timeline = catalog.get_timeline(view.selected_book_path)
+    if len(timeline) != len(view.all_chapters):
+        return ""
+    position = audio_utils.format_time(timeline.book_time(view.current_chapter_index, elapsed))
+    return f" · book {position} / {audio_utils.format_time(timeline.total)}"
+
+def speed_progress(view, elapsed: float) -> str:
+    """
+    Listening time at the current speed for the status message, on a line of its own, e.g.
+    "⏩ 1.5× · chapter 00:13:20 · 00:06:40 left (07:12:00 in book)"; empty at normal speed.
+    """
+    speed = view.speed
+    if speed == 1.0 or not view.duration:
+        return ""
+    remaining = max(0.0, view.duration - elapsed) / speed
+    text = f"\n⏩ {speed:g}× · chapter {audio_utils.format_time(view.duration / speed)[:8]} · {audio_utils.format_time(remaining)[:8]} left"
+    if len(view.all_chapters) > 1:
+        timeline = catalog.get_timeline(view.selected_book_path)
+        if len(timeline) == len(view.all_chapters):
+            book_remaining = max(0.0, timeline.total - timeline.book_time(view.current_chapter_index, elapsed)) / speed
+            text += f" ({audio_utils.format_time(book_remaining)[:8]} in book)"
+    return text
+
+async def play_audio(interaction: discord.Interaction, view, seek_time=0, is_scrub=False, is_auto_advance=False, keep_panel=False):
     # state handling
-    log.info(f"Play audio request - Guild: {interaction.guild.name} ({interaction.guild.id}), User: {interaction.user}")
-    log.info(f"Current voice clients: {[(vc.guild.name, vc.channel.name if vc.channel else 'None') for vc in interaction.client.voice_clients]}")
+    # keep_panel: restart the stream for a slash command without moving the player panel onto its reply
+    panel_interaction = view.interaction if keep_panel and view.interaction else interaction
+    log.info("Play audio request - Guild: %s (%s), User: %s", interaction.guild.name, interaction.guild.id, interaction.user)
+    if log.isEnabledFor(logging.DEBUG):
+        # Walks every voice client of every shard, so only build it when it will actually be written
+        log.debug("Current voice clients: %s", [(vc.guild.name, vc.channel.name if vc.channel else 'None') for vc in interaction.client.voice_clients])
 
     audio_path = view.selected_chapter_path
-    log.info(f"Playback requested by {interaction.user} in guild '{interaction.guild.name}' at seek time {seek_time}s.")
-    log.debug(f"File path for playback: '{audio_path}'")
+    log.info("Playback requested by %s in guild '%s' at seek time %ss.", interaction.user, interaction.guild.name, seek_time)
+    log.debug("File path for playback: '%s'", audio_path)
 
     voice_client = discord.utils.get(interaction.client.voice_clients, guild=interaction.guild)
+    reservation = None
 
     try:
         # --- Connection Logic ---
@@ -29,7 +162,7 @@ async def play_audio(interaction: discord.Interaction, view, seek_time=0, is_scr
                     await interaction.followup.send("Please select a voice channel first!", ephemeral=True)
                 return
                 
-            log.info(f"Connecting to '{view.selected_channel.name}' ({view.selected_channel.id}).")
+            log.info("Connecting to '%s' (%s).", view.selected_channel.name, view.selected_channel.id)
             
             # Disconnect any existing connection first
             if voice_client:
@@ -37,7 +170,8 @@ async def play_audio(interaction: discord.Interaction, view, seek_time=0, is_scr
                 await asyncio.sleep(1)
 
             # Connect with timeout
-            voice_client = await view.selected_channel.connect(timeout=20.0, reconnect=False)
+            with metrics.VOICE_CONNECT_SECONDS.time():
+                voice_client = await view.selected_channel.connect(timeout=20.0, reconnect=False)
             log.info("Successfully connected to voice channel.")
             
             # Wait for connection to stabilize
@@ -46,7 +180,7 @@ async def play_audio(interaction: discord.Interaction, view, seek_time=0, is_scr
             # Move to different channel if needed
             await voice_client.move_to(view.selected_channel)
             if view.selected_channel:
-                log.info(f"Moved to channel: {view.selected_channel.name}")
+                log.info("Moved to channel: %s", view.selected_channel.name)
             else:
                 log.info("Moved to voice channel (channel reference not set)")
 
@@ -65,58 +199,90 @@ async def play_audio(interaction: discord.Interaction, view, seek_time=0, is_scr
         else:
             log.info("Voice client appears to be idle.")
 
+        # --- Admission Control ---
+        async def notify_queued(position):
+            if not is_auto_advance:
+                await interaction.followup.send(f"⏳ All audio streams are busy. You're number {position} in the queue, playback will start shortly.", ephemeral=True)
+
+        reservation = await supervisor.acquire(interaction.guild.id, on_queued=notify_queued)
+        if reservation is None:
+            view.is_playing = False
+            if not is_auto_advance:
+                await interaction.followup.send("Sorry, the bot is streaming to too many servers right now. Please try again in a few minutes.", ephemeral=True)
+            return
+
         # --- Get audio duration and set up tracking ---
-        duration = audio_utils.get_duration(audio_path)
+        chapter = current_chapter(view)
+        start = chapter.get('start') if chapter else None
+        duration = chapter['duration'] if start is not None else audio_utils.get_duration(audio_path)
         view.current_seek = seek_time
         view.play_start_time = time.time()
         view.is_playing = True
         view.is_paused = False
         view.pause_start_time = 0
         view.duration = duration
-        view.interaction = interaction
+        view.interaction = panel_interaction
         view.manual_stop = False
+        view.last_activity = time.time()
 
         # --- Create the message content ---
-        chapter_title = audio_utils.get_book_title(audio_path)
+        title = chapter_title(view)
         book_title = os.path.basename(os.path.dirname(view.selected_book_path))
         elapsed_str = audio_utils.format_time(seek_time)
         duration_str = audio_utils.format_time(duration)
 
-        message = f"▶️ Now playing: **{chapter_title}** from *{book_title}*\n`{elapsed_str} / {duration_str}`"
+        message = f"▶️ Now playing: **{title}** from *{book_title}*\n`{elapsed_str} / {duration_str}`{book_progress(view, seek_time)}{speed_progress(view, seek_time)}"
 
         # Update the view to show player controls (only if not scrubbing)
         if not is_scrub:
             view.update_player_view()
 
         # --- UPDATED: Handle message updates with token expiry protection ---
-        await safe_update_message(interaction, view, message, is_auto_advance)
+        await safe_update_message(panel_interaction, view, message, is_auto_advance)
 
         # --- Audio Source Creation and Playback ---
-        log.info(f"Preparing to create FFmpeg audio source for: {audio_path} at {seek_time}s")
+        log.info("Preparing to create FFmpeg audio source for: %s at %ss", audio_path, seek_time)
     
-        # Create audio source with seeking if needed
-        if seek_time > 0:
-            ffmpeg_options = f"-vn -ss {seek_time}"
-            source = discord.FFmpegPCMAudio(audio_path, options=ffmpeg_options)
-        else:
-            source = discord.FFmpegPCMAudio(audio_path)
+        def load_analysis():
+            # Index lookups (a stat and SQLite reads) stay off the event loop
+            gain = library_index.get_gain(audio_path)
+            if not view.skip_silence:
+                return gain, None
+            return gain, silence_map.playback_skips(audio_path, (start or 0) + seek_time, start + duration if start is not None else None)
+
+        gain_db, skips = await asyncio.get_running_loop().run_in_executor(None, load_analysis)
+        if gain_db:
+            log.debug("Applying a loudness gain of %.2f dB to %s", gain_db, audio_path)
+        if skips is not None:
+            log.debug("Skipping %s silent ranges in %s", len(skips), audio_path)
+        party = party_manager.hosted_by(interaction.guild.id)
+        source = create_audio_source(audio_path, seek_time, start=start, duration=duration, gain_db=gain_db, skips=skips,
+                                     volume=view.volume, speed=view.speed, encode_opus=party is not None)
     
+        if not supervisor.register(interaction.guild.id, source, reservation):
+            # A newer play in this guild (or the reaper) took the slot while this one was preparing
+            source.cleanup()
+            return
+        view.audio_source = source
         log.info("Successfully created FFmpeg audio source.")
 
         if not voice_client.is_connected():
             log.error("Voice client disconnected while audio was being prepared. Aborting playback.")
+            source.cleanup()
+            supervisor.release(interaction.guild.id, source)
             if not is_auto_advance:
                 await interaction.followup.send("Sorry, I was disconnected from the voice channel while preparing the audio.", ephemeral=True)
             return
     
-        log.info(f"Initiating playback on voice client for guild {interaction.guild.id}.")
+        log.info("Initiating playback on voice client for guild %s.", interaction.guild.id)
 
         def after_play(error):
+            supervisor.release(interaction.guild.id, source)
             if error:
-                log.error(f'Player error: {error}')
+                log.error("Player error: %s", error)
                 view.is_playing = False
             else:
-                log.info(f"Playback finished for file: {audio_path}")
+                log.info("Playback finished for file: %s", audio_path)
                 view.is_playing = False
           
                 # Check manual_stop flag BEFORE any resets
@@ -131,7 +297,11 @@ async def play_audio(interaction: discord.Interaction, view, seek_time=0, is_scr
                     # Reset manual_stop only after checking it
                     view.manual_stop = False
 
-        voice_client.play(source, after=after_play)
+        if party:
+            # Every channel of the party plays this stream in lockstep; one ffmpeg feeds them all
+            voice_client.play(party.broadcast(source), after=after_play)
+        else:
+            voice_client.play(source, after=after_play)
 
         # Only reset manual_stop if playback started successfully AND this wasn't a manual stop
         if not getattr(view, 'manual_stop', False):
@@ -145,32 +315,53 @@ async def play_audio(interaction: discord.Interaction, view, seek_time=0, is_scr
             presence_text = audio_utils.format_presence_text(
                 audio_path, 
                 view.selected_book_path, 
-                elapsed_seconds=seek_time
+                elapsed_seconds=seek_time,
+                chapter_title=title
             )
             activity = discord.Activity(type=discord.ActivityType.listening, name=presence_text)
             await view.bot.change_presence(activity=activity)
-            log.info(f"Updated presence: {presence_text}")
+            log.info("Updated presence: %s", presence_text)
         except Exception as e:
-            log.warning(f"Failed to update presence: {e}")
+            log.warning("Failed to update presence: %s", e)
 
         # Start time tracker task (only if not already running)
         if not hasattr(view, 'time_tracker_running') or not view.time_tracker_running:
             view.time_tracker_running = True
             asyncio.create_task(update_time_tracker(view))
 
+        # Resolve and warm whatever plays next while this chapter plays
+        play_queue.schedule(interaction.guild.id, view)
+
     except discord.errors.ConnectionClosed as e:
-        log.error(f"Voice connection closed: {e}")
+        if reservation is not None and not voice_client.is_playing():
+            supervisor.release(interaction.guild.id, reservation)
+        log.error("Voice connection closed: %s", e)
         if not is_auto_advance:
             await interaction.followup.send("Voice connection failed. This might be a Discord server issue. Try again in a moment.", ephemeral=True)
     except asyncio.TimeoutError:
+        if reservation is not None and not voice_client.is_playing():
+            supervisor.release(interaction.guild.id, reservation)
         log.error("Connection to voice channel timed out.")
         if not is_auto_advance:
             await interaction.followup.send("I couldn't connect to the voice channel in time. Please try again.", ephemeral=True)
     except Exception:
+        if reservation is not None and not voice_client.is_playing():
+            supervisor.release(interaction.guild.id, reservation)
         log.exception("An unexpected error occurred during audio connection or playback.")
         if not is_auto_advance:
             await interaction.followup.send("Sorry, I couldn't play that file. An unexpected error occurred.", ephemeral=True)
 
+async def edit_message(message, source: str, **kwargs):
+    """Edits a message, recording latency and failures by status in the metrics (429s are counted by RATE_LIMITS' log handler)."""
+    start = time.perf_counter()
+    try:
+        result = await message.edit(**kwargs)
+    except discord.HTTPException as e:
+        metrics.MESSAGE_EDIT_ERRORS.inc(status=e.status)
+        raise
+    metrics.MESSAGE_EDIT_SECONDS.observe(time.perf_counter() - start, source=source)
+    return result
+
 def is_message_too_old(message):
     return (datetime.now(timezone.utc) - message.created_at) > timedelta(hours=1)
 
@@ -179,12 +370,12 @@ async def safe_update_message(interaction: discord.Interaction, view, message: s
         original_message = await interaction.original_message()
         if not is_message_too_old(original_message):
             # Edit the original message if it's not too old
-            await original_message.edit(content=message, view=view)
+            await edit_message(original_message, 'play', content=message, view=view)
             if not hasattr(view, 'messages'):
                 view.messages = set()
             view.messages.add(original_message)
             view.message = original_message
-            log.info(f"Updated original message (not too old)")
+            log.info("Updated original message (not too old)")
         else:
             # Original message too old, delete old message if possible
             if view.message:
@@ -194,7 +385,7 @@ async def safe_update_message(interaction: discord.Interaction, view, message: s
                 except (discord.NotFound, discord.Forbidden):
                     log.info("Old player message already deleted or no permission to delete")
                 except Exception as e:
-                    log.warning(f"Failed to delete old player message: {e}")
+                    log.warning("Failed to delete old player message: %s", e)
 
             # Send a new message to the channel
             new_message = await interaction.channel.send(content=message, view=view)
@@ -215,7 +406,7 @@ async def safe_update_message(interaction: discord.Interaction, view, message: s
                     except (discord.NotFound, discord.Forbidden):
                         log.info("Old player message already deleted or no permission to delete")
                     except Exception as e:
-                        log.warning(f"Failed to delete old player message: {e}")
+                        log.warning("Failed to delete old player message: %s", e)
 
                 new_message = await interaction.channel.send(content=message, view=view)
                 if not hasattr(view, 'messages'):
@@ -224,12 +415,12 @@ async def safe_update_message(interaction: discord.Interaction, view, message: s
                 view.message = new_message
                 log.info("Successfully sent new message after token expiry")
             except Exception as fallback_error:
-                log.error(f"Failed to send fallback message: {fallback_error}")
+                log.error("Failed to send fallback message: %s", fallback_error)
         else:
             # Re-raise other HTTP exceptions
             raise
     except Exception as e:
-        log.error(f"Unexpected error updating message: {e}")
+        log.error("Unexpected error updating message: %s", e)
         if not is_auto_advance:
             raise
 
@@ -240,7 +431,7 @@ async def auto_advance_chapter(view):
         next_chapter = audio_utils.get_next_chapter(view.all_chapters, view.current_chapter_index)
       
         if next_chapter:
-            log.info(f"Auto-advancing to next chapter: {next_chapter['title']}")
+            log.info("Auto-advancing to next chapter: %s", next_chapter['title'])
           
             # Update to next chapter
             view.current_chapter_index += 1
@@ -253,14 +444,18 @@ async def auto_advance_chapter(view):
             try:
                 presence_text = audio_utils.format_presence_text(
                     view.selected_chapter_path, 
-                    view.selected_book_path
+                    view.selected_book_path,
+                    chapter_title=chapter_title(view)
                 )
                 activity = discord.Activity(type=discord.ActivityType.listening, name=presence_text)
                 await view.bot.change_presence(activity=activity)
             except Exception as e:
-                log.warning(f"Failed to update presence during auto-advance: {e}")
+                log.warning("Failed to update presence during auto-advance: %s", e)
+        elif await advance_to_queued_book(view):
+            return
         else:
             log.info("Reached end of audiobook. Returning to chapter list.")
+            resume_store.forget(view.author.id, view.selected_book_path)
           
             # Update UI to show chapter list
             view.is_playing = False
@@ -271,7 +466,7 @@ async def auto_advance_chapter(view):
                 await view.bot.change_presence(activity=None)
                 log.info("Cleared presence - audiobook finished")
             except Exception as e:
-                log.warning(f"Failed to clear presence: {e}")
+                log.warning("Failed to clear presence: %s", e)
 
             view.update_view()
           
@@ -282,10 +477,51 @@ async def auto_advance_chapter(view):
             )
             
     except Exception as e:
-        log.error(f"Error in auto-advance: {e}")
+        log.error("Error in auto-advance: %s", e)
         view.is_playing = False
         view.time_tracker_running = False
 
+async def advance_to_queued_book(view) -> bool:
+    """
+    At the end of a book, starts the next item of the guild's play queue. Its chapters and cover
+    were normally resolved by the look-ahead worker while the last chapter played.
+    Returns False if the queue holds nothing playable.
+    """
+    guild_id = view.interaction.guild.id
+    while True:
+        item = play_queue.pop_next(guild_id)
+        if item is None:
+            return False
+        entry = play_queue.resolved(item.book_path)
+        if entry is None:
+            entry = await asyncio.get_running_loop().run_in_executor(None, play_queue.resolve, item.book_path)
+        if entry['chapters']:
+            break
+        log.warning("Skipping queued book %s: no chapters found.", item.book_path)
+
+    chapters = entry['chapters']
+    index = next((i for i, chapter in enumerate(chapters) if chapter['filename'] == item.chapter_filename), 0)
+    log.info("Reached end of audiobook. Continuing with queued book: %s", item.book_path)
+    resume_store.forget(view.author.id, view.selected_book_path)
+    view.open_book(item.book_path, chapters, index)
+
+    try:
+        content = f"📖 Up next: **{item.title}** ({audio_utils.format_time(entry['duration'])})"
+        if entry['cover']:
+            await view.interaction.channel.send(content, file=discord.File(io.BytesIO(entry['cover']), filename="cover.jpg"))
+        else:
+            await view.interaction.channel.send(content)
+    except Exception as e:
+        log.warning("Failed to announce queued book: %s", e)
+
+    await play_audio(view.interaction, view, seek_time=0, is_auto_advance=True)
+    try:
+        presence_text = audio_utils.format_presence_text(view.selected_chapter_path, view.selected_book_path, chapter_title=chapter_title(view))
+        await view.bot.change_presence(activity=discord.Activity(type=discord.ActivityType.listening, name=presence_text))
+    except Exception as e:
+        log.warning("Failed to update presence for queued book: %s", e)
+    return True
+
 async def safe_channel_message(view, content: str):
     """Send a message to the channel, bypassing interaction tokens entirely"""
     try:
@@ -296,7 +532,7 @@ async def safe_channel_message(view, content: str):
             
             for message in list(view.messages):
                 try:
-                    await message.edit(content=content, view=view)
+                    await edit_message(message, 'channel', content=content, view=view)
                     updated_any = True
                     break  # Successfully updated one message, that's enough
                 except (discord.NotFound, discord.Forbidden, discord.HTTPException):
@@ -320,33 +556,32 @@ async def safe_channel_message(view, content: str):
             log.info("Sent new message to channel as fallback")
             
     except Exception as e:
-        log.error(f"Failed to send safe channel message: {e}")
+        log.error("Failed to send safe channel message: %s", e)
 
 async def update_time_tracker(view):
     """Updates the time display for all tracked messages"""
     while view.is_playing and view.time_tracker_running:
         try:
             # Calculate current progress
-            if view.is_paused:
-                current_elapsed = view.current_seek + (view.pause_start_time - view.play_start_time)
-            else:
-                current_elapsed = view.current_seek + (time.time() - view.play_start_time)
+            current_elapsed = elapsed_time(view)
+            save_position(view, current_elapsed)
+            report_drift(view, wall_clock_elapsed(view))
             
             # Get current chapter and book info
-            chapter_title = audio_utils.get_book_title(view.selected_chapter_path)
+            title = chapter_title(view)
             book_title = os.path.basename(os.path.dirname(view.selected_book_path))
             elapsed_str = audio_utils.format_time(current_elapsed)
             duration_str = audio_utils.format_time(view.duration)
             
             status_emoji = "⏸️" if view.is_paused else "▶️"
-            new_content = f"{status_emoji} Now playing: **{chapter_title}** from *{book_title}*\n`{elapsed_str} / {duration_str}`"
+            new_content = f"{status_emoji} Now playing: **{title}** from *{book_title}*\n`{elapsed_str} / {duration_str}`{book_progress(view, current_elapsed)}{speed_progress(view, current_elapsed)}"
             
             # Update all tracked messages
             if hasattr(view, 'messages'):
                 messages_to_remove = set()
                 for message in list(view.messages):
                     try:
-                        await message.edit(content=new_content, view=view)
+                        await edit_message(message, 'tracker', content=new_content, view=view)
                     except discord.NotFound:
                         messages_to_remove.add(message)
                         log.debug("Removed expired message from tracking")
@@ -358,31 +593,31 @@ async def update_time_tracker(view):
                             messages_to_remove.add(message)
                             log.warning("Webhook token expired - removing message from tracking")
                         else:
-                            log.warning(f"Failed to update message: {e}")
+                            log.warning("Failed to update message: %s", e)
                     except Exception as e:
-                        log.warning(f"Unexpected error updating message: {e}")
+                        log.warning("Unexpected error updating message: %s", e)
                 
                 # Remove expired/invalid messages
                 view.messages -= messages_to_remove
                 
                 if messages_to_remove:
-                    log.info(f"Cleaned up {len(messages_to_remove)} expired messages (remaining: {len(view.messages)})")
+                    log.info("Cleaned up %s expired messages (remaining: %s)", len(messages_to_remove), len(view.messages))
 
             # Fallback for backward compatibility
             elif view.message:
                 try:
-                    await view.message.edit(content=new_content, view=view)
+                    await edit_message(view.message, 'tracker', content=new_content, view=view)
                 except discord.HTTPException as e:
                     if "Invalid Webhook Token" in str(e) or e.code == 50027:
                         log.warning("Main message webhook token expired - clearing reference")
                         view.message = None
                     else:
-                        log.warning(f"Failed to update main message: {e}")
+                        log.warning("Failed to update main message: %s", e)
                 except Exception as e:
-                    log.warning(f"Failed to update main message: {e}")
+                    log.warning("Failed to update main message: %s", e)
             
         except Exception as e:
-            log.error(f"Error in time tracker: {e}")
+            log.error("Error in time tracker: %s", e)
         
         await asyncio.sleep(5)  # Update every 5 seconds
     
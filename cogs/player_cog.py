@@ -9,17 +9,34 @@ import logging
 import time
 import io
 import re
+import threading
 # import tempfile
 # import asyncio
 
 # Import from our new local files
-from config import AUDIOBOOK_PATH, BOOKS_PER_PAGE
+from config import AUDIOBOOK_PATH, BOOKS_PER_PAGE, METRICS_HOST, METRICS_PORT, LOOP_LAG_THRESHOLD, SILENCE_ANALYSIS
+import startup_timeline
 from . import audio_utils
 from . import playback_handler
+from . import library_index
+from .catalog import catalog
+from .search_index import search_index, choice_label, KIND_EMOJI
+from .timeline import parse_book_time
+from .resume_store import resume_store
+from .synopsis_index import synopsis_index
+from .session_reaper import SessionReaper
+from .listening_party import party_manager
+from .play_queue import play_queue, QueueItem, MAX_QUEUE_ITEMS
+from .ffmpeg_supervisor import supervisor
+from . import metrics
+from . import loop_monitor
+from . import ack_tracker
+from .sampling_profiler import SamplingProfiler
 
 log = logging.getLogger(__name__)
 
 CHAPTERS_PER_PAGE = 25
+SPEED_CHOICES = ("0.75x", "1x", "1.25x", "1.5x", "1.75x", "2x")
 
 # --- UI Classes ---
 
@@ -29,7 +46,7 @@ class AudiobookPlayerView(discord.ui.View):
         self.author = author
         self.bot = bot
       
-        self.all_items = audio_utils.get_books_and_series(AUDIOBOOK_PATH)
+        self.all_items = catalog.get_items()
         self.current_page = 0
         self.total_pages = math.ceil(len(self.all_items) / BOOKS_PER_PAGE)
       
@@ -47,6 +64,10 @@ class AudiobookPlayerView(discord.ui.View):
         self.selected_chapter_path = None
         self.selected_channel = None
         self.current_chapter_index = -1  # Track current chapter index
+        self.start_seek = 0  # Where playback starts once a voice channel is picked (set by Resume)
+        self.skip_silence = False  # Drop the silences found by the offline analysis (see silence_map)
+        self.volume = 1.0  # Listener volume, 1.0 = unchanged (see volume.VolumeSource)
+        self.speed = 1.0  # Playback speed (ffmpeg atempo); positions stay in chapter time
       
         # Player state tracking
         self.is_playing = False
@@ -58,6 +79,8 @@ class AudiobookPlayerView(discord.ui.View):
         self.interaction = None
         self.time_tracker_running = False
         self.message = None  # Add this for webhook updates
+        self.audio_source = None  # FFmpeg source of the current stream
+        self.last_activity = time.time()  # Used by the session reaper
       
         self.update_view()
 
@@ -114,6 +137,9 @@ class AudiobookPlayerView(discord.ui.View):
                 self.add_item(ChapterPageButton(label="<< Prev Page", disabled=(self.current_chapter_page == 0), direction=-1))
                 self.add_item(ChapterPageButton(label=f"Page {self.current_chapter_page + 1}/{self.total_chapter_pages}", disabled=True, direction=0))
                 self.add_item(ChapterPageButton(label="Next Page >>", disabled=(self.current_chapter_page >= self.total_chapter_pages - 1), direction=1))
+            position = resume_store.get(self.author.id, self.selected_book_path)
+            if position:
+                self.add_item(ResumeButton(position))
             self.add_item(SynopsisButton(book_path=self.selected_book_path))
             self.add_item(BackButton())
 
@@ -126,7 +152,7 @@ class AudiobookPlayerView(discord.ui.View):
                 await interaction_or_message.edit(**kwargs)
         except discord.errors.HTTPException as e:
             if e.code == 50027:  # Invalid Webhook Token
-                log.warning(f"Webhook token expired, cannot update message: {e}")
+                log.warning("Webhook token expired, cannot update message: %s", e)
                 # Remove expired messages from tracking
                 if hasattr(self, 'messages'):
                     self.messages.discard(interaction_or_message)
@@ -170,6 +196,37 @@ class AudiobookPlayerView(discord.ui.View):
         self.add_item(SynopsisButton(book_path=self.selected_book_path))
         self.add_item(BackButton())
 
+    def open_search_result(self, entry):
+        """Jumps straight to a /search result: an author's items, a series, or a book's chapters."""
+        if entry.series_path:
+            self.selected_series = next((item for item in self.all_items if item['path'] == entry.series_path), None)
+        if entry.kind == 'author':
+            self.all_items = [item for item in self.all_items if item['author'] == entry.text]
+            self.current_page = 0
+            self.total_pages = math.ceil(len(self.all_items) / BOOKS_PER_PAGE)
+            self.selection_state = 'items'
+        elif entry.kind == 'series':
+            self.selection_state = 'series_books' if self.selected_series else 'items'
+        else:
+            self.selected_book_path = entry.book_path
+            self.all_chapters = catalog.get_chapters(entry.book_path)
+            self.total_chapter_pages = math.ceil(len(self.all_chapters) / CHAPTERS_PER_PAGE)
+            index = next((i for i, chapter in enumerate(self.all_chapters) if chapter['filename'] == entry.chapter_filename), 0)
+            self.current_chapter_page = index // CHAPTERS_PER_PAGE
+            self.selection_state = 'chapters'
+        self.update_view()
+
+    def open_book(self, book_path: str, chapters: list, chapter_index: int = 0):
+        """Switches the player to another book (the next item of the play queue) at the given chapter."""
+        self.selected_series = next((item for item in self.all_items if item['type'] == 'series' and any(book['path'] == book_path for book in item['books'])), None)
+        self.selected_book_path = book_path
+        self.all_chapters = chapters
+        self.total_chapter_pages = math.ceil(len(chapters) / CHAPTERS_PER_PAGE)
+        self.current_chapter_page = chapter_index // CHAPTERS_PER_PAGE
+        self.current_chapter_index = chapter_index
+        self.selected_chapter_path = os.path.join(book_path, chapters[chapter_index]['filename'])
+        self.selection_state = 'chapters'
+
     def update_player_view(self):
         """Updates the view to show player controls when audio is playing."""
         self.clear_items()
@@ -191,12 +248,15 @@ class AudiobookPlayerView(discord.ui.View):
       
         self.add_item(TrackButton(label="⏮️ Previous", direction=-1, disabled=not has_previous))
         self.add_item(TrackButton(label="⏭️ Next", direction=1, disabled=not has_next))
+        if SILENCE_ANALYSIS and library_index.index_available():
+            self.add_item(SkipSilenceButton(enabled=self.skip_silence))
       
         # Row 2: Back and Quit buttons
         self.add_item(BackToChaptersButton())
         self.add_item(QuitButton())
 
     async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        self.last_activity = time.time()
         if interaction.user != self.author:
             await interaction.response.send_message("This is not for you but revela says it's okay", ephemeral=True)
             return True
@@ -216,6 +276,7 @@ class ItemSelect(discord.ui.Select):
             ))
         super().__init__(placeholder=placeholder, options=options, disabled=not items)
 
+    @ack_tracker.tracked("ItemSelect")
     async def callback(self, interaction: discord.Interaction):
         selected_index = int(self.values[0])
         selected_item = self.view.all_items[selected_index]
@@ -223,7 +284,7 @@ class ItemSelect(discord.ui.Select):
             self.view.selected_series = selected_item
             self.view.selection_state = 'series_books'
             self.view.update_view()
-            await interaction.response.edit_message(view=self.view)
+            await ack_tracker.edit_message(interaction, view=self.view)
         else:
             await self._handle_book_selection(interaction, selected_item)
 
@@ -232,7 +293,7 @@ class ItemSelect(discord.ui.Select):
             if isinstance(item, (discord.ui.Button, discord.ui.Select)):
                 item.disabled = True
         self.placeholder = "Loading chapters, please wait..."
-        await interaction.response.edit_message(view=self.view)
+        await ack_tracker.edit_message(interaction, view=self.view)
         self.view.selected_book_path = book_item['path']
         await self._load_chapters()
         self.view.selection_state = 'chapters'
@@ -240,17 +301,7 @@ class ItemSelect(discord.ui.Select):
         await interaction.edit_original_message(view=self.view)
 
     async def _load_chapters(self):
-        all_filenames = [f for f in os.listdir(self.view.selected_book_path) if f.endswith('.m4b')]
-        chapter_data = []
-        for filename in all_filenames:
-            full_path = os.path.join(self.view.selected_book_path, filename)
-            chapter_data.append({
-                'filename': filename,
-                'title': audio_utils.get_book_title(full_path),
-                'track': audio_utils.get_track_number(full_path)
-            })
-        chapter_data.sort(key=lambda item: item['track'])
-        self.view.all_chapters = chapter_data
+        self.view.all_chapters = catalog.get_chapters(self.view.selected_book_path)
         self.view.current_chapter_page = 0
         self.view.total_chapter_pages = math.ceil(len(self.view.all_chapters) / CHAPTERS_PER_PAGE)
 
@@ -259,10 +310,11 @@ class SeriesBookPageButton(discord.ui.Button):
         super().__init__(label=label, style=discord.ButtonStyle.secondary, disabled=disabled, row=1)
         self.direction = direction
 
+    @ack_tracker.tracked("SeriesBookPageButton")
     async def callback(self, interaction: discord.Interaction):
         self.view.current_series_book_page += self.direction
         self.view.update_view()
-        await interaction.response.edit_message(view=self.view)
+        await ack_tracker.edit_message(interaction, view=self.view)
 
 def natural_key(s):
     return [int(text) if text.isdigit() else text.lower() for text in re.split(r'(\d+)', s)]
@@ -284,6 +336,7 @@ class SeriesBookSelect(discord.ui.Select):
         self.books = books
         self.start_index = start_index
 
+    @ack_tracker.tracked("SeriesBookSelect")
     async def callback(self, interaction: discord.Interaction):
         selected_index = int(self.values[0]) - self.start_index
         selected_book = self.books[selected_index]
@@ -292,7 +345,7 @@ class SeriesBookSelect(discord.ui.Select):
             if isinstance(item, (discord.ui.Button, discord.ui.Select)):
                 item.disabled = True
         self.placeholder = "Loading chapters, please wait..."
-        await interaction.response.edit_message(view=self.view)
+        await ack_tracker.edit_message(interaction, view=self.view)
         self.view.selected_book_path = selected_book['path']
         await self._load_chapters()
         self.view.selection_state = 'chapters'
@@ -300,18 +353,7 @@ class SeriesBookSelect(discord.ui.Select):
         await interaction.edit_original_message(view=self.view)
 
     async def _load_chapters(self):
-        all_filenames = [f for f in os.listdir(self.view.selected_book_path) if f.endswith('.m4b')]
-        chapter_data = []
-        for filename in all_filenames:
-            full_path = os.path.join(self.view.selected_book_path, filename)
-            ffprobe_data = audio_utils._run_ffprobe(full_path)
-            chapter_data.append({
-                'filename': filename,
-                'title': audio_utils.get_book_title_from_data(ffprobe_data, full_path),
-                'track': audio_utils.get_track_number_from_data(ffprobe_data, full_path)
-            })
-        chapter_data.sort(key=lambda item: item['track'])
-        self.view.all_chapters = chapter_data
+        self.view.all_chapters = catalog.get_chapters(self.view.selected_book_path)
         self.view.current_chapter_page = 0
         self.view.total_chapter_pages = math.ceil(len(self.view.all_chapters) / CHAPTERS_PER_PAGE)
 
@@ -320,6 +362,7 @@ class BookSelect(discord.ui.Select):
         options = [discord.SelectOption(label=book['title'], value=str(i + start_index)) for i, book in enumerate(books)]
         super().__init__(placeholder=placeholder, options=options, disabled=not books)
 
+    @ack_tracker.tracked("BookSelect")
     async def callback(self, interaction: discord.Interaction):
         # Disable all components and show a "loading" message
         for item in self.view.children:
@@ -329,25 +372,15 @@ class BookSelect(discord.ui.Select):
         self.placeholder = "Loading chapters, please wait..."
       
         # Acknowledge the interaction by immediately editing the message with the disabled UI
-        await interaction.response.edit_message(view=self.view)
+        await ack_tracker.edit_message(interaction, view=self.view)
 
         # Perform the slow chapter-loading task
         selected_index = int(self.values[0])
         selected_book = self.view.all_items[selected_index]
         self.view.selected_book_path = selected_book['path']
-        log.info(f"User selected book index: '{selected_index}'. Path: {self.view.selected_book_path}")
-
-        all_filenames = [f for f in os.listdir(self.view.selected_book_path) if f.endswith('.m4b')]
-        chapter_data = []
-        for filename in all_filenames:
-            full_path = os.path.join(self.view.selected_book_path, filename)
-            chapter_data.append({
-                'filename': filename,
-                'title': audio_utils.get_book_title(full_path),
-                'track': audio_utils.get_track_number(full_path)
-            })
-        chapter_data.sort(key=lambda item: item['track'])
-        self.view.all_chapters = chapter_data
+        log.info("User selected book index: '%s'. Path: %s", selected_index, self.view.selected_book_path)
+
+        self.view.all_chapters = catalog.get_chapters(self.view.selected_book_path)
       
         self.view.current_chapter_page = 0
         self.view.total_chapter_pages = math.ceil(len(self.view.all_chapters) / CHAPTERS_PER_PAGE)
@@ -373,12 +406,14 @@ class ChapterSelect(discord.ui.Select):
       
         super().__init__(placeholder="2. Select a chapter to play...", options=options, disabled=not chapters)
 
+    @ack_tracker.tracked("ChapterSelect")
     async def callback(self, interaction: discord.Interaction):
         selected_index = int(self.values[0])
         selected_chapter_info = self.view.all_chapters[selected_index]
     
         self.view.selected_chapter_path = os.path.join(self.view.selected_book_path, selected_chapter_info['filename'])
         self.view.current_chapter_index = selected_index
+        self.view.start_seek = 0
 
         # Store the active view
         if hasattr(interaction.client, 'get_cog'):
@@ -386,7 +421,7 @@ class ChapterSelect(discord.ui.Select):
             if player_cog:
                 player_cog.active_views[interaction.guild.id] = self.view
 
-        log.info(f"User selected chapter file: {self.view.selected_chapter_path} (index: {selected_index})")
+        log.info("User selected chapter file: %s (index: %s)", self.view.selected_chapter_path, selected_index)
         self.disabled = True
     
         voice_client = discord.utils.get(self.view.bot.voice_clients, guild=interaction.guild)
@@ -394,12 +429,12 @@ class ChapterSelect(discord.ui.Select):
             # FIX: Set selected_channel when already connected
             if not self.view.selected_channel:
                 self.view.selected_channel = voice_client.channel
-            await interaction.response.defer()
+            await ack_tracker.defer(interaction)
             await playback_handler.play_audio(interaction, self.view)
         else:
             self.view.clear_items()
             self.view.add_item(ChannelSelect(guild=interaction.guild))
-            await interaction.response.edit_message(view=self.view)
+            await ack_tracker.edit_message(interaction, view=self.view)
 
 class ChannelSelect(discord.ui.Select):
     def __init__(self, guild: discord.Guild):
@@ -407,6 +442,7 @@ class ChannelSelect(discord.ui.Select):
         options = [discord.SelectOption(label=ch.name, value=str(ch.id)) for ch in channels]
         super().__init__(placeholder="Connect to which voice channel?", options=options, disabled=not channels)
 
+    @ack_tracker.tracked("ChannelSelect")
     async def callback(self, interaction: discord.Interaction):
         # Update active view reference
         if hasattr(self.view.bot, 'get_cog'):
@@ -415,14 +451,52 @@ class ChannelSelect(discord.ui.Select):
                 player_cog.active_views[interaction.guild.id] = self.view
 
         self.view.selected_channel = self.view.bot.get_channel(int(self.values[0]))
-        await interaction.response.defer()
-        await playback_handler.play_audio(interaction, self.view)
+        await ack_tracker.defer(interaction)
+        await playback_handler.play_audio(interaction, self.view, seek_time=self.view.start_seek)
+
+class ResumeButton(discord.ui.Button):
+    def __init__(self, position: dict):
+        label = f"▶️ Resume (Ch. {position['chapter'] + 1}, {audio_utils.format_time(position['offset'])[:8]})"
+        super().__init__(label=label, style=discord.ButtonStyle.success, row=2)
+        self.position = position
+
+    @ack_tracker.tracked("ResumeButton")
+    async def callback(self, interaction: discord.Interaction):
+        view = self.view
+        index = self.position['chapter']
+        # Chapter lists can change between sessions; fall back to finding the saved file by name
+        if not (0 <= index < len(view.all_chapters) and view.all_chapters[index]['filename'] == self.position['filename']):
+            index = next((i for i, chapter in enumerate(view.all_chapters) if chapter['filename'] == self.position['filename']), None)
+        if index is None:
+            await ack_tracker.send_message(interaction, "That chapter is no longer part of this book.", ephemeral=True)
+            return
+
+        view.current_chapter_index = index
+        view.selected_chapter_path = os.path.join(view.selected_book_path, view.all_chapters[index]['filename'])
+        view.start_seek = min(self.position['offset'], max(0.0, view.all_chapters[index]['duration'] - 1))
+        log.info("Resuming %s at chapter %s, %.1fs", view.selected_book_path, index, view.start_seek)
+
+        player_cog = view.bot.get_cog('PlayerCog')
+        if player_cog:
+            player_cog.active_views[interaction.guild.id] = view
+
+        voice_client = discord.utils.get(view.bot.voice_clients, guild=interaction.guild)
+        if voice_client and voice_client.is_connected():
+            if not view.selected_channel:
+                view.selected_channel = voice_client.channel
+            await ack_tracker.defer(interaction)
+            await playback_handler.play_audio(interaction, view, seek_time=view.start_seek)
+        else:
+            view.clear_items()
+            view.add_item(ChannelSelect(guild=interaction.guild))
+            await ack_tracker.edit_message(interaction, view=view)
 
 class ScrubButton(discord.ui.Button):
     def __init__(self, label: str, delta: int):
         super().__init__(label=label, style=discord.ButtonStyle.primary, row=0)
         self.delta = delta
 
+    @ack_tracker.tracked("ScrubButton")
     async def callback(self, interaction: discord.Interaction):
         player_cog = self.view.bot.get_cog('PlayerCog')
         guild_id = interaction.guild.id
@@ -434,18 +508,15 @@ class ScrubButton(discord.ui.Button):
             view = self.view
 
         # Use shared view for calculations
-        if view.is_paused:
-            current_elapsed = view.current_seek + (view.pause_start_time - view.play_start_time)
-        else:
-            current_elapsed = view.current_seek + (time.time() - view.play_start_time)
+        current_elapsed = playback_handler.elapsed_time(view)
         
         new_seek = max(0, min(current_elapsed + self.delta, view.duration))
         
-        log.info(f"Scrubbing from {current_elapsed:.1f}s to {new_seek:.1f}s (delta: {self.delta}s)")
+        log.info("Scrubbing from %.1fs to %.1fs (delta: %ss)", current_elapsed, new_seek, self.delta)
         
         view.manual_stop = True
         
-        await interaction.response.defer()
+        await ack_tracker.defer(interaction)
         await playback_handler.play_audio(interaction, view, seek_time=new_seek, is_scrub=True)
 
 class TrackButton(discord.ui.Button):
@@ -453,6 +524,7 @@ class TrackButton(discord.ui.Button):
         super().__init__(label=label, style=discord.ButtonStyle.secondary, row=1, disabled=disabled)
         self.direction = direction
 
+    @ack_tracker.tracked("TrackButton")
     async def callback(self, interaction: discord.Interaction):
         player_cog = self.view.bot.get_cog('PlayerCog')
         guild_id = interaction.guild.id
@@ -466,7 +538,7 @@ class TrackButton(discord.ui.Button):
         new_index = view.current_chapter_index + self.direction
       
         if new_index < 0 or new_index >= len(view.all_chapters):
-            await interaction.response.send_message("No more chapters in that direction!", ephemeral=True)
+            await ack_tracker.send_message(interaction, "No more chapters in that direction!", ephemeral=True)
             return
       
         view.manual_stop = True
@@ -475,11 +547,39 @@ class TrackButton(discord.ui.Button):
         view.selected_chapter_path = os.path.join(view.selected_book_path, new_chapter['filename'])
         view.current_chapter_index = new_index
       
-        log.info(f"Track change: {self.direction} to chapter {new_index}: {new_chapter['title']}")
+        log.info("Track change: %s to chapter %s: %s", self.direction, new_index, new_chapter['title'])
       
-        await interaction.response.defer()
+        await ack_tracker.defer(interaction)
         await playback_handler.play_audio(interaction, view, seek_time=0)
 
+class SkipSilenceButton(discord.ui.Button):
+    def __init__(self, enabled: bool):
+        super().__init__(
+            label="🔇 Skip silence: on" if enabled else "🔈 Skip silence: off",
+            style=discord.ButtonStyle.success if enabled else discord.ButtonStyle.secondary,
+            row=1
+        )
+
+    @ack_tracker.tracked("SkipSilenceButton")
+    async def callback(self, interaction: discord.Interaction):
+        player_cog = self.view.bot.get_cog('PlayerCog')
+        guild_id = interaction.guild.id
+
+        # Always use the shared view
+        if player_cog and guild_id in player_cog.active_views:
+            view = player_cog.active_views[guild_id]
+        else:
+            view = self.view
+
+        view.skip_silence = not view.skip_silence
+        log.info("Skip silence turned %s in guild %s", "on" if view.skip_silence else "off", guild_id)
+        view.update_player_view()
+
+        # Restart the stream where it is, so the new filter schedule takes effect right away
+        view.manual_stop = True
+        await ack_tracker.defer(interaction)
+        await playback_handler.play_audio(interaction, view, seek_time=playback_handler.elapsed_time(view), is_scrub=True)
+
 import asyncio
 import os
 import tempfile
@@ -491,9 +591,10 @@ class SynopsisButton(discord.ui.Button):
         super().__init__(label="Show Synopsis", style=discord.ButtonStyle.secondary, row=2)
         self.book_path = book_path
 
+    @ack_tracker.tracked("SynopsisButton")
     async def callback(self, interaction: discord.Interaction):
-        log.info(f"Synopsis button clicked by {interaction.user} for book: {self.book_path}")
-        await interaction.response.defer(ephemeral=True)
+        log.info("Synopsis button clicked by %s for book: %s", interaction.user, self.book_path)
+        await ack_tracker.defer(interaction, ephemeral=True)
         synopsis_text = audio_utils.get_synopsis(self.book_path)
         header = "### Synopsis\n"
         truncation_note = "\n\n... (truncated)"
@@ -534,6 +635,7 @@ class BackButton(discord.ui.Button):
     def __init__(self):
         super().__init__(label="<< Back", style=discord.ButtonStyle.grey, row=2)
 
+    @ack_tracker.tracked("BackButton")
     async def callback(self, interaction: discord.Interaction):
         if self.view.selection_state == 'chapters':
             # Coming from chapters - go back to either series books or main items
@@ -560,12 +662,13 @@ class BackButton(discord.ui.Button):
             self.label = "<< Back to Book List"
         
         self.view.update_view()
-        await interaction.response.edit_message(view=self.view)
+        await ack_tracker.edit_message(interaction, view=self.view)
 
 class BackToChaptersButton(discord.ui.Button):
     def __init__(self):
         super().__init__(label="<< Back to Chapters", style=discord.ButtonStyle.grey, row=2)
 
+    @ack_tracker.tracked("BackToChaptersButton")
     async def callback(self, interaction: discord.Interaction):
         player_cog = self.view.bot.get_cog('PlayerCog')
         guild_id = interaction.guild.id
@@ -592,7 +695,7 @@ class BackToChaptersButton(discord.ui.Button):
             await self.view.bot.change_presence(activity=None)
             log.info("Cleared presence - returned to chapters")
         except Exception as e:
-            log.warning(f"Failed to clear presence: {e}")
+            log.warning("Failed to clear presence: %s", e)
 
         # Clear the active view
         if player_cog and guild_id in player_cog.active_views:
@@ -602,19 +705,20 @@ class BackToChaptersButton(discord.ui.Button):
         
         # Safe message editing with error handling
         try:
-            await interaction.response.edit_message(content="Select a chapter to play:", view=self.view)
+            await ack_tracker.edit_message(interaction, content="Select a chapter to play:", view=self.view)
         except discord.errors.NotFound:
             # Message was deleted or interaction expired
             log.warning("Could not edit message - message not found or interaction expired")
         except discord.errors.HTTPException as e:
             # Handle other HTTP errors, like invalid token
-            log.warning(f"Failed to edit message when returning to chapters: {e}")
+            log.warning("Failed to edit message when returning to chapters: %s", e)
 
 class PageButton(discord.ui.Button):
     def __init__(self, label: str, disabled: bool, direction: int):
         super().__init__(label=label, style=discord.ButtonStyle.secondary, disabled=disabled, row=1)
         self.direction = direction
 
+    @ack_tracker.tracked("PageButton")
     async def callback(self, interaction: discord.Interaction):
         # Update active view reference
         if hasattr(self.view.bot, 'get_cog'):
@@ -624,13 +728,14 @@ class PageButton(discord.ui.Button):
 
         self.view.current_page += self.direction
         self.view.update_view()
-        await interaction.response.edit_message(view=self.view)
+        await ack_tracker.edit_message(interaction, view=self.view)
 
 class ChapterPageButton(discord.ui.Button):
     def __init__(self, label: str, disabled: bool, direction: int):
         super().__init__(label=label, style=discord.ButtonStyle.primary, disabled=disabled, row=1)
         self.direction = direction
 
+    @ack_tracker.tracked("ChapterPageButton")
     async def callback(self, interaction: discord.Interaction):
         player_cog = self.view.bot.get_cog('PlayerCog')
         guild_id = interaction.guild.id
@@ -646,7 +751,7 @@ class ChapterPageButton(discord.ui.Button):
         view.update_view()
         
         # Update the UI on the current panel (self.view)
-        await interaction.response.edit_message(view=self.view)
+        await ack_tracker.edit_message(interaction, view=self.view)
 
 class PauseButton(discord.ui.Button):
     def __init__(self, is_paused: bool = False):
@@ -654,6 +759,7 @@ class PauseButton(discord.ui.Button):
         super().__init__(label=label, style=discord.ButtonStyle.success, row=0)
         self.is_paused = is_paused
 
+    @ack_tracker.tracked("PauseButton")
     async def callback(self, interaction: discord.Interaction):
         player_cog = self.view.bot.get_cog('PlayerCog')
         guild_id = interaction.guild.id
@@ -668,28 +774,30 @@ class PauseButton(discord.ui.Button):
       
         if not voice_client or not voice_client.is_connected():
             if view.is_paused:
-                await interaction.response.send_message("Reconnecting to voice channel...", ephemeral=True)
-                pause_duration = time.time() - view.pause_start_time
-                resume_time = view.current_seek + pause_duration
+                await ack_tracker.send_message(interaction, "Reconnecting to voice channel...", ephemeral=True)
+                resume_time = playback_handler.elapsed_time(view)
                 await playback_handler.play_audio(interaction, view, seek_time=resume_time)
                 return
             else:
-                await interaction.response.send_message("Not connected to voice!", ephemeral=True)
+                await ack_tracker.send_message(interaction, "Not connected to voice!", ephemeral=True)
                 return
       
         if voice_client.is_paused():
             voice_client.resume()
+            party_manager.set_paused(guild_id, False)
             view.is_paused = False
             pause_duration = time.time() - view.pause_start_time
             view.play_start_time += pause_duration
-            log.info(f"Resumed playback (was paused for {pause_duration:.1f}s)")
+            log.info("Resumed playback (was paused for %.1fs)", pause_duration)
         elif voice_client.is_playing():
             voice_client.pause()
+            party_manager.set_paused(guild_id, True)
             view.is_paused = True
             view.pause_start_time = time.time()
+            playback_handler.save_position(view)
             log.info("Paused playback")
         else:
-            await interaction.response.send_message("Nothing is currently playing!", ephemeral=True)
+            await ack_tracker.send_message(interaction, "Nothing is currently playing!", ephemeral=True)
             return
       
         # Update presence
@@ -698,29 +806,32 @@ class PauseButton(discord.ui.Button):
                 presence_text = audio_utils.format_presence_text(
                     view.selected_chapter_path,
                     view.selected_book_path,
-                    is_paused=True
+                    is_paused=True,
+                    chapter_title=playback_handler.chapter_title(view)
                 )
             else:
-                current_elapsed = view.current_seek + (time.time() - view.play_start_time)
+                current_elapsed = playback_handler.elapsed_time(view)
                 presence_text = audio_utils.format_presence_text(
                     view.selected_chapter_path,
                     view.selected_book_path,
-                    elapsed_seconds=current_elapsed
+                    elapsed_seconds=current_elapsed,
+                    chapter_title=playback_handler.chapter_title(view)
                 )
             
             activity = discord.Activity(type=discord.ActivityType.listening, name=presence_text)
             await self.view.bot.change_presence(activity=activity)
         except Exception as e:
-            log.warning(f"Failed to update presence on pause/resume: {e}")
+            log.warning("Failed to update presence on pause/resume: %s", e)
 
         # Update the button and view
         self.view.update_player_view()
-        await interaction.response.edit_message(view=self.view)
+        await ack_tracker.edit_message(interaction, view=self.view)
 
 class QuitButton(discord.ui.Button):
     def __init__(self):
         super().__init__(label="🚪 Quit", style=discord.ButtonStyle.danger, row=2)
 
+    @ack_tracker.tracked("QuitButton")
     async def callback(self, interaction: discord.Interaction):
         player_cog = self.view.bot.get_cog('PlayerCog')
         guild_id = interaction.guild.id
@@ -735,11 +846,14 @@ class QuitButton(discord.ui.Button):
         voice_client = discord.utils.get(self.view.bot.voice_clients, guild=interaction.guild)
         if voice_client:
             if voice_client.is_playing() or voice_client.is_paused():
+                playback_handler.save_position(view)
                 view.manual_stop = True
                 voice_client.stop()
           
             await voice_client.disconnect()
-            log.info(f"Bot disconnected from voice channel by {interaction.user}")
+            log.info("Bot disconnected from voice channel by %s", interaction.user)
+        await party_manager.release_guild(guild_id)
+        play_queue.clear(guild_id)
       
         # Reset all player state
         view.is_playing = False
@@ -761,7 +875,7 @@ class QuitButton(discord.ui.Button):
             await self.view.bot.change_presence(activity=None)
             log.info("Cleared presence - user quit")
         except Exception as e:
-            log.warning(f"Failed to clear presence on quit: {e}")
+            log.warning("Failed to clear presence on quit: %s", e)
         
         # Clear the active view
         if player_cog and guild_id in player_cog.active_views:
@@ -771,7 +885,8 @@ class QuitButton(discord.ui.Button):
       
         # Safe message editing with error handling
         try:
-            await interaction.response.edit_message(
+            await ack_tracker.edit_message(
+                interaction,
                 content="👋 Disconnected from voice channel. Use `/audiobook` to start again.",
                 view=None
             )
@@ -780,7 +895,7 @@ class QuitButton(discord.ui.Button):
             log.warning("Could not edit message - message not found or interaction expired")
         except discord.errors.HTTPException as e:
             # Handle other HTTP errors, like invalid token
-            log.warning(f"Failed to edit message on quit: {e}")
+            log.warning("Failed to edit message on quit: %s", e)
 
 # --- Main Cog Class ---
 
@@ -790,25 +905,147 @@ class PlayerCog(commands.Cog):
         self.active_views = {}  # key: guild.id, value: AudiobookPlayerView
         if not os.path.exists(AUDIOBOOK_PATH):
             os.makedirs(AUDIOBOOK_PATH)
-            log.warning(f"The '{AUDIOBOOK_PATH}' directory did not exist. I've created it for you.")
+            log.warning("The '%s' directory did not exist. I've created it for you.", AUDIOBOOK_PATH)
+        self.reaper = SessionReaper(bot, self.active_views)
+        catalog.load()
+        startup_timeline.mark("catalog")
+        resume_store.load()
+        search_index.attach(catalog)
+        synopsis_index.attach(catalog)
+        metrics.ACTIVE_SESSIONS.callback = lambda: len(self.active_views)
+        metrics.FFMPEG_PROCESSES.callback = lambda: len(supervisor.live_processes())
+        metrics.QUEUED_STREAMS.callback = supervisor.queue_length
+
+    def cog_unload(self):
+        self.reaper.stop()
+        catalog.stop()
+        resume_store.stop()
+        play_queue.stop()
+        loop_monitor.monitor.stop()
+
+    @commands.Cog.listener()
+    async def on_ready(self):
+        # on_ready fires again after reconnects; start() is a no-op if the reaper is already running
+        self.reaper.start()
+        catalog.start()
+        resume_store.start()
+        play_queue.start()
+        if not search_index.ready:
+            # Built off the loop; later catalog changes are applied incrementally through the listener
+            asyncio.get_running_loop().run_in_executor(None, search_index.sync, catalog)
+        if synopsis_index.enabled and not synopsis_index.ready and not getattr(self.bot, 'cluster_id', None):
+            # Persisted, so this only re-indexes what changed while the bot was down. Cluster workers share worker 0's index.
+            asyncio.get_running_loop().run_in_executor(None, synopsis_index.refresh, catalog)
+        if LOOP_LAG_THRESHOLD > 0:
+            loop_monitor.monitor.start()
+        if METRICS_PORT:
+            # Cluster workers each get their own port: METRICS_PORT + cluster id
+            port = METRICS_PORT + (getattr(self.bot, 'cluster_id', None) or 0)
+            try:
+                await metrics.start_server(METRICS_HOST, port)
+            except OSError as e:
+                log.error("Could not start metrics endpoint on port %s: %s", port, e)
 
     @discord.slash_command(name="audiobook", description="Starts the interactive audiobook player.")
+    @ack_tracker.tracked("/audiobook")
     async def audiobook(self, interaction: discord.Interaction):
-        log.info(f"'/audiobook' command invoked by {interaction.user} in guild '{interaction.guild.name}'.")
+        log.info("'/audiobook' command invoked by %s in guild '%s'.", interaction.user, interaction.guild.name)
         view = AudiobookPlayerView(interaction.user, self.bot)
         if not view.all_items:
-            await interaction.response.send_message("I couldn't find any audiobooks! Make sure your folders are set up correctly.", ephemeral=True)
+            await ack_tracker.send_message(interaction, "I couldn't find any audiobooks! Make sure your folders are set up correctly.", ephemeral=True)
+            return
+        await ack_tracker.send_message(interaction, "Please choose an audiobook from the list.", view=view, ephemeral=True)
+
+    @discord.slash_command(name="search", description="Find a book, series, author or chapter by name.")
+    @ack_tracker.tracked("/search")
+    async def search(
+        self,
+        interaction: discord.Interaction,
+        query: str = discord.SlashOption(description="Title, series, author or chapter", autocomplete=True)
+    ):
+        log.info("'/search' command invoked by %s in guild '%s': %r", interaction.user, interaction.guild.name, query)
+        # A picked autocomplete choice sends the entry key; free text gets the best match
+        entry = search_index.get(query)
+        if entry is None:
+            results = search_index.search(query, limit=1)
+            entry = results[0] if results else None
+        if entry is None:
+            if search_index.ready:
+                message = f"Nothing in the library matches **{query[:100]}**."
+            else:
+                message = "The search index is still being built, please try again in a moment."
+            await ack_tracker.send_message(interaction, message, ephemeral=True)
+            return
+
+        view = AudiobookPlayerView(interaction.user, self.bot)
+        view.open_search_result(entry)
+        if view.selection_state == 'chapters':
+            self.active_views[interaction.guild.id] = view
+        await ack_tracker.send_message(interaction, f"{KIND_EMOJI[entry.kind]} **{entry.text}**", view=view, ephemeral=True)
+
+    @search.on_autocomplete("query")
+    async def search_autocomplete(self, interaction: discord.Interaction, query: str):
+        results = search_index.search(query, limit=25) if query else []
+        await interaction.response.send_autocomplete({choice_label(entry): entry.key for entry in results})
+
+    @discord.slash_command(name="findsynopsis", description="Search the synopses of every book in the library.")
+    @ack_tracker.tracked("/findsynopsis")
+    async def findsynopsis(
+        self,
+        interaction: discord.Interaction,
+        query: str = discord.SlashOption(description="Words to look for in the synopses")
+    ):
+        log.info("'/findsynopsis' command invoked by %s in guild '%s': %r", interaction.user, interaction.guild.name, query)
+        if not synopsis_index.enabled:
+            await ack_tracker.send_message(interaction, "Synopsis search is disabled on this bot.", ephemeral=True)
+            return
+        results = await asyncio.get_running_loop().run_in_executor(None, synopsis_index.search, query)
+        if not results:
+            await ack_tracker.send_message(interaction, f"No synopsis mentions **{query[:100]}**.", ephemeral=True)
+            return
+
+        lines = [f"**Synopses matching** *{query[:100]}*:"]
+        for result in results:
+            lines.append(f"📖 **{result['title']}** by {result['author']}\n> {result['snippet']}")
+        content = "\n".join(lines)
+        if len(content) > 2000:
+            content = content[:1997] + "..."
+        await ack_tracker.send_message(interaction, content, ephemeral=True)
+
+    @discord.slash_command(name="resume", description="Reopen the book you listened to last, with a button to continue where you left off.")
+    @ack_tracker.tracked("/resume")
+    async def resume(self, interaction: discord.Interaction):
+        log.info("'/resume' command invoked by %s in guild '%s'.", interaction.user, interaction.guild.name)
+        latest = resume_store.latest(interaction.user.id)
+        if not latest or not os.path.isdir(latest[0]):
+            await ack_tracker.send_message(interaction, "You don't have a saved position yet. Use `/audiobook` to start a book.", ephemeral=True)
             return
-        await interaction.response.send_message("Please choose an audiobook from the list.", view=view, ephemeral=True)
+
+        book_path, position = latest
+        view = AudiobookPlayerView(interaction.user, self.bot)
+        view.selected_series = next((item for item in view.all_items if item['type'] == 'series' and any(book['path'] == book_path for book in item['books'])), None)
+        view.selected_book_path = book_path
+        view.all_chapters = catalog.get_chapters(book_path)
+        view.total_chapter_pages = math.ceil(len(view.all_chapters) / CHAPTERS_PER_PAGE)
+        view.current_chapter_page = min(position['chapter'], max(0, len(view.all_chapters) - 1)) // CHAPTERS_PER_PAGE
+        view.selection_state = 'chapters'
+        view.update_view()
+        await ack_tracker.send_message(interaction, f"📖 **{os.path.basename(book_path)}**", view=view, ephemeral=True)
 
     @discord.slash_command(name="stop", description="Stops audio playback and disconnects the bot.")
+    @ack_tracker.tracked("/stop")
     async def stop(self, interaction: discord.Interaction):
-        log.info(f"'/stop' command invoked by {interaction.user} in guild '{interaction.guild.name}'.")
+        log.info("'/stop' command invoked by %s in guild '%s'.", interaction.user, interaction.guild.name)
         voice_client = discord.utils.get(self.bot.voice_clients, guild=interaction.guild)
         if voice_client and voice_client.is_connected():
             if voice_client.is_playing() or voice_client.is_paused():
+                view = self.active_views.get(interaction.guild.id)
+                if view and view.is_playing:
+                    playback_handler.save_position(view)
                 voice_client.stop()
             await voice_client.disconnect()
+            await party_manager.release_guild(interaction.guild.id)
+            play_queue.clear(interaction.guild.id)
             
             # --- CLEANUP TRACKED MESSAGES ---
             view = self.active_views.get(interaction.guild.id)
@@ -819,33 +1056,32 @@ class PlayerCog(commands.Cog):
                 del self.active_views[interaction.guild.id]
             # --------------------------------
             
-            await interaction.response.send_message("🚪 Playback stopped and disconnected.", ephemeral=True)
+            await ack_tracker.send_message(interaction, "🚪 Playback stopped and disconnected.", ephemeral=True)
         else:
-            await interaction.response.send_message("I'm not currently in a voice channel.", ephemeral=True)
+            await ack_tracker.send_message(interaction, "I'm not currently in a voice channel.", ephemeral=True)
 
     @discord.slash_command(name="controls", description="Reopen the audiobook player controls panel.")
+    @ack_tracker.tracked("/controls")
     async def controls(self, interaction: discord.Interaction):
-        log.info(f"'/controls' command invoked by {interaction.user} in guild '{interaction.guild.name}'.")
+        log.info("'/controls' command invoked by %s in guild '%s'.", interaction.user, interaction.guild.name)
         
         # Try to get the active view for this guild
         view = self.active_views.get(interaction.guild.id)
         voice_client = discord.utils.get(self.bot.voice_clients, guild=interaction.guild)
         
         if not view or not voice_client or (not voice_client.is_playing() and not voice_client.is_paused()):
-            await interaction.response.send_message("No audiobook is currently playing. Use `/audiobook` to start one.", ephemeral=True)
+            await ack_tracker.send_message(interaction, "No audiobook is currently playing. Use `/audiobook` to start one.", ephemeral=True)
             return
         
         # **NEW: Refresh the view's interaction context**
         view.interaction = interaction  # Update to the fresh interaction
+        view.last_activity = time.time()
         
         # Calculate current elapsed time
-        if view.is_paused:
-            elapsed = view.current_seek + (view.pause_start_time - view.play_start_time)
-        else:
-            elapsed = view.current_seek + (time.time() - view.play_start_time)
+        elapsed = playback_handler.elapsed_time(view)
         
         # Get current chapter and book info
-        chapter_title = audio_utils.get_book_title(view.selected_chapter_path)
+        chapter_title = playback_handler.chapter_title(view)
         book_title = os.path.basename(os.path.dirname(view.selected_book_path))
         elapsed_str = audio_utils.format_time(elapsed)
         duration_str = audio_utils.format_time(view.duration)
@@ -854,10 +1090,10 @@ class PlayerCog(commands.Cog):
         view.update_player_view()
         
         status_emoji = "⏸️" if view.is_paused else "▶️"
-        message = f"{status_emoji} Now playing: **{chapter_title}** from *{book_title}*\n`{elapsed_str} / {duration_str}`"
+        message = f"{status_emoji} Now playing: **{chapter_title}** from *{book_title}*\n`{elapsed_str} / {duration_str}`{playback_handler.book_progress(view, elapsed)}{playback_handler.speed_progress(view, elapsed)}"
         
         # Send the controls using the refreshed view
-        await interaction.response.send_message(message, view=view, ephemeral=True)
+        await ack_tracker.send_message(interaction, message, view=view, ephemeral=True)
         
         # **NEW: Track this message for live updates**
         try:
@@ -866,9 +1102,340 @@ class PlayerCog(commands.Cog):
             if not hasattr(view, 'messages'):
                 view.messages = set()
             view.messages.add(new_message)
-            log.info(f"Added new controls message to tracking (total: {len(view.messages)})")
+            log.info("Added new controls message to tracking (total: %s)", len(view.messages))
         except Exception as e:
-            log.warning(f"Could not track new controls message: {e}")
+            log.warning("Could not track new controls message: %s", e)
+
+    @discord.slash_command(name="seek", description="Jump to a position in the whole book, e.g. 5:32:10 or +10m.")
+    @ack_tracker.tracked("/seek")
+    async def seek(
+        self,
+        interaction: discord.Interaction,
+        timestamp: str = discord.SlashOption(description="Book time like 5:32:10, 90m or 1h2m3s; prefix + or - to move relative")
+    ):
+        log.info("'/seek' command invoked by %s in guild '%s': %s", interaction.user, interaction.guild.name, timestamp)
+        view = self.active_views.get(interaction.guild.id)
+        voice_client = discord.utils.get(self.bot.voice_clients, guild=interaction.guild)
+        if not view or not voice_client or (not voice_client.is_playing() and not voice_client.is_paused()):
+            await ack_tracker.send_message(interaction, "No audiobook is currently playing. Use `/audiobook` to start one.", ephemeral=True)
+            return
+
+        timestamp = timestamp.strip()
+        direction = {'+': 1, '-': -1}.get(timestamp[:1], 0)
+        try:
+            target = parse_book_time(timestamp[1:] if direction else timestamp)
+        except ValueError:
+            await ack_tracker.send_message(interaction, "I couldn't read that time. Try something like `5:32:10`, `90m` or `+10m`.", ephemeral=True)
+            return
+
+        timeline = catalog.get_timeline(view.selected_book_path)
+        if not len(timeline):
+            await ack_tracker.send_message(interaction, "This book has no chapters to seek in.", ephemeral=True)
+            return
+        if len(timeline) != len(view.all_chapters):
+            # The book was re-read since the player loaded its chapters; indexes no longer line up
+            await ack_tracker.send_message(interaction, "This book's chapters changed on disk. Reopen it with `/audiobook` to seek.", ephemeral=True)
+            return
+        if direction:
+            elapsed = playback_handler.elapsed_time(view)
+            target = timeline.book_time(view.current_chapter_index, elapsed) + direction * target
+        index, offset = timeline.locate(target)
+        log.info("Seeking to book time %.1fs: chapter %s at %.1fs", target, index, offset)
+
+        same_chapter = index == view.current_chapter_index
+        view.current_chapter_index = index
+        view.selected_chapter_path = os.path.join(view.selected_book_path, view.all_chapters[index]['filename'])
+        view.manual_stop = True
+        await ack_tracker.defer(interaction, ephemeral=True)
+        await playback_handler.play_audio(interaction, view, seek_time=offset, is_scrub=same_chapter, keep_panel=True)
+        await interaction.followup.send(f"⏩ Jumped to {audio_utils.format_time(timeline.book_time(index, offset))} in the book.", ephemeral=True)
+
+    @discord.slash_command(name="volume", description="Set the playback volume for this server.")
+    @ack_tracker.tracked("/volume")
+    async def volume(
+        self,
+        interaction: discord.Interaction,
+        percent: int = discord.SlashOption(description="Volume in percent (100 = normal)", min_value=0, max_value=200)
+    ):
+        log.info("'/volume' command invoked by %s in guild '%s': %s%%", interaction.user, interaction.guild.name, percent)
+        view = self.active_views.get(interaction.guild.id)
+        voice_client = discord.utils.get(self.bot.voice_clients, guild=interaction.guild)
+        if not view or not voice_client or (not voice_client.is_playing() and not voice_client.is_paused()):
+            await ack_tracker.send_message(interaction, "No audiobook is currently playing. Use `/audiobook` to start one.", ephemeral=True)
+            return
+
+        if playback_handler.set_volume(view, percent / 100):
+            await ack_tracker.send_message(interaction, f"🔊 Volume set to {percent}%.", ephemeral=True)
+            return
+        # ffmpeg encodes Opus itself, so the new volume needs a fresh stream from the current position
+        view.manual_stop = True
+        await ack_tracker.defer(interaction, ephemeral=True)
+        await playback_handler.play_audio(interaction, view, seek_time=playback_handler.elapsed_time(view), is_scrub=True, keep_panel=True)
+        await interaction.followup.send(f"🔊 Volume set to {percent}%.", ephemeral=True)
+
+    @discord.slash_command(name="speed", description="Change the playback speed for this server.")
+    @ack_tracker.tracked("/speed")
+    async def speed(
+        self,
+        interaction: discord.Interaction,
+        speed: str = discord.SlashOption(description="Playback speed", choices={label: label for label in SPEED_CHOICES})
+    ):
+        log.info("'/speed' command invoked by %s in guild '%s': %s", interaction.user, interaction.guild.name, speed)
+        view = self.active_views.get(interaction.guild.id)
+        voice_client = discord.utils.get(self.bot.voice_clients, guild=interaction.guild)
+        if not view or not voice_client or (not voice_client.is_playing() and not voice_client.is_paused()):
+            await ack_tracker.send_message(interaction, "No audiobook is currently playing. Use `/audiobook` to start one.", ephemeral=True)
+            return
+
+        new_speed = float(speed.rstrip('x'))
+        if new_speed == view.speed:
+            await ack_tracker.send_message(interaction, f"⏩ Already playing at {speed}.", ephemeral=True)
+            return
+        # Position in chapter time at the old speed; the new stream input-seeks straight back to it
+        elapsed = playback_handler.elapsed_time(view)
+        view.speed = new_speed
+        view.manual_stop = True
+        await ack_tracker.defer(interaction, ephemeral=True)
+        await playback_handler.play_audio(interaction, view, seek_time=elapsed, is_scrub=True, keep_panel=True)
+        await interaction.followup.send(f"⏩ Playback speed set to {speed}.", ephemeral=True)
+
+    @discord.slash_command(name="party", description="Listen together: share this server's playback with voice channels in other servers.")
+    @ack_tracker.tracked("/party")
+    async def party(
+        self,
+        interaction: discord.Interaction,
+        action: str = discord.SlashOption(description="What to do", choices={"start": "start", "join": "join", "leave": "leave"}),
+        code: str = discord.SlashOption(description="Party code (for join)", required=False, default=None)
+    ):
+        log.info("'/party %s' invoked by %s in guild '%s'.", action, interaction.user, interaction.guild.name)
+        guild_id = interaction.guild.id
+        voice_client = discord.utils.get(self.bot.voice_clients, guild=interaction.guild)
+
+        if action == "start":
+            view = self.active_views.get(guild_id)
+            if not view or not voice_client or (not voice_client.is_playing() and not voice_client.is_paused()):
+                await ack_tracker.send_message(interaction, "Start an audiobook with `/audiobook` first, then start the party.", ephemeral=True)
+                return
+            if party_manager.party_of(guild_id) and not party_manager.hosted_by(guild_id):
+                await ack_tracker.send_message(interaction, "This server is listening to another party. Use `/party leave` first.", ephemeral=True)
+                return
+            already_hosting = party_manager.hosted_by(guild_id) is not None
+            party = party_manager.create(guild_id)
+            if not already_hosting:
+                # Restart the stream where it is as the shared, ffmpeg-encoded party stream; the panel stays put
+                view.manual_stop = True
+                await ack_tracker.defer(interaction)
+                await playback_handler.play_audio(interaction, view, seek_time=playback_handler.elapsed_time(view), is_scrub=True, keep_panel=True)
+            message = f"🎉 Listening party **{party.code}** is on. Other servers can join with `/party join {party.code}`; pause, seek and chapter changes here apply to everyone."
+            if already_hosting:
+                await ack_tracker.send_message(interaction, message)
+            else:
+                await interaction.followup.send(message)
+
+        elif action == "join":
+            party = party_manager.get(code or "")
+            if party is None:
+                await ack_tracker.send_message(interaction, "No listening party with that code is running.", ephemeral=True)
+                return
+            if party.host_guild_id == guild_id or party_manager.party_of(guild_id) is party:
+                await ack_tracker.send_message(interaction, "This server is already part of that party.", ephemeral=True)
+                return
+            if guild_id in self.active_views or party_manager.party_of(guild_id):
+                await ack_tracker.send_message(interaction, "Stop this server's playback with `/stop` before joining a party.", ephemeral=True)
+                return
+            channel = interaction.user.voice.channel if interaction.user.voice else None
+            if channel is None:
+                await ack_tracker.send_message(interaction, "Join a voice channel first, then run `/party join` again.", ephemeral=True)
+                return
+            await ack_tracker.defer(interaction)
+            try:
+                if not voice_client or not voice_client.is_connected():
+                    with metrics.VOICE_CONNECT_SECONDS.time():
+                        voice_client = await channel.connect(timeout=20.0, reconnect=False)
+                elif voice_client.channel != channel:
+                    await voice_client.move_to(channel)
+            except Exception as e:
+                log.error("Could not connect to %s for party %s: %s", channel, party.code, e)
+                await interaction.followup.send("Sorry, I couldn't connect to your voice channel.", ephemeral=True)
+                return
+            party_manager.join(party, voice_client)
+            await interaction.followup.send(f"🎉 Joined listening party **{party.code}** in {channel.mention}.")
+
+        else:
+            party = party_manager.party_of(guild_id)
+            if party is None:
+                await ack_tracker.send_message(interaction, "This server isn't in a listening party.", ephemeral=True)
+                return
+            hosting = party.host_guild_id == guild_id
+            await party_manager.release_guild(guild_id)
+            if hosting:
+                # Keep playing here, just without the other channels
+                await ack_tracker.send_message(interaction, f"Listening party **{party.code}** ended.")
+                return
+            if voice_client:
+                voice_client.stop()
+                await voice_client.disconnect()
+            await ack_tracker.send_message(interaction, f"👋 Left listening party **{party.code}**.")
+
+    @discord.slash_command(name="queue", description="Queue books, chapters or a whole series to play after the current book.")
+    @ack_tracker.tracked("/queue")
+    async def queue(
+        self,
+        interaction: discord.Interaction,
+        action: str = discord.SlashOption(description="What to do", choices={"add": "add", "show": "show", "clear": "clear"}),
+        query: str = discord.SlashOption(description="Book, chapter or series to add", required=False, default=None, autocomplete=True)
+    ):
+        log.info("'/queue %s' invoked by %s in guild '%s': %r", action, interaction.user, interaction.guild.name, query)
+        guild_id = interaction.guild.id
+
+        if action == "show":
+            items = play_queue.items(guild_id)
+            if not items:
+                await ack_tracker.send_message(interaction, "The queue is empty. Add to it with `/queue add`.", ephemeral=True)
+                return
+            lines = [f"**Up next** ({len(items)}):"] + [f"{i}. {item.title}" for i, item in enumerate(items, 1)]
+            content = "\n".join(lines)
+            if len(content) > 2000:
+                content = content[:1997] + "..."
+            await ack_tracker.send_message(interaction, content, ephemeral=True)
+            return
+        if action == "clear":
+            removed = play_queue.clear(guild_id)
+            await ack_tracker.send_message(interaction, f"🗑️ Removed {removed} item(s) from the queue.", ephemeral=True)
+            return
+
+        view = self.active_views.get(guild_id)
+        if not view or not view.selected_book_path:
+            await ack_tracker.send_message(interaction, "Start an audiobook with `/audiobook` first, then queue what comes next.", ephemeral=True)
+            return
+        entry = search_index.get(query or "")
+        if entry is None and query:
+            results = search_index.search(query, limit=1)
+            entry = results[0] if results else None
+        if entry is None:
+            await ack_tracker.send_message(interaction, f"Nothing in the library matches **{(query or '')[:100]}**.", ephemeral=True)
+            return
+
+        if entry.kind == 'book':
+            items = [QueueItem(entry.book_path, None, entry.text)]
+        elif entry.kind == 'chapter':
+            items = [QueueItem(entry.book_path, entry.chapter_filename, f"{entry.detail} — {entry.text}")]
+        elif entry.kind == 'series':
+            series = next((item for item in catalog.get_items() if item['path'] == entry.series_path), None)
+            books = sorted(series['books'], key=lambda book: natural_key(book['title'])) if series else []
+            items = [QueueItem(book['path'], None, book['title']) for book in books]
+        else:
+            await ack_tracker.send_message(interaction, "Authors can't be queued; pick one of their books or series.", ephemeral=True)
+            return
+
+        added = play_queue.add(guild_id, items)
+        # Resolve and warm the new head now if the current book is already on its last chapter
+        play_queue.schedule(guild_id, view)
+        if added < len(items):
+            message = f"➕ Queued {added} of {len(items)} item(s); the queue holds at most {MAX_QUEUE_ITEMS}."
+        elif len(items) == 1:
+            message = f"➕ Queued **{items[0].title}**."
+        else:
+            message = f"➕ Queued {added} books of **{entry.text}**."
+        await ack_tracker.send_message(interaction, message, ephemeral=True)
+
+    @queue.on_autocomplete("query")
+    async def queue_autocomplete(self, interaction: discord.Interaction, query: str):
+        results = search_index.search(query, limit=25) if query else []
+        await interaction.response.send_autocomplete({choice_label(entry): entry.key for entry in results if entry.kind != 'author'})
+
+    @discord.slash_command(name="streams", description="Show active audio streams and their resource usage (bot owner only).")
+    @ack_tracker.tracked("/streams")
+    async def streams(self, interaction: discord.Interaction):
+        log.info("'/streams' command invoked by %s in guild '%s'.", interaction.user, interaction.guild.name)
+        if not await self.bot.is_owner(interaction.user):
+            await ack_tracker.send_message(interaction, "Only the bot owner can use this command.", ephemeral=True)
+            return
+
+        stats = supervisor.process_stats()
+        limit = supervisor.max_streams or "∞"
+        lines = [f"**Streams:** {len(stats)}/{limit} · **Queued:** {supervisor.queue_length()} · **Rejected:** {supervisor.rejected}"]
+        for entry in sorted(stats, key=lambda e: e['guild_id']):
+            guild = self.bot.get_guild(entry['guild_id'])
+            guild_name = guild.name if guild else entry['guild_id']
+            cpu = f"{entry['cpu_percent']:.1f}%" if entry['cpu_percent'] is not None else "n/a"
+            rss = f"{entry['rss_bytes'] / (1024 * 1024):.1f} MB" if entry['rss_bytes'] is not None else "n/a"
+            state = "running" if entry['alive'] else "starting" if entry['pid'] is None else "exited"
+            view = self.active_views.get(entry['guild_id'])
+            drift = ""
+            if view and view.is_playing:
+                drift = f" · drift {playback_handler.wall_clock_elapsed(view) - playback_handler.elapsed_time(view):+.2f}s"
+            lines.append(f"`{guild_name}` pid {entry['pid']} ({state}) · CPU {cpu} · RSS {rss} · up {audio_utils.format_time(entry['uptime'])}{drift}")
+
+        content = "\n".join(lines)
+        if len(content) > 2000:
+            content = content[:1997] + "..."
+        await ack_tracker.send_message(interaction, content, ephemeral=True)
+
+    @discord.slash_command(name="ackstats", description="Show interaction acknowledgement latency per handler (bot owner only).")
+    @ack_tracker.tracked("/ackstats")
+    async def ackstats(self, interaction: discord.Interaction):
+        log.info("'/ackstats' command invoked by %s in guild '%s'.", interaction.user, interaction.guild.name)
+        if not await self.bot.is_owner(interaction.user):
+            await ack_tracker.send_message(interaction, "Only the bot owner can use this command.", ephemeral=True)
+            return
+
+        rows = ack_tracker.report()
+        if not rows:
+            await ack_tracker.send_message(interaction, "No interactions handled yet.", ephemeral=True)
+            return
+        lines = ["```", f"{'handler':<22}{'calls':>6}{'p50':>7}{'p95':>7}{'p99':>7}{'missed':>7}{'defer':>6}"]
+        for row in rows:
+            lines.append(
+                f"{row['handler'][:21]:<22}{row['calls']:>6}{row['p50']:>7.2f}{row['p95']:>7.2f}{row['p99']:>7.2f}"
+                f"{row['missed']:>7}{row['auto_deferred']:>6}"
+            )
+        lines.append("```")
+        content = "\n".join(lines)
+        if len(content) > 2000:
+            content = content[:1990] + "\n```"
+        await ack_tracker.send_message(interaction, content, ephemeral=True)
+
+    @discord.slash_command(name="profile", description="Sample the bot's stacks and write flamegraph data to disk (bot owner only).")
+    @ack_tracker.tracked("/profile")
+    async def profile(
+        self,
+        interaction: discord.Interaction,
+        seconds: int = discord.SlashOption(description="How long to sample for", min_value=1, max_value=300, default=30),
+        top: int = discord.SlashOption(description="Number of hot functions to show", min_value=1, max_value=30, default=15)
+    ):
+        log.info("'/profile' command invoked by %s in guild '%s' for %ss.", interaction.user, interaction.guild.name, seconds)
+        if not await self.bot.is_owner(interaction.user):
+            await ack_tracker.send_message(interaction, "Only the bot owner can use this command.", ephemeral=True)
+            return
+
+        await ack_tracker.defer(interaction, ephemeral=True)
+        profiler = SamplingProfiler(loop_thread_id=threading.get_ident())
+        def sample():
+            profiler.run(seconds)
+            return profiler.write(limit=top)
+
+        try:
+            # Sampling and writing the results block, so both run in a worker thread while the loop keeps serving
+            folded_path, summary_path = await asyncio.get_running_loop().run_in_executor(None, sample)
+        except RuntimeError as e:
+            await interaction.followup.send(str(e), ephemeral=True)
+            return
+        except OSError as e:
+            log.error("Failed to write profile: %s", e)
+            await interaction.followup.send("Profiling finished but the results could not be written to disk.", ephemeral=True)
+            return
+
+        total = sum(profiler.stacks.values()) or 1
+        lines = [f"**Profile:** {profiler.samples} samples over {profiler.elapsed:.1f}s", "```", f"{'self%':>6} {'total%':>7}  function"]
+        for function, self_count, total_count in profiler.top_functions(top):
+            lines.append(f"{100 * self_count / total:>6.1f} {100 * total_count / total:>7.1f}  {function[:60]}")
+        lines.append("```")
+        lines.append(f"Flamegraph data: `{folded_path}`\nSummary: `{summary_path}`")
+        content = "\n".join(lines)
+        if len(content) > 2000:
+            content = content[:1990] + "\n```"
+        await interaction.followup.send(content, ephemeral=True)
 
 # Updated setup function for discord.py
 def setup(bot: commands.AutoShardedBot):
@@ -0,0 +1,81 @@
+# cogs/position_source.py
+import logging
+
+import nextcord as discord
+
+from . import metrics
+
+log = logging.getLogger(__name__)
+
+FRAME_SECONDS = discord.opus.Encoder.FRAME_LENGTH / 1000  # Every read() is one 20 ms frame, PCM or Opus
+DRIFT_WARN_SECONDS = 2.0
+
+PLAYBACK_DRIFT_SECONDS = metrics.Histogram(
+    'audiobot_playback_drift_seconds', 'Difference between the wall-clock position estimate and the frames actually played.',
+    buckets=(0.05, 0.1, 0.25, 0.5, 1, 2, 5, 15, 60)
+)
+
+class PositionTrackingSource(discord.AudioSource):
+    """
+    Wraps an ffmpeg source and counts the frames the voice client actually pulled from it.
+
+    The voice client reads one frame per 20 ms tick and stops reading while paused, so
+    offset + frames * 20 ms is where the listener really is, no matter how late the stream
+    started or how long the event loop or network stalled.
+
+    skips are the (start, end) ranges, in seconds after offset, that ffmpeg drops from the stream
+    (skip-silence mode); position adds back the ones already passed. At a playback speed other
+    than 1, every frame carries speed * 20 ms of the chapter.
+    """
+    def __init__(self, original: discord.AudioSource, offset: float = 0.0, skips: list = None, speed: float = 1.0):
+        self.original = original
+        self.offset = offset
+        self.skips = skips or []
+        self.speed = speed
+        self.frames = 0
+        self.drift_warned = False
+
+    @property
+    def stream_position(self) -> float:
+        """offset plus the audio actually sent, i.e. not counting skipped ranges."""
+        return self.offset + self.frames * FRAME_SECONDS * self.speed
+
+    @property
+    def position(self) -> float:
+        played = self.frames * FRAME_SECONDS * self.speed
+        for start, end in self.skips:
+            if start > played:
+                break
+            played += end - start
+        return self.offset + played
+
+    def read(self) -> bytes:
+        data = self.original.read()
+        if data:
+            self.frames += 1
+        return data
+
+    def is_opus(self) -> bool:
+        return self.original.is_opus()
+
+    def cleanup(self):
+        self.original.cleanup()
+
+def unwrap(source):
+    """The ffmpeg source underneath any wrapping sources (for its process)."""
+    while hasattr(source, 'original'):
+        source = source.original
+    return source
+
+def report_drift(view, wall_clock_position: float):
+    """Records how far the wall-clock estimate is from the frame count. Returns the drift in seconds, or None."""
+    source = getattr(view, 'audio_source', None)
+    if not isinstance(source, PositionTrackingSource):
+        return None
+    drift = wall_clock_position - source.stream_position
+    PLAYBACK_DRIFT_SECONDS.observe(abs(drift))
+    if abs(drift) > DRIFT_WARN_SECONDS and not source.drift_warned:
+        source.drift_warned = True
+        log.warning("Playback position drift of %.2fs for %s (wall clock %.2fs, frames %.2fs).",
+                    drift, view.selected_chapter_path, wall_clock_position, source.stream_position)
+    return drift
@@ -0,0 +1,252 @@
+# cogs/resume_store.py
+import asyncio
+import contextlib
+import json
+import logging
+import os
+import threading
+import time
+
+from config import RESUME_JOURNAL_PATH, RESUME_FLUSH_INTERVAL
+from . import metrics
+
+log = logging.getLogger(__name__)
+
+# Optional: POSIX file locking lets cluster workers share one journal; without it each write is only locked in-process
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+RESUME_FLUSH_SECONDS = metrics.Histogram(
+    'audiobot_resume_flush_seconds', 'Time to append a batch of resume positions to the journal.', buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1)
+)
+
+# Compact once the journal holds this many times more lines than there are live positions
+COMPACT_RATIO = 4
+COMPACT_MIN_LINES = 1000
+
+class ResumeStore:
+    """
+    Per-user, per-book resume positions, kept in memory and persisted write-behind.
+
+    record() only updates dicts, so the time tracker can call it for every listener every few
+    seconds. A background task appends the positions that changed since the last flush to a JSON
+    lines journal in one write from an executor thread; repeated updates of the same position in
+    between cost nothing. The journal is replayed at startup (last line wins) and rewritten with
+    only the live positions once it has grown well past them. Cluster workers share the journal:
+    each flush first applies what the others appended, under a file lock.
+    """
+    def __init__(self, journal_path: str = RESUME_JOURNAL_PATH):
+        self.journal_path = journal_path
+        self._positions = {}  # key: (user id, book path), value: {'chapter', 'filename', 'offset', 'updated'}
+        self._pending = {}  # same keys; value is the position or None for a deletion
+        self._lines = 0  # lines in the journal file
+        self._offset = 0  # bytes of the journal already applied to _positions
+        self._inode = None  # journal file those bytes belong to; changes when a process compacts it
+        self._lock = threading.Lock()
+        self._io_lock = threading.Lock()
+        self._task = None
+
+    # --- Positions ---
+
+    def record(self, user_id: int, book_path: str, chapter: int, filename: str, offset: float):
+        position = {'chapter': chapter, 'filename': filename, 'offset': round(max(0.0, offset), 1), 'updated': time.time()}
+        key = (user_id, book_path)
+        with self._lock:
+            old = self._positions.get(key)
+            if old and old['chapter'] == chapter and old['offset'] == position['offset']:
+                return
+            self._positions[key] = position
+            self._pending[key] = position
+
+    def forget(self, user_id: int, book_path: str):
+        key = (user_id, book_path)
+        with self._lock:
+            if self._positions.pop(key, None) is not None:
+                self._pending[key] = None
+
+    def get(self, user_id: int, book_path: str):
+        with self._lock:
+            position = self._positions.get((user_id, book_path))
+            return dict(position) if position else None
+
+    def latest(self, user_id: int):
+        """Returns (book path, position) of the book the user listened to most recently, or None."""
+        with self._lock:
+            mine = [(position['updated'], book_path, position) for (uid, book_path), position in self._positions.items() if uid == user_id]
+        if not mine:
+            return None
+        _, book_path, position = max(mine, key=lambda entry: entry[0])
+        return book_path, dict(position)
+
+    # --- Journal ---
+
+    @staticmethod
+    def _line(key, position) -> str:
+        user_id, book_path = key
+        record = {'u': user_id, 'b': book_path}
+        if position is None:
+            record['d'] = 1
+        else:
+            record.update(c=position['chapter'], f=position['filename'], o=position['offset'], t=position['updated'])
+        return json.dumps(record, ensure_ascii=False, separators=(',', ':')) + '\n'
+
+    def _replay(self, f, updates: dict) -> tuple:
+        """Reads journal lines from a binary file into updates (last line wins, None = deleted). Returns (lines, torn)."""
+        lines = 0
+        torn = False
+        for line in f:
+            lines += 1
+            torn = not line.endswith(b'\n')
+            try:
+                record = json.loads(line)
+                key = (record['u'], record['b'])
+                if record.get('d'):
+                    updates[key] = None
+                else:
+                    updates[key] = {'chapter': record['c'], 'filename': record['f'], 'offset': record['o'], 'updated': record['t']}
+            except (ValueError, KeyError, TypeError):
+                log.warning("Skipping unreadable line %s of %s.", lines, self.journal_path)
+        return lines, torn
+
+    @contextlib.contextmanager
+    def _journal_lock(self):
+        """
+        Serializes journal access between processes: in cluster mode every worker appends to and
+        compacts the same file. A separate lock file, because compaction replaces the journal's inode.
+        """
+        if fcntl is None:
+            yield
+            return
+        with open(f"{self.journal_path}.lock", 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _sync(self, pending: dict) -> bool:
+        """
+        Applies the lines other processes appended since this one last read the journal, or replays
+        all of it after another process compacted it. Changes not yet written here (pending, or
+        recorded since) win. The caller holds both locks. Returns whether the last line was torn.
+        """
+        try:
+            with open(self.journal_path, 'rb') as f:
+                stat = os.fstat(f.fileno())
+                full = stat.st_ino != self._inode or stat.st_size < self._offset
+                if not full:
+                    f.seek(self._offset)
+                updates = {}
+                lines, torn = self._replay(f, updates)
+                self._offset = f.tell()
+                self._inode = stat.st_ino
+        except FileNotFoundError:
+            updates, lines, torn, full = {}, 0, False, True
+            self._offset, self._inode = 0, None
+
+        with self._lock:
+            keep = set(pending) | set(self._pending)
+            positions = {key: self._positions[key] for key in keep if key in self._positions} if full else self._positions
+            for key, position in updates.items():
+                if key in keep:
+                    continue
+                if position is None:
+                    positions.pop(key, None)
+                else:
+                    positions[key] = position
+            self._positions = positions
+        self._lines = lines if full else self._lines + lines
+        return torn
+
+    def load(self):
+        """Replays the journal (blocking). A torn last line from a crash is skipped."""
+        if not self.journal_path:
+            return
+        try:
+            with self._io_lock, self._journal_lock():
+                torn = self._sync({})
+                if torn:
+                    # Appending after a partial line would corrupt the next record too
+                    self._compact()
+        except OSError as e:
+            log.error("Failed to read resume journal %s: %s", self.journal_path, e)
+            return
+        log.info("Loaded %s resume positions from %s journal lines.", len(self._positions), self._lines)
+
+    def flush(self) -> int:
+        """
+        Appends pending changes to the journal and picks up positions saved by other cluster workers
+        (blocking; run it in an executor). Returns lines written.
+        """
+        if not self.journal_path:
+            return 0
+        with self._io_lock:
+            with self._lock:
+                pending, self._pending = self._pending, {}
+            start = time.perf_counter()
+            try:
+                with self._journal_lock():
+                    self._sync(pending)
+                    if pending:
+                        with open(self.journal_path, 'ab') as f:
+                            f.write(''.join(self._line(key, position) for key, position in pending.items()).encode('utf-8'))
+                            self._offset = f.tell()
+                        self._inode = os.stat(self.journal_path).st_ino
+                        self._lines += len(pending)
+                        RESUME_FLUSH_SECONDS.observe(time.perf_counter() - start)
+                    if self._lines > max(COMPACT_MIN_LINES, COMPACT_RATIO * len(self._positions)):
+                        self._compact()
+            except OSError as e:
+                log.error("Failed to write resume journal %s: %s", self.journal_path, e)
+                with self._lock:
+                    # Retry next time, unless newer changes came in meanwhile
+                    for key, position in pending.items():
+                        self._pending.setdefault(key, position)
+                return 0
+            return len(pending)
+
+    def _compact(self):
+        """
+        Rewrites the journal with only the live positions. The caller holds both locks and has just
+        synced, so the positions include every other process's writes.
+        """
+        with self._lock:
+            snapshot = list(self._positions.items())
+        tmp_path = f"{self.journal_path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, 'wb') as f:
+                f.write(''.join(self._line(key, position) for key, position in snapshot).encode('utf-8'))
+                offset = f.tell()
+            os.replace(tmp_path, self.journal_path)
+            self._inode = os.stat(self.journal_path).st_ino
+        except OSError as e:
+            log.error("Failed to compact resume journal %s: %s", self.journal_path, e)
+            return
+        log.info("Compacted resume journal from %s to %s lines.", self._lines, len(snapshot))
+        self._offset = offset
+        self._lines = len(snapshot)
+
+    def start(self, loop=None):
+        if not self.journal_path or (self._task and not self._task.done()):
+            return
+        loop = loop or asyncio.get_running_loop()
+        self._task = loop.create_task(self._run())
+
+    def stop(self):
+        if self._task:
+            self._task.cancel()
+            self._task = None
+        self.flush()
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(RESUME_FLUSH_INTERVAL)
+            try:
+                await loop.run_in_executor(None, self.flush)
+            except Exception:
+                log.exception("Flushing resume positions failed.")
+
+resume_store = ResumeStore()
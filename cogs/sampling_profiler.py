@@ -0,0 +1,100 @@
+# cogs/sampling_profiler.py
+import collections
+import logging
+import os
+import sys
+import threading
+import time
+
+from nextcord.player import AudioPlayer
+
+from config import PROFILE_INTERVAL, PROFILE_DIR
+
+log = logging.getLogger(__name__)
+
+_lock = threading.Lock()  # Only one profile at a time
+
+class SamplingProfiler:
+    """
+    Low-overhead statistical profiler. A background thread snapshots the stacks of the event
+    loop thread and the voice player (AudioPlayer) threads every `interval` seconds
+    and counts identical stacks. Nothing is hooked into the profiled code, so the only
+    cost is the sampling thread itself.
+    """
+    def __init__(self, interval: float = PROFILE_INTERVAL, loop_thread_id: int = None):
+        self.interval = interval
+        self.loop_thread_id = loop_thread_id
+        self.stacks = collections.Counter()
+        self.samples = 0
+        self.elapsed = 0.0
+
+    def _thread_label(self, thread_id: int, names: dict) -> str:
+        if thread_id == self.loop_thread_id:
+            return "event-loop"
+        return names.get(thread_id, f"thread-{thread_id}")
+
+    def run(self, seconds: float) -> collections.Counter:
+        """Samples for the given duration (blocking) and returns collapsed stack counts."""
+        if not _lock.acquire(blocking=False):
+            raise RuntimeError("A profile is already running.")
+        try:
+            own_id = threading.get_ident()
+            start = time.perf_counter()
+            deadline = start + seconds
+            while time.perf_counter() < deadline:
+                threads = threading.enumerate()
+                names = {t.ident: t.name for t in threads}
+                # Only the event loop and the voice players: idle executor workers, the log listener
+                # and the lag watchdog would only add samples parked in wait()
+                profiled = {t.ident for t in threads if isinstance(t, AudioPlayer)}
+                profiled.add(self.loop_thread_id)
+                for thread_id, frame in sys._current_frames().items():
+                    if thread_id not in profiled or thread_id == own_id:
+                        continue
+                    parts = []
+                    while frame is not None:
+                        code = frame.f_code
+                        parts.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                        frame = frame.f_back
+                    parts.append(self._thread_label(thread_id, names))
+                    self.stacks[';'.join(reversed(parts))] += 1
+                self.samples += 1
+                time.sleep(self.interval)
+            self.elapsed = time.perf_counter() - start
+            return self.stacks
+        finally:
+            _lock.release()
+
+    def top_functions(self, limit: int = 20) -> list:
+        """Returns [(function, self_samples, total_samples)] sorted by self samples."""
+        self_counts = collections.Counter()
+        total_counts = collections.Counter()
+        for stack, count in self.stacks.items():
+            frames = stack.split(';')[1:]  # Drop the thread label
+            if not frames:
+                continue
+            self_counts[frames[-1]] += count
+            for function in set(frames):
+                total_counts[function] += count
+        return [(function, count, total_counts[function]) for function, count in self_counts.most_common(limit)]
+
+    def write(self, out_dir: str = PROFILE_DIR, limit: int = 20) -> tuple:
+        """Writes <stamp>.folded (flamegraph.pl / speedscope input) and <stamp>.txt (top functions). Returns both paths."""
+        os.makedirs(out_dir, exist_ok=True)
+        stamp = time.strftime("profile-%Y%m%d-%H%M%S")
+        folded_path = os.path.join(out_dir, f"{stamp}.folded")
+        summary_path = os.path.join(out_dir, f"{stamp}.txt")
+
+        with open(folded_path, 'w', encoding='utf-8') as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+        total = sum(self.stacks.values()) or 1
+        with open(summary_path, 'w', encoding='utf-8') as f:
+            f.write(f"{self.samples} samples over {self.elapsed:.1f}s (interval {self.interval * 1000:.0f}ms)\n\n")
+            f.write(f"{'self %':>7} {'total %':>8}  function\n")
+            for function, self_count, total_count in self.top_functions(limit):
+                f.write(f"{100 * self_count / total:>7.1f} {100 * total_count / total:>8.1f}  {function}\n")
+
+        log.info("Wrote profile to %s and %s", folded_path, summary_path)
+        return folded_path, summary_path
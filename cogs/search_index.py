@@ -0,0 +1,247 @@
+# cogs/search_index.py
+import bisect
+import hashlib
+import heapq
+import logging
+import re
+import threading
+import time
+import unicodedata
+from collections import Counter, namedtuple
+
+from . import metrics
+
+log = logging.getLogger(__name__)
+
+SEARCH_SECONDS = metrics.Histogram(
+    'audiobot_search_seconds', 'Time to answer a search or autocomplete query.', buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.1)
+)
+
+MAX_PREFIX_CANDIDATES = 1000  # Cap on matches for a very short prefix ("a" matches half the library)
+FUZZY_POSTING_CAP = 20000  # Trigrams this common barely narrow things down; skipped once rarer ones found candidates
+FUZZY_MIN_SCORE = 0.3
+KIND_ORDER = {'book': 0, 'series': 1, 'author': 2, 'chapter': 3}
+KIND_EMOJI = {'book': "📖", 'series': "📚", 'author': "✍️", 'chapter': "🎧"}
+
+# key is a short stable hash of (kind, target), small enough for an autocomplete choice value (100 chars max)
+Entry = namedtuple('Entry', 'key kind text detail norm tokens trigrams book_path series_path chapter_filename')
+
+_NON_ALNUM = re.compile(r'[^0-9a-z]+')
+
+def normalize(text: str) -> str:
+    """Lowercases, strips accents and collapses punctuation to single spaces."""
+    text = text or ''
+    if not text.isascii():
+        text = unicodedata.normalize('NFKD', text)
+        text = ''.join(c for c in text if not unicodedata.combining(c))
+    return _NON_ALNUM.sub(' ', text.lower()).strip()
+
+def trigrams(norm: str) -> frozenset:
+    padded = f"  {norm} "
+    return frozenset(padded[i:i + 3] for i in range(len(padded) - 2))
+
+def _make_entry(kind: str, target: str, text: str, detail: str = '', book_path=None, series_path=None, chapter_filename=None) -> Entry:
+    key = hashlib.blake2b(f"{kind}\0{target}".encode('utf-8'), digest_size=8).hexdigest()
+    norm = normalize(text)
+    return Entry(key, kind, text, detail, norm, tuple(dict.fromkeys(norm.split())), trigrams(norm),
+                 book_path, series_path, chapter_filename)
+
+def _catalog_entries(items: list) -> dict:
+    """Author, series and book entries for the catalog's item list, keyed by entry key."""
+    entries = {}
+    def add(entry):
+        entries[entry.key] = entry
+    for item in items:
+        author = item.get('author') or ''
+        if author:
+            add(_make_entry('author', author, author))
+        if item['type'] == 'series':
+            add(_make_entry('series', item['path'], item['title'], f"by {author}", series_path=item['path']))
+            for book in item.get('books', []):
+                add(_make_entry('book', book['path'], book['title'], f"{item['title']} · by {author}",
+                                book_path=book['path'], series_path=item['path']))
+        else:
+            add(_make_entry('book', item['path'], item['title'], f"by {author}", book_path=item['path']))
+    return entries
+
+class SearchIndex:
+    """
+    In-memory index over author, series, book and chapter titles for /search and its autocomplete.
+
+    Two structures share the entries: a sorted list of (token, key) pairs, where every word that
+    starts with a prefix is one bisect away, and a trigram inverted index used as a typo-tolerant
+    fallback when the prefixes don't fill the result list. Both are updated in place as the catalog
+    changes, so a rescan only costs the entries that actually differ.
+    """
+    def __init__(self):
+        self._entries = {}  # key: entry key, value: Entry
+        self._tokens = []  # sorted (token, entry key)
+        self._trigrams = {}  # key: trigram, value: set of entry keys
+        self._book_chapters = {}  # key: book path, value: (mtime_ns, set of chapter entry keys)
+        self._item_keys = set()
+        self._lock = threading.Lock()
+        self.ready = False
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key: str):
+        return self._entries.get(key)
+
+    # --- Updates ---
+
+    def _apply(self, added: list, removed: list):
+        """Adds and removes entries; the caller holds the lock."""
+        removed = [self._entries.pop(key) for key in removed if key in self._entries]
+        added = list({entry.key: entry for entry in added if entry.key not in self._entries}.values())
+        for entry in added:
+            self._entries[entry.key] = entry
+
+        if len(added) + len(removed) > len(self._tokens) // 8:
+            # Bulk change (first build, big rescan): one sort beats many list inserts
+            gone = {entry.key for entry in removed}
+            tokens = [pair for pair in self._tokens if pair[1] not in gone] if gone else self._tokens
+            tokens.extend((token, entry.key) for entry in added for token in entry.tokens)
+            tokens.sort()
+            self._tokens = tokens
+        else:
+            for entry in removed:
+                for token in entry.tokens:
+                    i = bisect.bisect_left(self._tokens, (token, entry.key))
+                    if i < len(self._tokens) and self._tokens[i] == (token, entry.key):
+                        del self._tokens[i]
+            for entry in added:
+                for token in entry.tokens:
+                    bisect.insort(self._tokens, (token, entry.key))
+
+        for entry in removed:
+            for trigram in entry.trigrams:
+                keys = self._trigrams.get(trigram)
+                if keys is not None:
+                    keys.discard(entry.key)
+                    if not keys:
+                        del self._trigrams[trigram]
+        for entry in added:
+            for trigram in entry.trigrams:
+                self._trigrams.setdefault(trigram, set()).add(entry.key)
+
+    def _chapter_changes(self, book_path: str, mtime, chapters: list, added: list, removed: list):
+        current = self._book_chapters.get(book_path)
+        if current and current[0] == mtime:
+            return
+        if current:
+            removed.extend(current[1])
+        title = book_path.rstrip('/\\').replace('\\', '/').rsplit('/', 1)[-1]
+        keys = set()
+        for chapter in chapters or []:
+            entry = _make_entry('chapter', f"{book_path}\0{chapter['filename']}", chapter['title'], title,
+                                book_path=book_path, chapter_filename=chapter['filename'])
+            added.append(entry)
+            keys.add(entry.key)
+        self._book_chapters[book_path] = (mtime, keys)
+
+    def sync(self, catalog):
+        """Diffs the index against the whole catalog and applies only the differences (blocking)."""
+        start = time.perf_counter()
+        items = catalog.items
+        if items is None:
+            return
+        wanted = _catalog_entries(items)
+        books = list(catalog.iter_books())
+        with self._lock:
+            added = [entry for key, entry in wanted.items() if key not in self._item_keys]
+            removed = [key for key in self._item_keys if key not in wanted]
+            self._item_keys = set(wanted)
+            seen = set()
+            for book_path, mtime, chapters in books:
+                seen.add(book_path)
+                self._chapter_changes(book_path, mtime, chapters, added, removed)
+            for book_path in [path for path in self._book_chapters if path not in seen]:
+                removed.extend(self._book_chapters.pop(book_path)[1])
+            self._apply(added, removed)
+            self.ready = True
+        log.info("Search index synced: +%s -%s entries (%s total) in %.0fms.",
+                 len(added), len(removed), len(self._entries), (time.perf_counter() - start) * 1000)
+
+    def update_books(self, catalog, book_paths):
+        """Re-indexes the chapters of a few books, e.g. after one was read from disk."""
+        changed = list(catalog.iter_books(book_paths))
+        with self._lock:
+            added, removed = [], []
+            for book_path, mtime, chapters in changed:
+                self._chapter_changes(book_path, mtime, chapters, added, removed)
+            self._apply(added, removed)
+
+    def attach(self, catalog):
+        """Keeps the index in step with the catalog from now on."""
+        def on_change(book_paths):
+            if book_paths is None:
+                self.sync(catalog)
+            elif self.ready:
+                self.update_books(catalog, book_paths)
+        catalog.add_listener(on_change)
+
+    # --- Queries ---
+
+    def _prefix_range(self, prefix: str):
+        lo = bisect.bisect_left(self._tokens, (prefix,))
+        hi = bisect.bisect_left(self._tokens, (prefix + '\uffff',))
+        return lo, hi
+
+    @staticmethod
+    def _rank(entry: Entry, norm_query: str):
+        return (not entry.norm.startswith(norm_query), KIND_ORDER[entry.kind], len(entry.norm), entry.norm)
+
+    def search(self, query: str, limit: int = 25) -> list:
+        """Returns up to limit entries: every query word must prefix some word of the entry, then fuzzy matches."""
+        start = time.perf_counter()
+        norm_query = normalize(query)
+        words = list(dict.fromkeys(norm_query.split()))
+        if not words:
+            return []
+        with self._lock:
+            # Narrow by the word with the fewest prefix matches, then check the others per candidate
+            ranges = sorted((hi - lo, lo, hi, word) for word in words for lo, hi in [self._prefix_range(word)])
+            _, lo, hi, _ = ranges[0]
+            others = [word for _, _, _, word in ranges[1:]]
+            candidates = {}
+            for _, key in self._tokens[lo:hi]:
+                if key in candidates:
+                    continue
+                entry = self._entries[key]
+                if all(any(token.startswith(word) for token in entry.tokens) for word in others):
+                    candidates[key] = entry
+                    if len(candidates) >= MAX_PREFIX_CANDIDATES:
+                        break
+            results = heapq.nsmallest(limit, candidates.values(), key=lambda e: self._rank(e, norm_query))
+            if len(results) < limit and len(norm_query) >= 3:
+                results += self._fuzzy(norm_query, limit - len(results), exclude=candidates)
+        SEARCH_SECONDS.observe(time.perf_counter() - start)
+        return results
+
+    def _fuzzy(self, norm_query: str, limit: int, exclude) -> list:
+        query_trigrams = trigrams(norm_query)
+        postings = sorted((self._trigrams.get(trigram, ()) for trigram in query_trigrams), key=len)
+        counts = Counter()
+        for keys in postings:
+            if len(keys) > FUZZY_POSTING_CAP and counts:
+                break
+            counts.update(keys)
+        scored = []
+        for key, shared in counts.items():
+            if key in exclude:
+                continue
+            entry = self._entries[key]
+            score = shared / (len(query_trigrams) + len(entry.trigrams) - shared)  # Jaccard similarity
+            if score >= FUZZY_MIN_SCORE:
+                scored.append((-score, KIND_ORDER[entry.kind], entry.norm, entry))
+        return [entry for *_, entry in heapq.nsmallest(limit, scored, key=lambda s: s[:3])]
+
+def choice_label(entry: Entry) -> str:
+    """Autocomplete choice names are limited to 100 characters."""
+    label = f"{KIND_EMOJI[entry.kind]} {entry.text}"
+    if entry.detail:
+        label += f" — {entry.detail}"
+    return label if len(label) <= 100 else label[:97] + "..."
+
+search_index = SearchIndex()
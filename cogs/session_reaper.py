@@ -0,0 +1,163 @@
+# cogs/session_reaper.py
+import nextcord as discord
+import asyncio
+import logging
+import time
+
+from config import REAPER_INTERVAL, IDLE_PAUSED_TIMEOUT, IDLE_SESSION_TIMEOUT
+from .ffmpeg_supervisor import supervisor
+from .position_source import unwrap
+from .listening_party import party_manager
+from .play_queue import play_queue
+
+log = logging.getLogger(__name__)
+
+class SessionReaper:
+    """
+    Background task that evicts abandoned player sessions.
+
+    A session is reaped when it has been paused for longer than IDLE_PAUSED_TIMEOUT,
+    or when nothing has been playing for longer than IDLE_SESSION_TIMEOUT. Reaping
+    stops playback (which kills the ffmpeg child), disconnects the voice client and
+    removes the view from PlayerCog.active_views.
+    """
+    def __init__(self, bot, active_views: dict):
+        self.bot = bot
+        self.active_views = active_views
+        self.orphan_voice_clients = {}  # key: guild.id, value: time first seen without a session
+        self.reaped_sessions = 0
+        self._task = None
+
+    def start(self):
+        if self._task and not self._task.done():
+            return
+        self._task = self.bot.loop.create_task(self._run())
+        log.info("Session reaper started (interval %ss, paused timeout %ss, idle timeout %ss).", REAPER_INTERVAL, IDLE_PAUSED_TIMEOUT, IDLE_SESSION_TIMEOUT)
+
+    def stop(self):
+        if self._task:
+            self._task.cancel()
+            self._task = None
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(REAPER_INTERVAL)
+            try:
+                await self.sweep()
+            except Exception:
+                log.exception("Error during session reaper sweep.")
+
+    def stats(self) -> dict:
+        """Returns counts of live sessions, voice connections and ffmpeg children."""
+        return {
+            'sessions': len(self.active_views),
+            'playing': sum(1 for view in self.active_views.values() if view.is_playing and not view.is_paused),
+            'paused': sum(1 for view in self.active_views.values() if view.is_paused),
+            'voice_clients': len(self.bot.voice_clients),
+            'ffmpeg_processes': len(supervisor.live_processes()),
+            'queued_streams': supervisor.queue_length(),
+            'reaped_sessions': self.reaped_sessions,
+        }
+
+    def _idle_reason(self, view, voice_client, now: float):
+        """Returns why a session should be reaped, or None if it is still in use."""
+        last_activity = getattr(view, 'last_activity', 0)
+        if voice_client and voice_client.is_paused():
+            paused_since = max(view.pause_start_time or last_activity, last_activity)
+            if now - paused_since > IDLE_PAUSED_TIMEOUT:
+                return f"paused for {now - paused_since:.0f}s"
+            return None
+        if voice_client and voice_client.is_playing():
+            return None
+        if view.is_finished():
+            return "view timed out"
+        if now - last_activity > IDLE_SESSION_TIMEOUT:
+            return f"idle for {now - last_activity:.0f}s"
+        return None
+
+    async def sweep(self) -> int:
+        """Runs one reaper pass and returns the number of sessions evicted."""
+        now = time.time()
+        reaped = 0
+
+        for guild_id, view in list(self.active_views.items()):
+            guild = self.bot.get_guild(guild_id)
+            voice_client = discord.utils.get(self.bot.voice_clients, guild=guild) if guild else None
+            reason = self._idle_reason(view, voice_client, now)
+            if reason:
+                await self.reap_session(guild_id, reason)
+                reaped += 1
+
+        # Voice clients left behind without a session (e.g. the view was dropped by /stop failing mid-way)
+        for voice_client in list(self.bot.voice_clients):
+            guild_id = voice_client.guild.id
+            # Member channels of a listening party have no session of their own
+            if guild_id in self.active_views or voice_client.is_playing() or party_manager.party_of(guild_id):
+                self.orphan_voice_clients.pop(guild_id, None)
+                continue
+            first_seen = self.orphan_voice_clients.setdefault(guild_id, now)
+            if now - first_seen > IDLE_SESSION_TIMEOUT:
+                log.info("Reaping orphaned voice client in guild %s.", guild_id)
+                await _disconnect(voice_client)
+                self.orphan_voice_clients.pop(guild_id, None)
+
+        if reaped:
+            log.info("Session reaper evicted %s session(s). Live: %s", reaped, self.stats())
+            if not self.active_views:
+                try:
+                    await self.bot.change_presence(activity=None)
+                except Exception as e:
+                    log.warning("Failed to clear presence after reaping: %s", e)
+        else:
+            log.debug("Session reaper sweep complete. Live: %s", self.stats())
+        return reaped
+
+    async def reap_session(self, guild_id: int, reason: str):
+        """Stops playback, disconnects and evicts the session for a guild."""
+        view = self.active_views.pop(guild_id, None)
+        if view is None:
+            return
+        log.info("Reaping session for guild %s: %s.", guild_id, reason)
+
+        guild = self.bot.get_guild(guild_id)
+        voice_client = discord.utils.get(self.bot.voice_clients, guild=guild) if guild else None
+        if voice_client and (voice_client.is_playing() or voice_client.is_paused()):
+            view.manual_stop = True
+            voice_client.stop()
+        if voice_client:
+            await _disconnect(voice_client)
+        await party_manager.release_guild(guild_id)
+        play_queue.clear(guild_id)
+
+        # The player thread normally cleans up the source; make sure no ffmpeg child outlives the session
+        source = getattr(view, 'audio_source', None)
+        if _source_is_alive(source):
+            log.info("Killing leftover ffmpeg process for guild %s.", guild_id)
+            source.cleanup()
+        supervisor.release(guild_id)
+        view.audio_source = None
+
+        view.is_playing = False
+        view.is_paused = False
+        view.time_tracker_running = False
+
+        for message in list(getattr(view, 'messages', ())):
+            try:
+                await message.edit(content="💤 Player closed due to inactivity. Use `/audiobook` to start again.", view=None)
+            except Exception:
+                pass
+        if hasattr(view, 'messages'):
+            view.messages.clear()
+        view.message = None
+        view.stop()
+        self.reaped_sessions += 1
+
+def _source_is_alive(source) -> bool:
+    process = getattr(unwrap(source), '_process', None)
+    return process is not None and process.poll() is None
+
+async def _disconnect(voice_client):
+    try:
+        await voice_client.disconnect(force=True)
+    except Exception as e:
+        log.warning("Failed to disconnect voice client: %s", e)
@@ -0,0 +1,105 @@
+# cogs/silence_map.py
+import logging
+import subprocess
+
+import numpy as np
+
+from config import SILENCE_THRESHOLD_DB, SILENCE_MIN_SECONDS, SILENCE_WORKERS
+from . import library_index
+
+log = logging.getLogger(__name__)
+
+# Detection works on a mono 8 kHz decode: plenty to tell speech from silence, and cheap to move through a pipe
+SAMPLE_RATE = 8000
+WINDOW_SAMPLES = 160  # 20 ms
+BLOCK_WINDOWS = 1500  # 30 s of PCM per read
+# Silence kept on each side of a skipped range, so speech is never clipped and sentences don't run together
+KEEP_SECONDS = 0.25
+# Upper bound on ranges in one ffmpeg filter expression; later silences in a huge file just play
+MAX_SKIPS_PER_STREAM = 400
+
+def window_levels(pcm: bytes) -> np.ndarray:
+    """RMS level (dBFS) of every full 20 ms window of signed 16-bit mono PCM."""
+    samples = np.frombuffer(pcm, dtype='<i2')
+    windows = samples[:len(samples) // WINDOW_SAMPLES * WINDOW_SAMPLES].reshape(-1, WINDOW_SAMPLES).astype(np.float32)
+    power = np.mean(np.square(windows / 32768.0), axis=1)
+    return 10 * np.log10(np.maximum(power, 1e-12))
+
+def find_silences(levels: np.ndarray, threshold_db: float = SILENCE_THRESHOLD_DB, min_seconds: float = SILENCE_MIN_SECONDS) -> np.ndarray:
+    """
+    Silent intervals as an (n, 2) array of [start, end) seconds: runs of windows below threshold_db
+    lasting at least min_seconds, shrunk by KEEP_SECONDS on each side.
+    """
+    window_seconds = WINDOW_SAMPLES / SAMPLE_RATE
+    silent = np.concatenate(([False], levels < threshold_db, [False]))
+    edges = np.flatnonzero(np.diff(silent.astype(np.int8)))
+    starts, ends = edges[0::2], edges[1::2]
+    long_enough = (ends - starts) * window_seconds >= min_seconds
+    intervals = np.column_stack((starts[long_enough], ends[long_enough])) * window_seconds
+    intervals[:, 0] += KEEP_SECONDS
+    intervals[:, 1] -= KEEP_SECONDS
+    return intervals[intervals[:, 1] > intervals[:, 0]]
+
+def detect_silences(file_path: str, timeout: float = 3600):
+    """Decodes a file once and returns its silent intervals (see find_silences), or None if ffmpeg failed."""
+    command = ['ffmpeg', '-hide_banner', '-loglevel', 'error', '-i', file_path, '-vn',
+               '-ac', '1', '-ar', str(SAMPLE_RATE), '-f', 's16le', 'pipe:1']
+    try:
+        process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+    except FileNotFoundError:
+        log.critical("!!! ffmpeg not found! Make sure FFmpeg is installed and in your system's PATH. !!!")
+        return None
+    levels = []
+    block_bytes = BLOCK_WINDOWS * WINDOW_SAMPLES * 2
+    try:
+        while True:
+            # read() returns full blocks until the end, so windows never straddle two blocks
+            pcm = process.stdout.read(block_bytes)
+            if not pcm:
+                break
+            levels.append(window_levels(pcm))
+        returncode = process.wait(timeout=timeout)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        log.error("Silence analysis timed out for file %s", file_path)
+        return None
+    finally:
+        process.stdout.close()
+    if returncode != 0 or not levels:
+        log.warning("Could not analyse silences of %s (ffmpeg exit code %s).", file_path, returncode)
+        return None
+    return find_silences(np.concatenate(levels))
+
+def pack(intervals: np.ndarray) -> bytes:
+    """Millisecond [start, end) pairs as little-endian uint32: 8 bytes per silence."""
+    return np.round(intervals * 1000).astype('<u4').tobytes()
+
+def unpack(blob: bytes) -> np.ndarray:
+    return np.frombuffer(blob, dtype='<u4').reshape(-1, 2) / 1000.0
+
+def analyze_silences(db_path: str = None, workers: int = SILENCE_WORKERS) -> dict:
+    """Stores the silence map of every new or modified chapter file in the library index (blocking, offline)."""
+    def measure(path):
+        intervals = detect_silences(path)
+        return None if intervals is None else (pack(intervals),)
+    return library_index.analyze_changed_files('silences', ('intervals',), measure, db_path, workers)
+
+def playback_skips(file_path: str, begin: float, end: float = None) -> list:
+    """
+    The silences to skip when a stream plays file_path from begin (to end, if given), as
+    [(start, end)] seconds relative to begin. Empty if the file has no (current) silence map.
+    """
+    row = library_index.load_analysis('silences', ('intervals',), file_path)
+    if row is None:
+        return []
+    intervals = unpack(row['intervals'])
+    intervals = intervals[intervals[:, 1] > begin]
+    if end is not None:
+        intervals = intervals[intervals[:, 0] < end]
+    clipped = np.clip(intervals, begin, end if end is not None else np.inf) - begin
+    return [(float(start), float(stop)) for start, stop in clipped[:MAX_SKIPS_PER_STREAM] if stop > start]
+
+def skip_filter(skips: list) -> str:
+    """An ffmpeg filter that drops the given ranges of the stream and closes the gaps."""
+    ranges = '+'.join(f"between(t,{start:.3f},{stop:.3f})" for start, stop in skips)
+    return f"aselect='not({ranges})',asetpts=N/SR/TB"
@@ -0,0 +1,296 @@
+# cogs/synopsis_index.py
+import hashlib
+import math
+import os
+import queue
+import re
+import sqlite3
+import logging
+import threading
+import time
+from collections import Counter
+
+from config import SYNOPSIS_INDEX_PATH
+from . import audio_utils
+from . import library_index
+from . import metrics
+from .search_index import normalize
+
+log = logging.getLogger(__name__)
+
+SYNOPSIS_SEARCH_SECONDS = metrics.Histogram(
+    'audiobot_synopsis_search_seconds', 'Time to answer a synopsis search.', buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1)
+)
+
+# BM25 parameters (the usual defaults)
+BM25_K1 = 1.2
+BM25_B = 0.75
+SNIPPET_CHARS = 160
+
+STOPWORDS = frozenset(
+    "a an and are as at be but by for from has have he her his in is it its of on or she that the their "
+    "them they this to was were will with who whom which what when where how not no into than then".split()
+)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS docs (
+    book_path TEXT PRIMARY KEY,
+    signature TEXT NOT NULL,
+    title TEXT NOT NULL,
+    author TEXT NOT NULL,
+    length INTEGER NOT NULL,
+    synopsis TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS postings (
+    term TEXT NOT NULL,
+    book_path TEXT NOT NULL,
+    tf INTEGER NOT NULL,
+    PRIMARY KEY (term, book_path)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS postings_by_book ON postings (book_path);
+"""
+
+def _stem(word: str) -> str:
+    """Folds simple plurals so "dragons" finds "dragon"; anything fancier isn't worth it for synopses."""
+    if len(word) > 4 and word.endswith('ies'):
+        return word[:-3] + 'y'
+    if len(word) > 3 and word.endswith('s') and not word.endswith(('ss', 'us', 'is')):
+        return word[:-1]
+    return word
+
+def tokenize(text: str) -> list:
+    return [_stem(word) for word in normalize(text).split() if word not in STOPWORDS and len(word) > 1]
+
+def _book_list(items: list) -> dict:
+    """book path -> (title, author) for every book in the catalog's item list."""
+    books = {}
+    for item in items:
+        if item['type'] == 'series':
+            for book in item.get('books', []):
+                books[book['path']] = (book['title'], item['author'])
+        else:
+            books[item['path']] = (item['title'], item['author'])
+    return books
+
+def _cached_synopses(book_paths) -> dict:
+    """
+    book path -> (signature, synopsis) from the library index's chapter metadata.
+    The signature changes whenever a chapter file of the book is added, removed or modified.
+    """
+    conn = library_index.connect()
+    try:
+        query = "SELECT book_path, filename, mtime_ns, size, synopsis FROM chapters"
+        if len(book_paths) <= 50:
+            # A few books re-read by the catalog: use the book_path index instead of a full scan
+            rows = [row for book_path in book_paths
+                    for row in conn.execute(f"{query} WHERE book_path = ? ORDER BY filename", (book_path,))]
+        else:
+            rows = conn.execute(f"{query} ORDER BY book_path, filename")
+        found = {}
+        for row in rows:
+            book_path = row['book_path']
+            if book_path not in book_paths:
+                continue
+            if book_path not in found:
+                found[book_path] = (hashlib.blake2b(digest_size=16), None)
+            digest, synopsis = found[book_path]
+            digest.update(f"{row['filename']}:{row['mtime_ns']}:{row['size']}\0".encode('utf-8'))
+            found[book_path] = (digest, synopsis or row['synopsis'])
+        return {book_path: (digest.hexdigest(), synopsis) for book_path, (digest, synopsis) in found.items()}
+    finally:
+        conn.close()
+
+def _probe_synopsis(book_path: str, signature_only: bool = False):
+    """Fallback without a library index: the first chapter file's tags, as the Show Synopsis button reads them."""
+    try:
+        chapter_files = sorted(f for f in os.listdir(book_path) if f.endswith('.m4b'))
+    except OSError:
+        return None, None
+    if not chapter_files:
+        return '', None
+    full_path = os.path.join(book_path, chapter_files[0])
+    try:
+        st = os.stat(full_path)
+    except OSError:
+        return None, None
+    signature = f"{chapter_files[0]}:{st.st_mtime_ns}:{st.st_size}"
+    if signature_only:
+        return signature, None
+    return signature, audio_utils.get_synopsis_from_data(audio_utils._run_ffprobe(full_path))
+
+class SynopsisIndex:
+    """
+    Persisted inverted index over book synopses, ranked with BM25.
+
+    Every book is a document; postings (term, book, term frequency) live in SQLite next to the
+    documents, so a restart doesn't rebuild anything. Refreshes compare a per-book signature
+    (chapter file names, mtimes and sizes) and only re-index books whose files changed. Text comes
+    from the library index when one is configured, so neither building nor querying touches the
+    audio files; otherwise a changed book's first chapter is probed once.
+    """
+    def __init__(self, db_path: str = SYNOPSIS_INDEX_PATH):
+        self.db_path = db_path
+        self._refresh_lock = threading.Lock()
+        self._changes = queue.Queue()  # book paths (or None) the catalog reported changed
+        self._worker = None
+        self.ready = False
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.db_path)
+
+    def connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(SCHEMA)
+        return conn
+
+    # --- Building ---
+
+    def refresh(self, catalog, book_paths=None) -> dict:
+        """
+        Brings the index in line with the catalog (blocking; run it in an executor).
+        book_paths limits the refresh to those books, e.g. after the catalog re-read one.
+        """
+        if not self.enabled or catalog.items is None:
+            return {}
+        with self._refresh_lock:
+            start = time.perf_counter()
+            books = _book_list(catalog.items)
+            wanted = books if book_paths is None else {path: books[path] for path in book_paths if path in books}
+
+            conn = self.connect()
+            try:
+                known = {row['book_path']: row['signature'] for row in conn.execute("SELECT book_path, signature FROM docs")}
+                if library_index.index_available():
+                    try:
+                        cached = _cached_synopses(wanted)
+                    except sqlite3.Error as e:
+                        log.error("Failed to read synopses from the library index: %s", e)
+                        cached = None
+                else:
+                    cached = None
+
+                changed = []
+                for book_path, (title, author) in wanted.items():
+                    if cached is not None:
+                        signature, synopsis = cached.get(book_path, ('', None))
+                    else:
+                        signature, synopsis = _probe_synopsis(book_path, signature_only=True)
+                        if signature is None:
+                            continue  # Unreadable right now; keep what we have
+                        if known.get(book_path) != signature:
+                            signature, synopsis = _probe_synopsis(book_path)
+                    if known.get(book_path) != signature:
+                        changed.append((book_path, signature, title, author, synopsis or ''))
+                removed = [path for path in known if path not in books] if book_paths is None else []
+
+                with conn:
+                    for book_path, signature, title, author, synopsis in changed:
+                        terms = Counter(tokenize(synopsis))
+                        conn.execute("DELETE FROM postings WHERE book_path = ?", (book_path,))
+                        conn.executemany(
+                            "INSERT INTO postings (term, book_path, tf) VALUES (?, ?, ?)",
+                            [(term, book_path, tf) for term, tf in terms.items()]
+                        )
+                        conn.execute(
+                            "INSERT OR REPLACE INTO docs (book_path, signature, title, author, length, synopsis) VALUES (?, ?, ?, ?, ?, ?)",
+                            (book_path, signature, title, author, sum(terms.values()), synopsis)
+                        )
+                    for book_path in removed:
+                        conn.execute("DELETE FROM postings WHERE book_path = ?", (book_path,))
+                        conn.execute("DELETE FROM docs WHERE book_path = ?", (book_path,))
+            finally:
+                conn.close()
+
+            self.ready = True
+            stats = {'books': len(wanted), 'reindexed': len(changed), 'removed': len(removed), 'seconds': time.perf_counter() - start}
+            if changed or removed:
+                log.info("Synopsis index refreshed: %s", stats)
+            return stats
+
+    def attach(self, catalog):
+        """
+        Re-indexes books as the catalog notices changes. Listeners can run on the event loop
+        (get_chapters re-reading a book), so the refresh is handed to a worker thread.
+        """
+        def on_change(book_paths):
+            if self.ready:
+                self._changes.put(book_paths)
+        if self._worker is None:
+            self._worker = threading.Thread(target=self._apply_changes, args=(catalog,), name="synopsis-index", daemon=True)
+            self._worker.start()
+        catalog.add_listener(on_change)
+
+    def _apply_changes(self, catalog):
+        while True:
+            book_paths = self._changes.get()
+            # Changes that queued up during a refresh are applied together; None means everything
+            while book_paths is not None:
+                try:
+                    more = self._changes.get_nowait()
+                except queue.Empty:
+                    break
+                book_paths = None if more is None else set(book_paths) | set(more)
+            try:
+                self.refresh(catalog, book_paths)
+            except Exception:
+                log.exception("Refreshing the synopsis index failed.")
+
+    # --- Queries ---
+
+    def search(self, query: str, limit: int = 5) -> list:
+        """Returns [{book_path, title, author, score, snippet}] ranked by BM25 (blocking)."""
+        terms = list(dict.fromkeys(tokenize(query)))
+        if not terms or not self.enabled:
+            return []
+        start = time.perf_counter()
+        conn = self.connect()
+        try:
+            doc_count, avg_length = conn.execute("SELECT COUNT(*), AVG(length) FROM docs WHERE length > 0").fetchone()
+            if not doc_count:
+                return []
+            avg_length = avg_length or 1.0
+            scores = Counter()
+            lengths = {}
+            for term in terms:
+                postings = conn.execute(
+                    "SELECT p.book_path, p.tf, d.length FROM postings p JOIN docs d ON d.book_path = p.book_path WHERE p.term = ?",
+                    (term,)
+                ).fetchall()
+                if not postings:
+                    continue
+                idf = math.log(1 + (doc_count - len(postings) + 0.5) / (len(postings) + 0.5))
+                for book_path, tf, length in postings:
+                    lengths[book_path] = length
+                    scores[book_path] += idf * tf * (BM25_K1 + 1) / (tf + BM25_K1 * (1 - BM25_B + BM25_B * length / avg_length))
+
+            results = []
+            for book_path, score in scores.most_common(limit):
+                row = conn.execute("SELECT title, author, synopsis FROM docs WHERE book_path = ?", (book_path,)).fetchone()
+                results.append({
+                    'book_path': book_path,
+                    'title': row['title'],
+                    'author': row['author'],
+                    'score': score,
+                    'snippet': snippet(row['synopsis'], terms),
+                })
+            return results
+        finally:
+            conn.close()
+            SYNOPSIS_SEARCH_SECONDS.observe(time.perf_counter() - start)
+
+def snippet(text: str, terms: list) -> str:
+    """A window of the synopsis around the first query term it contains."""
+    text = ' '.join(text.split())
+    match = re.search(r'\b(' + '|'.join(re.escape(term) for term in terms) + r')', text, re.IGNORECASE)
+    begin = max(0, match.start() - SNIPPET_CHARS // 3) if match else 0
+    excerpt = text[begin:begin + SNIPPET_CHARS]
+    if begin > 0:
+        excerpt = "…" + excerpt
+    if begin + SNIPPET_CHARS < len(text):
+        excerpt += "…"
+    return excerpt
+
+synopsis_index = SynopsisIndex()
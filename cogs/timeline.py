@@ -0,0 +1,59 @@
+# cogs/timeline.py
+import bisect
+import itertools
+import re
+
+_UNIT_TIME = re.compile(r'^(?:(\d+(?:\.\d+)?)h)?(?:(\d+(?:\.\d+)?)m)?(?:(\d+(?:\.\d+)?)s?)?$')
+
+class BookTimeline:
+    """
+    Cumulative chapter start offsets of one book, built from the chapter durations the catalog
+    already holds (no probing). Maps book time to (chapter index, offset in chapter) with a bisect.
+    """
+    def __init__(self, chapters: list):
+        durations = [max(0.0, float(chapter.get('duration') or 0.0)) for chapter in chapters]
+        self.starts = list(itertools.accumulate(durations, initial=0.0))[:-1]
+        self.durations = durations
+        self.total = self.starts[-1] + durations[-1] if durations else 0.0
+
+    def __len__(self):
+        return len(self.starts)
+
+    def locate(self, book_time: float):
+        """Returns (chapter index, seconds into that chapter); times past the end land at the last chapter's end."""
+        if not self.starts:
+            raise ValueError("book has no chapters")
+        book_time = min(max(0.0, book_time), self.total)
+        index = max(0, bisect.bisect_right(self.starts, book_time) - 1)
+        # Skip zero-length chapters that share a start offset with the next one
+        while index < len(self.starts) - 1 and self.durations[index] == 0:
+            index += 1
+        return index, min(book_time - self.starts[index], self.durations[index])
+
+    def book_time(self, index: int, offset: float = 0.0) -> float:
+        """Book-level position of an offset inside chapter index."""
+        if not 0 <= index < len(self.starts):
+            return 0.0
+        return self.starts[index] + offset
+
+def parse_book_time(text: str) -> float:
+    """
+    Parses a book timestamp: "5:32:10", "332:10", "19930", "5h32m10s" or "90m".
+    Raises ValueError for anything else.
+    """
+    text = text.strip().lower().replace(' ', '')
+    if not text:
+        raise ValueError("empty timestamp")
+    if ':' in text:
+        parts = text.split(':')
+        if len(parts) > 3 or any(not part for part in parts):
+            raise ValueError(f"invalid timestamp {text!r}")
+        seconds = 0.0
+        for part in parts:
+            seconds = seconds * 60 + float(part)
+        return seconds
+    match = _UNIT_TIME.match(text)
+    if not match or not any(match.groups()):
+        raise ValueError(f"invalid timestamp {text!r}")
+    hours, minutes, seconds = (float(value) if value else 0.0 for value in match.groups())
+    return hours * 3600 + minutes * 60 + seconds
@@ -0,0 +1,76 @@
+# cogs/volume.py
+import nextcord as discord
+import numpy as np
+
+FRAME_BYTES = discord.opus.Encoder.FRAME_SIZE  # 20 ms of 48 kHz stereo s16le
+BUFFER_FRAMES = 10  # Frames scaled per NumPy call; a volume change is heard within this many frames
+MAX_VOLUME = 2.0
+
+class VolumeSource(discord.AudioSource):
+    """
+    Scales a PCM source by a volume that can change while it plays.
+
+    nextcord's PCMVolumeTransformer calls into the interpreter for every 20 ms frame of every
+    stream. This reads BUFFER_FRAMES frames ahead and scales them with one NumPy multiply, then
+    hands out frames as slices of the result. At volume 1.0 frames pass through untouched.
+    A change ramps linearly across one buffer, so it doesn't click.
+    """
+    def __init__(self, original: discord.AudioSource, volume: float = 1.0):
+        self.original = original
+        self._volume = self._applied = min(max(volume, 0.0), MAX_VOLUME)
+        self._buffer = b''
+        self._pos = 0
+
+    @property
+    def volume(self) -> float:
+        return self._volume
+
+    @volume.setter
+    def volume(self, value: float):
+        # Read by the voice client's player thread at the next buffer refill
+        self._volume = min(max(value, 0.0), MAX_VOLUME)
+
+    def _refill(self):
+        frames = []
+        for _ in range(BUFFER_FRAMES):
+            frame = self.original.read()
+            if len(frame) != FRAME_BYTES:
+                break
+            frames.append(frame)
+        start, end = self._applied, self._volume
+        self._applied = end
+        if not frames:
+            return b''
+        data = b''.join(frames)
+        if start == end == 1.0:
+            return data
+        samples = np.frombuffer(data, dtype='<i2').astype(np.float32)
+        if start == end:
+            samples *= end
+        else:
+            samples *= np.linspace(start, end, len(samples) // 2, dtype=np.float32).repeat(2)
+        if max(start, end) > 1.0:
+            np.clip(samples, -32768, 32767, out=samples)
+        return samples.astype('<i2').tobytes()
+
+    def read(self) -> bytes:
+        if self._pos >= len(self._buffer):
+            self._buffer = self._refill()
+            self._pos = 0
+        frame = self._buffer[self._pos:self._pos + FRAME_BYTES]
+        self._pos += FRAME_BYTES
+        return frame
+
+    def is_opus(self) -> bool:
+        return False
+
+    def cleanup(self):
+        self.original.cleanup()
+
+def find_volume_source(source):
+    """The VolumeSource in a chain of wrapping sources, or None (e.g. for Opus streams)."""
+    while source is not None:
+        if isinstance(source, VolumeSource):
+            return source
+        source = getattr(source, 'original', None)
+    return None
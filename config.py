@@ -6,4 +6,82 @@ load_dotenv()
 
 BOT_TOKEN = os.getenv("BOT_TOKEN")
 AUDIOBOOK_PATH = "audiobooks"
-BOOKS_PER_PAGE = 20
\ No newline at end of file
+BOOKS_PER_PAGE = 20
+
+# Session reaper thresholds (seconds)
+REAPER_INTERVAL = int(os.getenv("REAPER_INTERVAL", 60))
+IDLE_PAUSED_TIMEOUT = int(os.getenv("IDLE_PAUSED_TIMEOUT", 30 * 60))
+IDLE_SESSION_TIMEOUT = int(os.getenv("IDLE_SESSION_TIMEOUT", 10 * 60))
+
+# FFmpeg stream admission control (0 disables the limit / the queue)
+MAX_CONCURRENT_STREAMS = int(os.getenv("MAX_CONCURRENT_STREAMS", max(1, (os.cpu_count() or 1) * 4)))
+STREAM_QUEUE_TIMEOUT = float(os.getenv("STREAM_QUEUE_TIMEOUT", 15))
+
+# Where Opus encoding happens: "python" (voice client encodes PCM in the bot process)
+# or "ffmpeg" (each ffmpeg child encodes, spreading the work across all cores)
+AUDIO_ENCODER = os.getenv("AUDIO_ENCODER", "python").lower()
+OPUS_BITRATE = int(os.getenv("OPUS_BITRATE", 64))  # kbps, used when AUDIO_ENCODER is "ffmpeg"
+
+# Catalog snapshot: the library is memory-mapped from this file at startup and reconciled with the disk
+# in the background every CATALOG_RECONCILE_INTERVAL seconds (0 = only once at startup). Empty disables it.
+CATALOG_SNAPSHOT_PATH = os.getenv("CATALOG_SNAPSHOT_PATH", "catalog.snapshot")
+CATALOG_RECONCILE_INTERVAL = float(os.getenv("CATALOG_RECONCILE_INTERVAL", 10 * 60))
+
+# Resume positions: appended to this journal every RESUME_FLUSH_INTERVAL seconds. Empty keeps them in memory only.
+RESUME_JOURNAL_PATH = os.getenv("RESUME_JOURNAL_PATH", "resume_positions.jsonl")
+RESUME_FLUSH_INTERVAL = float(os.getenv("RESUME_FLUSH_INTERVAL", 5))
+
+# Full-text synopsis search index (SQLite), built in the background from the library metadata. Empty disables /findsynopsis.
+SYNOPSIS_INDEX_PATH = os.getenv("SYNOPSIS_INDEX_PATH", "synopsis_index.db")
+
+# Shared library index (SQLite). Empty disables it and the bot scans AUDIOBOOK_PATH directly.
+# cluster.py builds it and points every worker at it.
+LIBRARY_INDEX_PATH = os.getenv("LIBRARY_INDEX_PATH", "")
+INDEX_PROBE_WORKERS = int(os.getenv("INDEX_PROBE_WORKERS", 8))
+
+# Loudness normalization: cluster.py measures every indexed chapter (EBU R128) once, in LOUDNESS_WORKERS parallel ffmpeg
+# decodes, and playback applies a static gain towards LOUDNESS_TARGET (LUFS) unless the file is within LOUDNESS_TOLERANCE (dB)
+LOUDNESS_NORMALIZATION = os.getenv("LOUDNESS_NORMALIZATION", "1") == "1"
+LOUDNESS_TARGET = float(os.getenv("LOUDNESS_TARGET", -18))
+LOUDNESS_TOLERANCE = float(os.getenv("LOUDNESS_TOLERANCE", 1.0))
+LOUDNESS_WORKERS = int(os.getenv("LOUDNESS_WORKERS", max(1, (os.cpu_count() or 1) // 2)))
+
+# Skip-silence mode: cluster.py also decodes every indexed chapter once and stores its silences (quieter than
+# SILENCE_THRESHOLD_DB dBFS for at least SILENCE_MIN_SECONDS), which listeners can have skipped during playback
+SILENCE_ANALYSIS = os.getenv("SILENCE_ANALYSIS", "1") == "1"
+SILENCE_THRESHOLD_DB = float(os.getenv("SILENCE_THRESHOLD_DB", -50))
+SILENCE_MIN_SECONDS = float(os.getenv("SILENCE_MIN_SECONDS", 1.5))
+SILENCE_WORKERS = int(os.getenv("SILENCE_WORKERS", LOUDNESS_WORKERS))
+
+# Play queue: while a chapter plays, the start of the next file (next chapter or queued book) is read into the page cache
+QUEUE_WARM_MB = int(os.getenv("QUEUE_WARM_MB", 16))
+
+# Cluster mode (cluster.py)
+HEARTBEAT_INTERVAL = float(os.getenv("HEARTBEAT_INTERVAL", 15))  # seconds between worker health reports
+HEARTBEAT_TIMEOUT = float(os.getenv("HEARTBEAT_TIMEOUT", 120))  # restart a worker that has been silent this long
+INDEX_REFRESH_INTERVAL = float(os.getenv("INDEX_REFRESH_INTERVAL", 15 * 60))  # seconds between library index rebuilds
+
+# Prometheus-style metrics endpoint (0 disables it)
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+METRICS_PORT = int(os.getenv("METRICS_PORT", 0))
+
+# Logging
+LOG_LEVEL = os.getenv("LOG_LEVEL", "DEBUG").upper()  # Lowest level written to bot_activity.log
+LOG_LIBRARY_LEVEL = os.getenv("LOG_LIBRARY_LEVEL", "INFO").upper()  # Level for nextcord's own loggers
+LOG_JSON = os.getenv("LOG_JSON", "0") == "1"  # Write the log file as JSON lines
+LOG_SAMPLING = os.getenv("LOG_SAMPLING", "")  # e.g. "cogs.playback_handler=10" keeps 1 in 10 of each debug/info message
+
+# Event loop lag monitor (seconds). A threshold of 0 disables it.
+LOOP_MONITOR_INTERVAL = float(os.getenv("LOOP_MONITOR_INTERVAL", 0.25))
+LOOP_LAG_THRESHOLD = float(os.getenv("LOOP_LAG_THRESHOLD", 0.5))
+
+# /profile sampling profiler
+PROFILE_INTERVAL = float(os.getenv("PROFILE_INTERVAL", 0.01))  # seconds between stack samples
+PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")
+
+# Interaction acknowledgement: handlers expected to take longer than this (seconds) are deferred up front
+ACK_BUDGET = float(os.getenv("ACK_BUDGET", 1.5))
+
+# Slash command sync: the schema hash of the last upload is kept here so reconnects and restarts skip it
+COMMAND_SYNC_STATE = os.getenv("COMMAND_SYNC_STATE", ".command_sync.json")
+FORCE_COMMAND_SYNC = os.getenv("FORCE_COMMAND_SYNC", "0") == "1"
@@ -0,0 +1,287 @@
+# generate_library.py
+"""
+Builds a synthetic audiobook library for benchmarks and load tests.
+
+The library has the layout the bot expects:
+  <out>/<Author>/<Series>/<Book>/001 - <Chapter>.m4b   (series books)
+  <out>/<Author>/<Book>/001 - <Chapter>.m4b            (standalone books)
+
+Audio is generated locally with ffmpeg's lavfi sources (a tone over pink noise with short
+pauses, like narration), encoded as AAC in .m4b. Every chapter is tagged with mutagen
+(title, track, author, album, synopsis, cover art). With --single-file DIR, every book is also
+written to a second library under DIR as one unsplit .m4b with embedded chapters (QuickTime
+chapter track and the '----:com.audible:chapters' XML that check_tags.py reads).
+
+Output is deterministic: the same arguments and --seed produce the same names, tags and
+audio, so benchmark numbers are comparable across runs. A library_manifest.json with the
+parameters and every generated book is written next to the library.
+
+To keep large libraries fast to build, only --audio-variants distinct clips are encoded per
+chapter length; chapters reuse them and get their own tags.
+
+Usage:
+  python generate_library.py bench_library --authors 10 --series 2 --books 3 --standalone 2 --chapters 12
+  python generate_library.py bench_library --chapter-seconds 30 --single-file bench_library_single
+"""
+import argparse
+import hashlib
+import json
+import multiprocessing
+import os
+import random
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+
+from mutagen.mp4 import MP4, MP4Cover, MP4FreeForm
+
+FIRST_NAMES = ["Ada", "Basil", "Clara", "Dorian", "Elena", "Felix", "Greta", "Hugo", "Iris", "Jonah",
+               "Kira", "Lionel", "Mara", "Nils", "Odette", "Pavel", "Quinn", "Rosa", "Silas", "Tamsin"]
+LAST_NAMES = ["Ashford", "Blackwood", "Carver", "Delacroix", "Everly", "Fairbanks", "Grimaldi", "Hawthorne",
+              "Ingram", "Jarvis", "Kowalski", "Lindqvist", "Moreau", "Northcott", "Okafor", "Pemberton"]
+ADJECTIVES = ["Silent", "Crimson", "Hollow", "Forgotten", "Burning", "Iron", "Glass", "Winter", "Hidden",
+              "Last", "Shattered", "Golden", "Distant", "Drowned", "Wandering", "Secret", "Pale", "Endless"]
+NOUNS = ["Crown", "Harbor", "Garden", "Empire", "Lantern", "River", "Archive", "Citadel", "Orchard", "Tide",
+         "Compass", "Labyrinth", "Kingdom", "Mirror", "Voyage", "Oath", "Frontier", "Requiem"]
+SYNOPSIS_WORDS = ["a", "young", "cartographer", "discovers", "that", "the", "map", "she", "inherited", "hides",
+                  "a", "city", "lost", "to", "the", "sea", "while", "an", "old", "order", "of", "scholars",
+                  "hunts", "for", "the", "same", "secret", "betrayal", "storm", "alliance", "war", "memory",
+                  "journey", "across", "frozen", "mountains", "and", "burning", "deserts", "reveals", "truth"]
+
+def check_dependencies():
+    """Checks if FFmpeg is installed and in the system's PATH."""
+    try:
+        subprocess.run(['ffmpeg', '-version'], capture_output=True, check=True, text=True)
+    except (subprocess.CalledProcessError, FileNotFoundError):
+        print("\n--- FFmpeg NOT FOUND ---")
+        print("This script requires FFmpeg to be installed and accessible in your system's PATH.")
+        sys.exit(1)
+
+def sanitize_filename(name):
+    """Removes characters that are invalid for file/folder names."""
+    return re.sub(r'[\\/*?:"<>|]', "", name).strip()
+
+def make_title(rng: random.Random) -> str:
+    return f"The {rng.choice(ADJECTIVES)} {rng.choice(NOUNS)}"
+
+def make_synopsis(rng: random.Random, sentences: int = 4) -> str:
+    parts = []
+    for _ in range(sentences):
+        words = [rng.choice(SYNOPSIS_WORDS) for _ in range(rng.randint(10, 22))]
+        parts.append(" ".join(words).capitalize() + ".")
+    return " ".join(parts)
+
+def plan_library(args) -> list:
+    """Decides every author, series, book and chapter name up front from the seed."""
+    rng = random.Random(args.seed)
+    books = []
+    used_authors = set()
+    for a in range(args.authors):
+        author = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+        while author in used_authors:
+            author = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)} {a}"
+        used_authors.add(author)
+
+        groups = [(f"{make_title(rng)} Saga", args.books) for _ in range(args.series)]
+        groups.append((None, args.standalone))
+        used_titles = set()
+        for series, count in groups:
+            for n in range(count):
+                title = make_title(rng)
+                if series:
+                    title = f"Book {n + 1} - {title}"
+                while title in used_titles:
+                    title = f"{title} {len(used_titles)}"
+                used_titles.add(title)
+                chapters = [f"Chapter {c + 1} - {rng.choice(ADJECTIVES)} {rng.choice(NOUNS)}" for c in range(args.chapters)]
+                parts = [args.out, sanitize_filename(author)]
+                if series:
+                    parts.append(sanitize_filename(series))
+                parts.append(sanitize_filename(title))
+                books.append({
+                    'author': author,
+                    'series': series,
+                    'title': title,
+                    'path': os.path.join(*parts),
+                    'synopsis': make_synopsis(rng),
+                    'year': str(rng.randint(1950, 2025)),
+                    'cover_color': f"0x{rng.randrange(0x1000000):06x}",
+                    'chapters': chapters,
+                })
+    return books
+
+def run_ffmpeg(arguments: list):
+    subprocess.run(['ffmpeg', '-hide_banner', '-loglevel', 'error', '-y'] + arguments, check=True)
+
+def encode_clip(job):
+    """Encodes one reusable chapter clip. Bit-exact flags keep the output identical across runs."""
+    output_path, seconds, variant, seed, bitrate = job
+    frequency = 140 + 37 * variant
+    pause_every = 6 + variant % 5
+    audio_filter = (
+        f"sine=frequency={frequency}:sample_rate=44100:duration={seconds}[tone];"
+        f"anoisesrc=color=pink:amplitude=0.08:seed={seed + variant}:sample_rate=44100:duration={seconds}[noise];"
+        f"[tone][noise]amix=inputs=2:normalize=0,"
+        # Drop the level to silence for the last 0.7s of every few seconds, like pauses between sentences
+        f"volume='if(lt(mod(t,{pause_every}),{pause_every - 0.7}),0.5,0)':eval=frame,"
+        f"aformat=channel_layouts=mono"
+    )
+    run_ffmpeg([
+        '-f', 'lavfi', '-i', audio_filter,
+        '-c:a', 'aac', '-b:a', f"{bitrate}k",
+        '-fflags', '+bitexact', '-flags:a', '+bitexact', '-map_metadata', '-1',
+        '-f', 'mp4', output_path
+    ])
+    return output_path
+
+def encode_cover(output_path: str, color: str):
+    run_ffmpeg([
+        '-f', 'lavfi', '-i', f"color=c={color}:s=600x600,drawbox=x=60:y=60:w=480:h=480:color=white@0.35:t=24",
+        '-frames:v', '1', '-fflags', '+bitexact', '-flags:v', '+bitexact', output_path
+    ])
+
+def tag_file(path: str, book: dict, title: str, track: int, total: int, cover: bytes):
+    audio = MP4(path)
+    if audio.tags is None:
+        audio.add_tags()
+    tags = audio.tags
+    tags['©nam'] = title
+    tags['©ART'] = book['author']
+    tags['aART'] = book['author']
+    tags['©alb'] = book['title']
+    tags['©gen'] = "Audiobook"
+    tags['©day'] = book['year']
+    tags['trkn'] = [(track, total)]
+    tags['desc'] = book['synopsis'][:255]
+    tags['ldes'] = book['synopsis']  # ffprobe reports this as 'synopsis'
+    tags['©cmt'] = book['synopsis']
+    if book['series']:
+        tags['----:com.apple.iTunes:SERIES'] = MP4FreeForm(book['series'].encode('utf-8'))
+    tags['covr'] = [MP4Cover(cover, imageformat=MP4Cover.FORMAT_JPEG)]
+    audio.save()
+
+def audible_chapters_xml(chapters: list) -> str:
+    """Builds the chapter XML in the layout check_tags.py parses (StartTime as HH:MM:SS.mmm)."""
+    points = []
+    for title, start in chapters:
+        hours, rest = divmod(start, 3600)
+        minutes, seconds = divmod(rest, 60)
+        points.append(
+            f"<ChapterPoint><Title>{title.replace('&', '&amp;').replace('<', '&lt;')}</Title>"
+            f"<StartTime>{int(hours):02d}:{int(minutes):02d}:{seconds:06.3f}</StartTime></ChapterPoint>"
+        )
+    return f'<?xml version="1.0" encoding="utf-8"?><Markers xmlns="http://www.audible.com/chapters">{"".join(points)}</Markers>'
+
+def write_single_file(book: dict, chapter_files: list, chapter_seconds: float, cover: bytes, tmp: str, out_root: str, library_root: str):
+    """Concatenates a book's chapters into one .m4b with embedded chapter markers, in the same folder layout under out_root."""
+    list_path = os.path.join(tmp, 'concat.txt')
+    with open(list_path, 'w', encoding='utf-8') as f:
+        for path in chapter_files:
+            f.write("file '{}'\n".format(os.path.abspath(path).replace("'", "'\\''")))
+
+    metadata_path = os.path.join(tmp, 'chapters.ffmeta')
+    starts = []
+    with open(metadata_path, 'w', encoding='utf-8') as f:
+        f.write(";FFMETADATA1\n")
+        for index, title in enumerate(book['chapters']):
+            start = index * chapter_seconds
+            starts.append((title, start))
+            escaped = re.sub(r'([=;#\\\n])', r'\\\1', title)
+            f.write(f"[CHAPTER]\nTIMEBASE=1/1000\nSTART={int(start * 1000)}\nEND={int((start + chapter_seconds) * 1000)}\ntitle={escaped}\n")
+
+    book_dir = os.path.join(out_root, os.path.relpath(book['path'], library_root))
+    os.makedirs(book_dir, exist_ok=True)
+    output_path = os.path.join(book_dir, f"{sanitize_filename(book['title'])}.m4b")
+    run_ffmpeg([
+        '-f', 'concat', '-safe', '0', '-i', list_path, '-i', metadata_path,
+        '-map', '0:a', '-map_metadata', '1', '-map_chapters', '1', '-c', 'copy',
+        '-fflags', '+bitexact', '-f', 'mp4', output_path
+    ])
+    tag_file(output_path, book, book['title'], 1, 1, cover)
+    audio = MP4(output_path)
+    audio.tags['----:com.audible:chapters'] = MP4FreeForm(audible_chapters_xml(starts).encode('utf-8'))
+    audio.save()
+    return output_path
+
+def generate(args) -> dict:
+    books = plan_library(args)
+    total_chapters = sum(len(b['chapters']) for b in books)
+    print(f"Generating {len(books)} books with {total_chapters} chapters in '{args.out}'...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # Encode the shared clips in parallel, the same way split_m4b_mp3.py spreads its ffmpeg jobs
+        clip_jobs = [(os.path.join(tmp, f"clip_{v}.m4b"), args.chapter_seconds, v, args.seed, args.bitrate)
+                     for v in range(args.audio_variants)]
+        with multiprocessing.Pool(processes=min(len(clip_jobs), args.jobs)) as pool:
+            clips = pool.map(encode_clip, clip_jobs)
+
+        for index, book in enumerate(books):
+            os.makedirs(book['path'], exist_ok=True)
+            cover_path = os.path.join(tmp, 'cover.jpg')
+            encode_cover(cover_path, book['cover_color'])
+            with open(cover_path, 'rb') as f:
+                cover = f.read()
+
+            chapter_files = []
+            total = len(book['chapters'])
+            for track, title in enumerate(book['chapters'], start=1):
+                path = os.path.join(book['path'], f"{track:03d} - {sanitize_filename(title)}.m4b")
+                # The variant depends only on the names, so the same chapter always gets the same audio
+                digest = hashlib.sha1(f"{book['path']}/{track}".encode('utf-8')).digest()
+                shutil.copyfile(clips[digest[0] % len(clips)], path)
+                tag_file(path, book, title, track, total, cover)
+                chapter_files.append(path)
+
+            if args.single_file:
+                book['single_file'] = write_single_file(book, chapter_files, args.chapter_seconds, cover, tmp, args.single_file, args.out)
+            print(f"  [{index + 1}/{len(books)}] {book['author']} / {book['series'] or '-'} / {book['title']}")
+
+    manifest = {
+        'seed': args.seed,
+        'authors': args.authors,
+        'series_per_author': args.series,
+        'books_per_series': args.books,
+        'standalone_per_author': args.standalone,
+        'chapters_per_book': args.chapters,
+        'chapter_seconds': args.chapter_seconds,
+        'audio_variants': args.audio_variants,
+        'single_file': args.single_file,
+        'books': [{k: v for k, v in b.items() if k != 'cover_color'} for b in books],
+    }
+    manifest_path = os.path.join(args.out, 'library_manifest.json')
+    with open(manifest_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+    print(f"Done. Manifest written to {manifest_path}")
+    return manifest
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a deterministic synthetic audiobook library.")
+    parser.add_argument('out', help="Output library folder (point AUDIOBOOK_PATH or bench_load.py --library at it)")
+    parser.add_argument('--authors', type=int, default=5)
+    parser.add_argument('--series', type=int, default=1, help="Series per author")
+    parser.add_argument('--books', type=int, default=3, help="Books per series")
+    parser.add_argument('--standalone', type=int, default=2, help="Standalone books per author")
+    parser.add_argument('--chapters', type=int, default=10, help="Chapters per book")
+    parser.add_argument('--chapter-seconds', type=float, default=60, help="Length of every chapter")
+    parser.add_argument('--audio-variants', type=int, default=4, help="Distinct audio clips to encode and reuse")
+    parser.add_argument('--bitrate', type=int, default=64, help="AAC bitrate in kbps")
+    parser.add_argument('--single-file', metavar='DIR', help="Also write every book as one .m4b with embedded chapters into this library folder")
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--jobs', type=int, default=max(1, (os.cpu_count() or 2) // 2), help="Parallel ffmpeg encodes")
+    parser.add_argument('--force', action='store_true', help="Delete the output folder first if it exists")
+    args = parser.parse_args()
+
+    check_dependencies()
+    for folder in filter(None, (args.out, args.single_file)):
+        if os.path.exists(folder) and os.listdir(folder):
+            if not args.force:
+                print(f"'{folder}' is not empty. Use --force to replace it.")
+                return 1
+            shutil.rmtree(folder)
+    generate(args)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
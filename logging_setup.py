@@ -1,35 +1,140 @@
 # logging_setup.py
+import atexit
+import json
 import logging
 import logging.handlers
+import queue
 import sys
+import threading
 
-def setup_logging():
+from config import LOG_LEVEL, LOG_LIBRARY_LEVEL, LOG_JSON, LOG_SAMPLING
+
+LOG_FORMAT = '%(asctime)s - %(levelname)-8s - %(filename)-15s:%(lineno)d - %(message)s'
+
+_listener = None
+
+class JsonFormatter(logging.Formatter):
+    """Formats each record as one JSON object per line."""
+    def format(self, record):
+        entry = {
+            'time': self.formatTime(record),
+            'level': record.levelname,
+            'logger': record.name,
+            'file': record.filename,
+            'line': record.lineno,
+            'thread': record.threadName,
+            'message': record.getMessage(),
+        }
+        if record.exc_info:
+            entry['exc_info'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False)
+
+class SamplingFilter(logging.Filter):
+    """
+    Thins out noisy loggers. For each configured logger, the first record of every message
+    template is kept and then only one in every N. Warnings and errors are never dropped.
+    """
+    def __init__(self, rates: dict):
+        super().__init__()
+        self.rates = rates  # key: logger name (prefix), value: keep 1 in N
+        self.counts = {}
+        self._lock = threading.Lock()
+
+    def _rate_for(self, name: str) -> int:
+        while name:
+            if name in self.rates:
+                return self.rates[name]
+            name = name.rpartition('.')[0]
+        return 1
+
+    def filter(self, record):
+        if record.levelno >= logging.WARNING:
+            return True
+        rate = self._rate_for(record.name)
+        if rate <= 1:
+            return True
+        key = (record.name, record.msg)
+        with self._lock:
+            count = self.counts.get(key, 0)
+            self.counts[key] = count + 1
+        return count % rate == 0
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    def prepare(self, record):
+        # Only merge the %-args here (they may be mutated later); timestamps, formatting and
+        # the actual write happen on the listener thread, off the event loop.
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+def parse_sampling(spec: str) -> dict:
+    """Parses 'logger=N,other.logger=M' into {'logger': N, 'other.logger': M}."""
+    rates = {}
+    for part in filter(None, (p.strip() for p in spec.split(','))):
+        name, _, rate = part.partition('=')
+        try:
+            rates[name.strip()] = max(1, int(rate))
+        except ValueError:
+            print(f"Ignoring invalid LOG_SAMPLING entry: {part}", file=sys.stderr)
+    return rates
+
+def setup_logging(log_file='bot_activity.log'):
+    """
+    Routes all logging through a queue so the event loop never waits on console or disk I/O.
+    A QueueListener thread formats the records and writes them to the console and the rotating log file.
+    """
+    global _listener
     log = logging.getLogger()
-    log.setLevel(logging.DEBUG)
-    
-    formatter = logging.Formatter('%(asctime)s - %(levelname)-8s - %(filename)-15s:%(lineno)d - %(message)s')
-    
+    log.setLevel(LOG_LEVEL)
+    # Library DEBUG output (gateway payloads, voice packets) is very chatty; keep it out unless asked for
+    logging.getLogger('nextcord').setLevel(LOG_LIBRARY_LEVEL)
+
+    if _listener:
+        _listener.stop()
+    for handler in list(log.handlers):
+        log.removeHandler(handler)
+
+    formatter = logging.Formatter(LOG_FORMAT)
+
     # Console handler
     console_handler = logging.StreamHandler(sys.stdout)
     console_handler.setLevel(logging.INFO)
     console_handler.setFormatter(formatter)
-    
+
     # Optional: Colored logs for the console
     try:
         import coloredlogs
-        coloredlogs.install(level='INFO', logger=log, fmt='%(asctime)s - %(levelname)-8s - %(filename)-15s:%(lineno)d - %(message)s')
+        console_handler.setFormatter(coloredlogs.ColoredFormatter(fmt=LOG_FORMAT))
     except ImportError:
-        log.addHandler(console_handler)
-        
+        pass
+
     # File handler
     file_handler = logging.handlers.RotatingFileHandler(
-        filename='bot_activity.log', 
-        encoding='utf-8', 
+        filename=log_file,
+        encoding='utf-8',
         maxBytes=5 * 1024 * 1024, # 5 MB
-        backupCount=5
+        backupCount=5,
+        delay=True
     )
     file_handler.setLevel(logging.DEBUG)
-    file_handler.setFormatter(formatter)
-    
-    log.addHandler(file_handler)
-    log.info("================== BOT STARTING UP ==================")
\ No newline at end of file
+    file_handler.setFormatter(JsonFormatter() if LOG_JSON else formatter)
+
+    log_queue = queue.SimpleQueue()
+    queue_handler = _QueueHandler(log_queue)
+    rates = parse_sampling(LOG_SAMPLING)
+    if rates:
+        queue_handler.addFilter(SamplingFilter(rates))
+    log.addHandler(queue_handler)
+
+    _listener = logging.handlers.QueueListener(log_queue, console_handler, file_handler, respect_handler_level=True)
+    _listener.start()
+    atexit.register(stop_logging)
+    log.info("================== BOT STARTING UP ==================")
+    return _listener
+
+def stop_logging():
+    """Flushes queued records and stops the listener thread."""
+    global _listener
+    if _listener:
+        _listener.stop()
+        _listener = None
@@ -1,43 +1,173 @@
 # Audiobook Bot by revela
+import startup_timeline  # First, so the timeline starts before the heavy imports
 # import discord
 # from discord.ext import commands
 import nextcord as discord
 from nextcord.ext import commands
 import os
+import json
+import hashlib
 import logging
 import asyncio
+import time
 
-from config import BOT_TOKEN
+from config import BOT_TOKEN, HEARTBEAT_INTERVAL, COMMAND_SYNC_STATE, FORCE_COMMAND_SYNC
 from logging_setup import setup_logging
 
-setup_logging()
 log = logging.getLogger(__name__)
+startup_timeline.mark("imports")
 
-intents = discord.Intents.default()
-intents.message_content = True
-intents.guilds = True
-intents.voice_states = True
-bot = commands.AutoShardedBot(command_prefix="/", intents=intents)
+COGS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'cogs')
 
-@bot.event
-async def on_ready():
-    log.info(f"Logged in as {bot.user} (ID: {bot.user.id})")
+def command_schema_hash(bot) -> str:
+    """Hashes the payload of every registered application command, i.e. exactly what a sync would upload."""
+    payloads = []
+    for command in bot.get_all_application_commands():
+        guild_ids = sorted(command.guild_ids) if command.guild_ids else [None]
+        for guild_id in guild_ids:
+            payloads.append(command.get_payload(guild_id))
+    payloads.sort(key=lambda p: (str(p.get('guild_id')), p.get('type', 1), p['name']))
+    encoded = json.dumps(payloads, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(encoded.encode('utf-8')).hexdigest()
+
+def _load_sync_state() -> dict:
     try:
-        await bot.sync_all_application_commands()
-        log.info("Synced slash commands.")
-    except Exception as e:
-        log.error(f"Failed to sync commands: {e}")
-    log.info(f"Successfully loaded {len(bot.cogs)} cogs.")
+        with open(COMMAND_SYNC_STATE, encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def _save_sync_state(state: dict):
+    tmp_path = f"{COMMAND_SYNC_STATE}.tmp"
+    try:
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(state, f)
+        os.replace(tmp_path, COMMAND_SYNC_STATE)  # Atomic, cluster workers may read it concurrently
+    except OSError as e:
+        log.warning("Could not save command sync state to %s: %s", COMMAND_SYNC_STATE, e)
+
+async def sync_commands_if_changed(bot):
+    """
+    Uploads the slash commands only when their schema differs from the last successful sync.
+    Commands still work without a sync: nextcord matches incoming interactions to them by name.
+    """
+    async with bot.command_sync_lock:
+        try:
+            schema_hash = command_schema_hash(bot)
+        except Exception as e:
+            log.warning("Could not hash the command schema, syncing anyway: %s", e)
+            schema_hash = None
+
+        if schema_hash and schema_hash == bot.synced_command_hash:
+            return  # Already handled in this process (another shard connected or a reconnect)
+        if getattr(bot, 'cluster_id', None):
+            # Commands are global, so only cluster worker 0 uploads them
+            bot.synced_command_hash = schema_hash
+            return
+
+        app_key = str(bot.application_id or bot.user.id)
+        state = _load_sync_state()
+        if schema_hash and not FORCE_COMMAND_SYNC and state.get(app_key) == schema_hash:
+            bot.synced_command_hash = schema_hash
+            log.info("Slash commands unchanged since the last sync (%s); skipping sync.", schema_hash[:12])
+            return
+
+        start = time.perf_counter()
+        try:
+            await bot.sync_all_application_commands()
+        except Exception as e:
+            log.error("Failed to sync commands: %s", e)
+            return
+        log.info("Synced slash commands in %.2fs.", time.perf_counter() - start)
+        bot.synced_command_hash = schema_hash
+        if schema_hash:
+            state[app_key] = schema_hash
+            _save_sync_state(state)
+
+def create_bot(shard_ids=None, shard_count=None) -> commands.AutoShardedBot:
+    """Creates the bot and loads the cogs. shard_ids/shard_count restrict it to a shard range (cluster mode)."""
+    intents = discord.Intents.default()
+    intents.message_content = True
+    intents.guilds = True
+    intents.voice_states = True
+    bot = commands.AutoShardedBot(command_prefix="/", intents=intents, shard_ids=shard_ids, shard_count=shard_count)
+    bot.command_sync_lock = asyncio.Lock()
+    bot.synced_command_hash = None
+
+    @bot.event
+    async def on_connect():
+        # Replaces nextcord's default handler, which re-uploads the commands on every (re)connect
+        startup_timeline.mark("gateway connect")
+        bot.add_all_application_commands()
+        await sync_commands_if_changed(bot)
+
+    @bot.event
+    async def on_ready():
+        log.info("Logged in as %s (ID: %s)", bot.user, bot.user.id)
+        log.info("Successfully loaded %s cogs.", len(bot.cogs))
+        if startup_timeline.mark("ready"):
+            startup_timeline.log_summary()
 
-def main():
     # Load cogs synchronously (nextcord style)
-    for filename in os.listdir('./cogs'):
+    for filename in sorted(os.listdir(COGS_DIR)):
         if filename.endswith('_cog.py'):
+            start = time.perf_counter()
             try:
                 bot.load_extension(f'cogs.{filename[:-3]}')
-                log.info(f"Successfully loaded cog: {filename}")
+                log.info("Successfully loaded cog: %s in %.2fs", filename, time.perf_counter() - start)
             except Exception as e:
-                log.exception(f"Failed to load cog: {filename}", exc_info=e)
+                log.exception("Failed to load cog: %s", filename, exc_info=e)
+    startup_timeline.mark("cog load")
+    return bot
+
+def collect_health(bot, cluster_id=None) -> dict:
+    """Snapshot of this process's health, sent to the cluster coordinator."""
+    health = {
+        'cluster_id': cluster_id,
+        'pid': os.getpid(),
+        'time': time.time(),
+        'ready': bot.is_ready(),
+        'shard_ids': sorted(bot.shards.keys()) if bot.shards else [],
+        'guilds': len(bot.guilds),
+        'latency': bot.latency if bot.is_ready() else None,
+    }
+    player_cog = bot.get_cog('PlayerCog')
+    if player_cog:
+        health.update(player_cog.reaper.stats())
+    return health
+
+async def _send_heartbeats(bot, cluster_id, status_queue):
+    while not bot.is_closed():
+        try:
+            status_queue.put_nowait(collect_health(bot, cluster_id))
+        except Exception as e:
+            log.warning("Failed to send heartbeat to coordinator: %s", e)
+        await asyncio.sleep(HEARTBEAT_INTERVAL)
+
+def run_worker(cluster_id: int, shard_ids: list, shard_count: int, status_queue=None):
+    """Entry point for a cluster worker process (see cluster.py)."""
+    setup_logging(log_file=f"bot_activity.cluster-{cluster_id}.log")
+    startup_timeline.mark("logging")
+    log.info("Cluster worker %s starting with shards %s-%s of %s.", cluster_id, shard_ids[0], shard_ids[-1], shard_count)
+    bot = create_bot(shard_ids=shard_ids, shard_count=shard_count)
+    bot.cluster_id = cluster_id
+    if status_queue is not None:
+        @bot.listen('on_ready')
+        async def start_heartbeats():
+            if not getattr(bot, 'heartbeat_task', None):
+                bot.heartbeat_task = asyncio.create_task(_send_heartbeats(bot, cluster_id, status_queue))
+    try:
+        bot.run(BOT_TOKEN)
+    except Exception:
+        log.exception("A fatal error occurred in cluster worker %s.", cluster_id)
+        raise
+    finally:
+        log.info("================== CLUSTER WORKER %s SHUTTING DOWN ==================", cluster_id)
+
+def main():
+    setup_logging()
+    startup_timeline.mark("logging")
+    bot = create_bot()
 
     if not BOT_TOKEN:
         log.critical("!!! BOT_TOKEN NOT FOUND !!! Check your .env and config.py file.")
@@ -51,4 +181,4 @@ def main():
             log.info("================== BOT SHUTTING DOWN ==================")
 
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    main()
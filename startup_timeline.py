@@ -0,0 +1,35 @@
+# startup_timeline.py
+import logging
+import time
+
+log = logging.getLogger(__name__)
+
+# Imported first thing in main.py, so this is as close to process start as Python code gets
+_start = time.perf_counter()
+_marks = []  # (phase, seconds since start)
+
+def mark(phase: str) -> bool:
+    """
+    Records that a startup phase finished. Only the first occurrence counts (reconnects fire
+    events again); returns False for repeats.
+    """
+    if any(name == phase for name, _ in _marks):
+        return False
+    elapsed = time.perf_counter() - _start
+    previous = _marks[-1][1] if _marks else 0.0
+    _marks.append((phase, elapsed))
+    log.info("Startup: %s after %.2fs (+%.2fs)", phase, elapsed, elapsed - previous)
+    return True
+
+def phases() -> list:
+    """Returns [(phase, duration, elapsed)] in the order the phases finished."""
+    result = []
+    previous = 0.0
+    for phase, elapsed in _marks:
+        result.append((phase, elapsed - previous, elapsed))
+        previous = elapsed
+    return result
+
+def log_summary():
+    lines = [f"  {phase:<22}{duration:>7.2f}s{elapsed:>9.2f}s" for phase, duration, elapsed in phases()]
+    log.info("Startup timeline (phase, duration, elapsed):\n%s", "\n".join(lines))
@@ -0,0 +1,6 @@
+# tests/conftest.py
+import os
+import sys
+
+# The bot runs from the repository root (python main.py), so its modules import as top-level packages
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
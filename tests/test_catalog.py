@@ -0,0 +1,109 @@
+# tests/test_catalog.py
+import os
+
+import pytest
+
+from cogs import catalog as catalog_module
+from cogs.catalog import Catalog, _encode_chapters, _decode_chapters
+
+CHAPTERS = [
+    {'filename': "01 - Prologue.m4b", 'title': "Prologue", 'track': 1, 'duration': 61.5},
+    {'filename': "02 - Über den Fluss.m4b", 'title': "Über den Fluss — 渡河", 'track': 2, 'duration': 1800.25},
+]
+SINGLE_FILE_CHAPTERS = [
+    {'filename': "book.m4b", 'title': "Chapter 1", 'track': 1, 'duration': 600.0, 'start': 0.0},
+    {'filename': "book.m4b", 'title': "Chapter 2", 'track': 2, 'duration': 540.5, 'start': 600.0},
+]
+
+@pytest.fixture
+def library(tmp_path):
+    """A library with one standalone book and a series of one book, plus a snapshot of it."""
+    root = tmp_path / "audiobooks"
+    book = root / "Author" / "Standalone"
+    series = root / "Author" / "Series"
+    series_book = series / "Book 1"
+    for path in (book, series_book):
+        path.mkdir(parents=True)
+    items = [
+        {'type': 'book', 'title': "Standalone", 'path': str(book), 'author': "Author"},
+        {'type': 'series', 'title': "Series", 'path': str(series), 'author': "Author",
+         'books': [{'title': "Book 1", 'path': str(series_book)}]},
+    ]
+    dirs = [str(root), str(root / "Author"), str(book), str(series), str(series_book)]
+    dir_mtimes = {path: os.stat(path).st_mtime_ns for path in dirs}
+    books = {
+        str(book): (dir_mtimes[str(book)], CHAPTERS),
+        # Already-encoded records are copied as is (what reconcile does for unchanged books)
+        str(series_book): (dir_mtimes[str(series_book)], _encode_chapters(SINGLE_FILE_CHAPTERS), len(SINGLE_FILE_CHAPTERS)),
+    }
+    catalog = Catalog(str(root), str(tmp_path / "catalog.snapshot"))
+    os.replace(catalog._write(items, dir_mtimes, books), catalog.snapshot_path)
+    yield catalog, items, str(book), str(series_book)
+    catalog._close_map()
+
+def test_chapter_records_round_trip():
+    data = b'padding' + _encode_chapters(CHAPTERS + SINGLE_FILE_CHAPTERS)
+    assert _decode_chapters(data, len(b'padding'), 4) == CHAPTERS + SINGLE_FILE_CHAPTERS
+
+def test_snapshot_round_trip(library, monkeypatch):
+    catalog, items, book, series_book = library
+    monkeypatch.setattr(catalog_module.library_index, 'get_chapters', lambda path: pytest.fail(f"re-read {path}"))
+
+    assert catalog.load()
+    assert catalog.get_items() == items
+    assert catalog.get_chapters(book) == CHAPTERS
+    assert catalog.get_chapters(series_book) == SINGLE_FILE_CHAPTERS
+    assert catalog.get_timeline(series_book).total == pytest.approx(1140.5)
+
+def test_changed_book_is_reread(library, monkeypatch):
+    catalog, _, book, series_book = library
+    reread = [{'filename': "01 - New.m4b", 'title': "New", 'track': 1, 'duration': 5.0}]
+    monkeypatch.setattr(catalog_module.library_index, 'get_chapters', lambda path: reread if path == book else pytest.fail(path))
+    changes = []
+    catalog.add_listener(changes.append)
+
+    assert catalog.load()
+    stat = os.stat(book)
+    os.utime(book, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+    assert catalog.get_chapters(book) == reread
+    assert catalog.get_chapters(series_book) == SINGLE_FILE_CHAPTERS
+    assert changes == [{book}]
+    # The re-read list is kept until the directory changes again
+    assert catalog.get_chapters(book) == reread
+    assert changes == [{book}]
+
+@pytest.mark.parametrize('content', [b'', b'not a snapshot', catalog_module.MAGIC + b'\x63\x00'])
+def test_unreadable_snapshot_is_ignored(tmp_path, content):
+    path = tmp_path / "catalog.snapshot"
+    path.write_bytes(content)
+    catalog = Catalog(str(tmp_path), str(path))
+    assert not catalog.load()
+    assert catalog.items is None
+
+def test_reconcile_follows_library_index(library, monkeypatch):
+    catalog, items, book, series_book = library
+    index = catalog_module.library_index
+    built_at = ["2026-01-01T00:00:00"]
+    versions = {book: 1, series_book: 2}
+    reread = [{'filename': "01 - New.m4b", 'title': "New", 'track': 1, 'duration': 5.0}]
+    monkeypatch.setattr(index, 'index_available', lambda: True)
+    monkeypatch.setattr(index, 'index_built_at', lambda: built_at[0])
+    monkeypatch.setattr(index, 'book_versions', lambda: dict(versions))
+    monkeypatch.setattr(index, 'get_items', lambda path: items)
+    monkeypatch.setattr(index, 'get_chapters', lambda path: reread if path == book else SINGLE_FILE_CHAPTERS)
+    monkeypatch.setattr(catalog_module.audio_utils, 'get_books_and_series', lambda path: pytest.fail("scanned the disk"))
+    monkeypatch.setattr(catalog_module, '_mtime_ns', lambda path: pytest.fail(f"stat {path}"))
+
+    assert catalog.load()
+    stats = catalog.reconcile()
+    assert stats['written'] and stats['reread'] == 2
+    assert catalog.get_items() == items
+    assert catalog.get_chapters(book) == reread
+
+    # Nothing is read until the coordinator rebuilds the index
+    assert catalog.reconcile()['reread'] == 0
+    built_at[0] = "2026-01-02T00:00:00"
+    versions[book] = 3
+    stats = catalog.reconcile()
+    assert stats['reread'] == 1 and stats['written']
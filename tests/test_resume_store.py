@@ -0,0 +1,93 @@
+# tests/test_resume_store.py
+import json
+
+import pytest
+
+from cogs import resume_store as resume_module
+from cogs.resume_store import ResumeStore
+
+@pytest.fixture
+def journal(tmp_path):
+    return str(tmp_path / "resume_positions.jsonl")
+
+def lines(path):
+    with open(path, encoding='utf-8') as f:
+        return f.read().splitlines()
+
+def test_replay_last_line_wins(journal):
+    store = ResumeStore(journal)
+    store.record(1, "/lib/a", 0, "01.m4b", 10)
+    store.record(1, "/lib/b", 2, "03.m4b", 20)
+    assert store.flush() == 2
+    store.record(1, "/lib/a", 1, "02.m4b", 30)
+    store.forget(1, "/lib/b")
+    store.flush()
+
+    replayed = ResumeStore(journal)
+    replayed.load()
+    assert replayed.get(1, "/lib/a")['chapter'] == 1
+    assert replayed.get(1, "/lib/a")['offset'] == 30
+    assert replayed.get(1, "/lib/b") is None
+    assert replayed.latest(1)[0] == "/lib/a"
+
+def test_truncated_last_line(journal):
+    store = ResumeStore(journal)
+    store.record(1, "/lib/a", 4, "05.m4b", 12.5)
+    store.flush()
+    with open(journal, 'a', encoding='utf-8') as f:
+        f.write('{"u":1,"b":"/lib/b","c":')  # the process died mid-write
+
+    replayed = ResumeStore(journal)
+    replayed.load()
+    assert replayed.get(1, "/lib/a")['offset'] == 12.5
+    assert replayed.get(1, "/lib/b") is None
+    # The torn line is compacted away, so the next append starts on a fresh line
+    assert len(lines(journal)) == 1
+    replayed.record(2, "/lib/c", 0, "01.m4b", 1)
+    replayed.flush()
+    assert [json.loads(line)['u'] for line in lines(journal)] == [1, 2]
+
+def test_unchanged_positions_are_not_rewritten(journal):
+    store = ResumeStore(journal)
+    store.record(1, "/lib/a", 0, "01.m4b", 10.01)
+    store.flush()
+    store.record(1, "/lib/a", 0, "01.m4b", 10.04)  # same position after rounding
+    assert store.flush() == 0
+
+def test_workers_sharing_a_journal(journal, monkeypatch):
+    monkeypatch.setattr(resume_module, 'COMPACT_MIN_LINES', 2)
+    monkeypatch.setattr(resume_module, 'COMPACT_RATIO', 1)
+    first, second = ResumeStore(journal), ResumeStore(journal)
+    first.load()
+    second.load()
+
+    first.record(1, "/lib/a", 0, "01.m4b", 10)
+    first.flush()
+    second.record(2, "/lib/b", 0, "01.m4b", 20)
+    second.flush()
+    assert second.get(1, "/lib/a") is not None  # picked up on flush
+
+    # Compacting in one worker keeps what the other saved
+    first.record(1, "/lib/a", 1, "02.m4b", 5)
+    first.record(3, "/lib/c", 0, "01.m4b", 1)
+    first.flush()
+    assert len(lines(journal)) == 3
+
+    # The other worker notices the rewrite, and its unflushed change wins over the file
+    second.record(2, "/lib/b", 3, "04.m4b", 40)
+    second.flush()
+    assert second.get(1, "/lib/a")['chapter'] == 1
+    assert second.get(3, "/lib/c") is not None
+
+    replayed = ResumeStore(journal)
+    replayed.load()
+    assert {key: position['chapter'] for key, position in replayed._positions.items()} == {
+        (1, "/lib/a"): 1, (2, "/lib/b"): 3, (3, "/lib/c"): 0,
+    }
+
+def test_failed_flush_is_retried(journal, tmp_path):
+    store = ResumeStore(str(tmp_path / "missing" / "resume_positions.jsonl"))
+    store.record(1, "/lib/a", 0, "01.m4b", 10)
+    assert store.flush() == 0
+    store.journal_path = journal
+    assert store.flush() == 1
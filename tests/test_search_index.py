@@ -0,0 +1,81 @@
+# tests/test_search_index.py
+import pytest
+
+from cogs.search_index import SearchIndex, choice_label, normalize
+
+class FakeCatalog:
+    def __init__(self, items, chapters):
+        self.items = items
+        self.chapters = chapters  # key: book path, value: (mtime_ns, chapters)
+
+    def iter_books(self, book_paths=None):
+        for book_path, (mtime, chapters) in self.chapters.items():
+            if book_paths is None or book_path in book_paths:
+                yield book_path, mtime, chapters
+
+ITEMS = [
+    {'type': 'series', 'title': "The Stormlight Archive", 'path': "/lib/Sanderson/Stormlight", 'author': "Brandon Sanderson",
+     'books': [{'title': "The Way of Kings", 'path': "/lib/Sanderson/Stormlight/1"},
+               {'title': "Words of Radiance", 'path': "/lib/Sanderson/Stormlight/2"}]},
+    {'type': 'book', 'title': "Warbreaker", 'path': "/lib/Sanderson/Warbreaker", 'author': "Brandon Sanderson"},
+    {'type': 'book', 'title': "Élantris", 'path': "/lib/Sanderson/Elantris", 'author': "Brandon Sanderson"},
+    {'type': 'book', 'title': "Kings of the Wyld", 'path': "/lib/Eames/Kings", 'author': "Nicholas Eames"},
+]
+CHAPTERS = {
+    "/lib/Sanderson/Warbreaker": (1, [{'filename': "01.m4b", 'title': "Prologue"}, {'filename': "02.m4b", 'title': "Vivenna"}]),
+}
+
+@pytest.fixture
+def index():
+    index = SearchIndex()
+    index.sync(FakeCatalog(ITEMS, dict(CHAPTERS)))
+    return index
+
+def texts(results):
+    return [entry.text for entry in results]
+
+def test_normalize():
+    assert normalize("  Élantris: The  Novel! ") == "elantris the novel"
+    assert normalize(None) == ""
+
+def test_every_word_must_prefix_a_word(index):
+    assert texts(index.search("way kin")) == ["The Way of Kings"]
+    assert texts(index.search("kin way")) == ["The Way of Kings"]
+    assert texts(index.search("ela")) == ["Élantris"]
+
+def test_ranking(index):
+    # Titles starting with the query first, then books before series before authors, then shorter titles
+    assert texts(index.search("kings"))[0] == "Kings of the Wyld"
+    assert texts(index.search("brandon")) == ["Brandon Sanderson"]
+    results = index.search("s")
+    kinds = [entry.kind for entry in results if not entry.norm.startswith("s")]
+    assert kinds == sorted(kinds, key=["book", "series", "author", "chapter"].index)
+
+def test_fuzzy_fallback(index):
+    assert texts(index.search("warbraker"))[:1] == ["Warbreaker"]
+    assert index.search("zzzzzz") == []
+
+def test_chapters_follow_the_catalog(index):
+    assert [(entry.kind, entry.detail) for entry in index.search("vivenna")] == [('chapter', "Warbreaker")]
+
+    catalog = FakeCatalog(ITEMS, {"/lib/Sanderson/Warbreaker": (2, [{'filename': "02.m4b", 'title': "Siri"}])})
+    index.update_books(catalog, {"/lib/Sanderson/Warbreaker"})
+    assert index.search("vivenna") == []
+    assert texts(index.search("siri")) == ["Siri"]
+
+    catalog = FakeCatalog(ITEMS[1:], {})
+    index.sync(catalog)
+    assert index.search("siri") == []
+    assert index.search("stormlight") == []
+    assert texts(index.search("warbreaker")) == ["Warbreaker"]
+
+def test_keys_are_stable_and_resolvable(index):
+    entry = index.search("warbreaker")[0]
+    assert index.get(entry.key) == entry
+    rebuilt = SearchIndex()
+    rebuilt.sync(FakeCatalog(ITEMS, dict(CHAPTERS)))
+    assert rebuilt.get(entry.key) == entry
+
+def test_choice_label_fits_discord_limit(index):
+    for entry in index.search("the"):
+        assert len(choice_label(entry)) <= 100
@@ -0,0 +1,92 @@
+# tests/test_synopsis_index.py
+import pytest
+
+from cogs import synopsis_index as synopsis_module
+from cogs.synopsis_index import SynopsisIndex, snippet, tokenize
+
+class FakeCatalog:
+    def __init__(self, items):
+        self.items = items
+
+def book(path, title):
+    return {'type': 'book', 'title': title, 'path': path, 'author': "Author"}
+
+SYNOPSES = {
+    "/lib/a": "A dragon hunts dragons over the mountains. The dragon never sleeps.",
+    "/lib/b": "A quiet story about a lighthouse keeper, his daughter and the sea, with one dragon "
+              "mentioned in passing among many other words that make this synopsis much longer.",
+    "/lib/c": "Detectives solve a murder in a lighthouse.",
+}
+
+@pytest.fixture
+def files(monkeypatch):
+    """Stands in for the chapter files: book path -> (signature, synopsis); records every full probe."""
+    state = {path: (f"sig-{path}", text) for path, text in SYNOPSES.items()}
+    probed = []
+    def probe(book_path, signature_only=False):
+        signature, synopsis = state[book_path]
+        if not signature_only:
+            probed.append(book_path)
+        return signature, None if signature_only else synopsis
+    monkeypatch.setattr(synopsis_module, '_probe_synopsis', probe)
+    monkeypatch.setattr(synopsis_module.library_index, 'index_available', lambda: False)
+    return state, probed
+
+@pytest.fixture
+def catalog():
+    return FakeCatalog([book("/lib/a", "Dragons"), book("/lib/b", "Lighthouse"), book("/lib/c", "Murder")])
+
+def titles(results):
+    return [result['title'] for result in results]
+
+def test_tokenize():
+    assert tokenize("The Dragons and their Stories!") == ["dragon", "story"]
+    assert tokenize("glass bus is") == ["glass", "bus"]
+
+def test_bm25_ranking(tmp_path, files, catalog):
+    index = SynopsisIndex(str(tmp_path / "synopsis.db"))
+    assert index.refresh(catalog)['reindexed'] == 3
+
+    # More occurrences in a shorter synopsis score higher
+    assert titles(index.search("dragon")) == ["Dragons", "Lighthouse"]
+    # Every query term contributes; the rarer term outweighs the common one
+    assert titles(index.search("lighthouse murder")) == ["Murder", "Lighthouse"]
+    assert index.search("the and") == []
+    assert index.search("submarine") == []
+
+def test_refresh_only_reindexes_changes(tmp_path, files, catalog):
+    state, probed = files
+    index = SynopsisIndex(str(tmp_path / "synopsis.db"))
+    index.refresh(catalog)
+    probed.clear()
+
+    assert index.refresh(catalog)['reindexed'] == 0
+    assert probed == []
+
+    state["/lib/c"] = ("sig-2", "Detectives chase a smuggler.")
+    stats = index.refresh(catalog, {"/lib/c"})
+    assert (stats['reindexed'], probed) == (1, ["/lib/c"])
+    assert titles(index.search("smuggler")) == ["Murder"]
+    assert titles(index.search("lighthouse")) == ["Lighthouse"]
+
+    catalog.items = catalog.items[:2]
+    assert index.refresh(catalog, {"/lib/a"})['removed'] == 0  # a partial refresh never removes
+    assert index.refresh(catalog)['removed'] == 1
+    assert index.search("smuggler") == []
+
+def test_index_persists(tmp_path, files, catalog):
+    _, probed = files
+    SynopsisIndex(str(tmp_path / "synopsis.db")).refresh(catalog)
+    probed.clear()
+
+    reopened = SynopsisIndex(str(tmp_path / "synopsis.db"))
+    assert titles(reopened.search("murder")) == ["Murder"]
+    assert reopened.refresh(catalog)['reindexed'] == 0
+    assert probed == []
+
+def test_snippet_centres_on_the_first_match():
+    text = "word " * 100 + "dragon " + "word " * 100
+    excerpt = snippet(text, ["dragon"])
+    assert "dragon" in excerpt
+    assert excerpt.startswith("…") and excerpt.endswith("…")
+    assert len(excerpt) <= synopsis_module.SNIPPET_CHARS + 2
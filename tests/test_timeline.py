@@ -0,0 +1,59 @@
+# tests/test_timeline.py
+import pytest
+
+from cogs.timeline import BookTimeline, parse_book_time
+
+def chapters(*durations):
+    return [{'filename': f"{i:02}.m4b", 'duration': duration} for i, duration in enumerate(durations, 1)]
+
+@pytest.fixture
+def timeline():
+    return BookTimeline(chapters(100.0, 200.0, 50.0))
+
+def test_offsets(timeline):
+    assert len(timeline) == 3
+    assert timeline.starts == [0.0, 100.0, 300.0]
+    assert timeline.total == 350.0
+
+@pytest.mark.parametrize('book_time, expected', [
+    (0.0, (0, 0.0)),
+    (99.9, (0, 99.9)),
+    (100.0, (1, 0.0)),  # a boundary belongs to the chapter that starts there
+    (299.5, (1, 199.5)),
+    (300.0, (2, 0.0)),
+    (350.0, (2, 50.0)),
+    (1e9, (2, 50.0)),  # past the end: end of the last chapter
+    (-5.0, (0, 0.0)),
+])
+def test_locate(timeline, book_time, expected):
+    index, offset = timeline.locate(book_time)
+    assert (index, offset) == (expected[0], pytest.approx(expected[1]))
+
+def test_book_time_inverts_locate(timeline):
+    for book_time in (0.0, 42.0, 100.0, 123.4, 300.0, 349.0):
+        assert timeline.book_time(*timeline.locate(book_time)) == pytest.approx(book_time)
+    assert timeline.book_time(7, 10.0) == 0.0
+
+def test_zero_length_chapters_are_skipped():
+    timeline = BookTimeline(chapters(100.0, 0.0, None, 50.0))
+    assert timeline.starts == [0.0, 100.0, 100.0, 100.0]
+    assert timeline.locate(100.0) == (3, 0.0)
+    assert timeline.locate(99.0) == (0, 99.0)
+
+def test_empty_book():
+    timeline = BookTimeline([])
+    assert (len(timeline), timeline.total) == (0, 0.0)
+    with pytest.raises(ValueError):
+        timeline.locate(0)
+
+@pytest.mark.parametrize('text, seconds', [
+    ("5:32:10", 19930), ("332:10", 19930), ("19930", 19930), ("5h32m10s", 19930),
+    ("90m", 5400), ("1h", 3600), ("45s", 45), ("1:30.5", 90.5), (" 1h 2m ", 3720),
+])
+def test_parse_book_time(text, seconds):
+    assert parse_book_time(text) == pytest.approx(seconds)
+
+@pytest.mark.parametrize('text', ["", "1:2:3:4", "1::2", "abc", "5x", "m"])
+def test_parse_book_time_rejects(text):
+    with pytest.raises(ValueError):
+        parse_book_time(text)